@@ -0,0 +1,268 @@
+"""Admission control and priority lanes for upstream LLM calls.
+
+Every LLM call takes a slot from one process-wide controller before it is
+sent. At most ``ADMISSION_MAX_CONCURRENCY`` calls run at once; the rest wait
+in one of three lanes, served in strict priority order:
+
+- ``INTERACTIVE``: a user waiting on the page or on an HTTP response
+- ``PREFETCH``: speculative cross-domain work for the books on screen
+- ``BATCH``: offline jobs from ``services/batch_runner.py``
+
+Background lanes may together hold at most ``ADMISSION_BACKGROUND_SHARE`` of
+the slots, so a burst of prefetch or batch work never fills every slot
+ahead of an interactive request. Each lane has a queue-depth limit and a
+maximum wait. A request over either limit fails fast with
+``AdmissionRejected`` instead of piling up behind work that will not finish
+in time.
+
+The lane is chosen by the caller through a context variable (see
+``priority``), so it follows a request through the service layer, LangGraph
+and the agents without changing their signatures. Cache hits and catalog
+fast paths never reach an LLM call, so they are answered without a slot.
+
+Waiters are woken thread-safely, so one controller serves every event loop in
+the process.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+
+import config
+from utils import logger
+from .instrumentation import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+from .retry import ErrorKind, LLMCallError
+
+
+class Priority(IntEnum):
+    """Admission lanes; lower values are served first."""
+    INTERACTIVE = 0
+    PREFETCH = 1
+    BATCH = 2
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+_priority: ContextVar[Priority] = ContextVar("admission_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority(lane: Priority) -> Iterator[None]:
+    """Run the enclosed LLM calls, including those in tasks started inside, in ``lane``."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """Return the lane of the current request; interactive unless set with ``priority``."""
+    return _priority.get()
+
+
+class AdmissionRejected(LLMCallError):
+    """Raised when a request is turned away because its lane is full or it waited too long."""
+
+    def __init__(self, lane: Priority, reason: str):
+        super().__init__(
+            f"The service is busy; {lane.label} request rejected ({reason.replace('_', ' ')})",
+            ErrorKind.RATE_LIMIT,
+            attempts=0
+        )
+        self.lane = lane
+        self.reason = reason
+
+
+@dataclass
+class _Waiter:
+    lane: Priority
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    granted: bool = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Process-wide concurrency cap with strict-priority lanes and bounded queues."""
+
+    def __init__(self,
+                 max_concurrency: int,
+                 queue_limits: Dict[Priority, int],
+                 max_waits: Dict[Priority, float],
+                 background_share: float = 0.5):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Calls allowed to run at once; 0 disables admission control
+            queue_limits: Most requests waiting per lane; 0 means unbounded
+            max_waits: Longest a request may wait per lane, in seconds; 0 waits indefinitely
+            background_share: Fraction of the slots the prefetch and batch lanes may hold together
+        """
+        self.max_concurrency = max_concurrency
+        self.queue_limits = queue_limits
+        self.max_waits = max_waits
+        self.background_slots = max(1, int(max_concurrency * background_share))
+        self._active: Dict[Priority, int] = {lane: 0 for lane in Priority}
+        self._queues: Dict[Priority, Deque[_Waiter]] = {lane: deque() for lane in Priority}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def active(self, lane: Optional[Priority] = None) -> int:
+        """Return the number of running calls, in one lane or in total."""
+        return self._active[lane] if lane is not None else sum(self._active.values())
+
+    def queued(self, lane: Optional[Priority] = None) -> int:
+        """Return the number of waiting requests, in one lane or in total."""
+        return len(self._queues[lane]) if lane is not None else sum(len(q) for q in self._queues.values())
+
+    def _can_start(self, lane: Priority) -> bool:
+        if self.active() >= self.max_concurrency:
+            return False
+        if lane is Priority.INTERACTIVE:
+            return True
+        background = self._active[Priority.PREFETCH] + self._active[Priority.BATCH]
+        return background < self.background_slots
+
+    def _start(self, lane: Priority) -> None:
+        self._active[lane] += 1
+        ADMISSION_ACTIVE.set(self._active[lane], lane=lane.label)
+
+    def _update_depth(self, lane: Priority) -> None:
+        ADMISSION_QUEUE_DEPTH.set(len(self._queues[lane]), lane=lane.label)
+
+    def _dispatch(self) -> None:
+        # Called with the lock held: hand free slots to waiters, highest priority first
+        for lane in Priority:
+            queue = self._queues[lane]
+            while queue and self._can_start(lane):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._start(lane)
+                try:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:
+                    # The waiter's loop has closed; nobody will use the slot
+                    waiter.granted = False
+                    self._active[lane] -= 1
+                    ADMISSION_ACTIVE.set(self._active[lane], lane=lane.label)
+            self._update_depth(lane)
+
+    def release(self, lane: Priority) -> None:
+        """Return a slot taken by ``acquire`` and admit the next waiter."""
+        with self._lock:
+            self._active[lane] -= 1
+            ADMISSION_ACTIVE.set(self._active[lane], lane=lane.label)
+            self._dispatch()
+
+    async def acquire(self, lane: Priority) -> float:
+        """
+        Wait for a slot in ``lane``.
+
+        Args:
+            lane: Priority lane of the request
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: If the lane's queue is full or the request waited too long
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            ahead = any(self._queues[other] for other in Priority if other <= lane)
+            if not ahead and self._can_start(lane):
+                self._start(lane)
+                ADMISSION_QUEUE_WAIT.observe(0.0, lane=lane.label)
+                return 0.0
+            limit = self.queue_limits.get(lane, 0)
+            if limit and len(self._queues[lane]) >= limit:
+                ADMISSION_REJECTED.inc(lane=lane.label, reason="queue_full")
+                raise AdmissionRejected(lane, "queue_full")
+            waiter = _Waiter(lane=lane, loop=loop, future=loop.create_future())
+            self._queues[lane].append(waiter)
+            self._update_depth(lane)
+
+        max_wait = self.max_waits.get(lane, 0) or None
+        try:
+            await asyncio.wait_for(waiter.future, max_wait)
+        except BaseException as e:
+            with self._lock:
+                if waiter.granted:
+                    # The slot arrived as the wait ended; pass it on
+                    self._active[lane] -= 1
+                    ADMISSION_ACTIVE.set(self._active[lane], lane=lane.label)
+                    self._dispatch()
+                else:
+                    self._queues[lane].remove(waiter)
+                    self._update_depth(lane)
+            if isinstance(e, asyncio.TimeoutError):
+                ADMISSION_REJECTED.inc(lane=lane.label, reason="wait_timeout")
+                raise AdmissionRejected(lane, "wait_timeout") from e
+            raise
+        waited = time.monotonic() - started
+        ADMISSION_QUEUE_WAIT.observe(waited, lane=lane.label)
+        return waited
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[Priority] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot for the enclosed upstream call.
+
+        Args:
+            lane: Priority lane; defaults to the lane of the current request
+        """
+        if not self.enabled:
+            yield
+            return
+        lane = current_priority() if lane is None else lane
+        waited = await self.acquire(lane)
+        if waited > 1.0:
+            logger.info(f"Admitted {lane.label} request after {waited:.2f}s in queue")
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller configured from ``config``."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                max_concurrency=config.ADMISSION_MAX_CONCURRENCY,
+                queue_limits={
+                    Priority.INTERACTIVE: config.ADMISSION_INTERACTIVE_QUEUE_LIMIT,
+                    Priority.PREFETCH: config.ADMISSION_PREFETCH_QUEUE_LIMIT,
+                    Priority.BATCH: config.ADMISSION_BATCH_QUEUE_LIMIT,
+                },
+                max_waits={
+                    Priority.INTERACTIVE: config.ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS,
+                    Priority.PREFETCH: config.ADMISSION_PREFETCH_MAX_WAIT_SECONDS,
+                    Priority.BATCH: 0,
+                },
+                background_share=config.ADMISSION_BACKGROUND_SHARE
+            )
+        return _controller
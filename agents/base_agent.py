@@ -1,17 +1,87 @@
-from typing import Dict, TypeVar, Generic, Optional
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, TypeVar, Generic, Optional
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import ConfigurableField, Runnable
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, ValidationError
-import json
-from functools import cached_property
+from functools import cached_property, lru_cache
 import os
 
 from utils import logger
-from config import MODEL_NAME, TEMPERATURE
+import config
+from .admission import get_admission_controller
+from .circuit_breaker import get_circuit_breaker
+from .hedging import get_hedger
+from .http_clients import get_async_http_client, get_http_client, request_timeout
+from .instrumentation import (
+    LLM_FAILURES, LLM_RETRIES, NODE_DEADLINES_EXCEEDED, VALIDATION_FAILURES, metrics_handler
+)
+from .retry import ErrorKind, LLMCallError, RetryPolicy, classify_error, get_rate_limiter, retry_after_seconds
+from .routing import LARGE, SMALL, RouteDecision, get_model_router, model_for_tier
 
 StateType = TypeVar('StateType')
 
+# Optional override for how agents obtain their chat model, e.g. a local stand-in
+_llm_factory: Optional[Callable[["BaseAgent", str], BaseChatModel]] = None
+
+def set_llm_factory(factory: Optional[Callable[["BaseAgent", str], BaseChatModel]]) -> None:
+    """
+    Replace the chat model used by agents created from now on.
+
+    Already-built agents keep their model, so call ``agents.registry.invalidate_graphs()``
+    afterwards to rebuild the shared graphs.
+
+    Args:
+        factory: Callable receiving the agent and the routing tier (``"small"`` or
+            ``"large"``) and returning a chat model, or None to restore the
+            default ChatOpenAI clients
+    """
+    global _llm_factory
+    _llm_factory = factory
+
+@lru_cache(maxsize=None)
+def build_prompt(system_prompt: str, human_template: str, with_history: bool = False) -> ChatPromptTemplate:
+    """
+    Build a prompt template once per distinct layout and share it between agents.
+
+    The static system prompt always comes first and everything that varies per
+    request (history, user input) follows it. The leading tokens of every call
+    are therefore byte-identical, so provider-side prompt caching can reuse
+    them. The returned template is shared and must not be mutated.
+
+    Args:
+        system_prompt: Static system message
+        human_template: Template of the final human message
+        with_history: Insert a ``messages`` placeholder for conversation history
+
+    Returns:
+        The shared ChatPromptTemplate
+    """
+    messages = [("system", system_prompt)]
+    if with_history:
+        messages.append(MessagesPlaceholder(variable_name="messages"))
+    messages.append(("human", human_template))
+    return ChatPromptTemplate.from_messages(messages)
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when an LLM-bound graph node, including its retries, misses its overall deadline."""
+
+    def __init__(self, node: str, seconds: float):
+        super().__init__(f"{node} exceeded its {seconds:g}s deadline")
+        self.node = node
+        self.seconds = seconds
+
+
+def _deadline_exceeded(node: str, seconds: float) -> DeadlineExceeded:
+    NODE_DEADLINES_EXCEEDED.inc(node=node)
+    logger.error(f"{node} exceeded its {seconds:g}s deadline")
+    return DeadlineExceeded(node, seconds)
+
+
 class BaseAgent(Generic[StateType]):
     """Base class for all recommendation agents providing common functionality."""
 
@@ -33,76 +103,311 @@ class BaseAgent(Generic[StateType]):
         """
         self.schema = schema
         self.function_name = function_name
-        self.system_prompt = system_prompt
+        # Strip source indentation: fewer tokens, and identical bytes however the prompt is declared
+        self.system_prompt = inspect.cleandoc(system_prompt)
         self._entry_point = entry_point or f"{function_name}_entry"
         self._finish_point = finish_point or f"{function_name}_finish"
 
-    @cached_property
-    def llm(self) -> ChatOpenAI:
-        """Initialize and configure the LLM with caching."""
+    def create_llm(self, tier: str) -> BaseChatModel:
+        """Create the chat model serving one routing tier."""
+        if _llm_factory is not None:
+            return _llm_factory(self, tier)
         return ChatOpenAI(
-            model=MODEL_NAME,
-            temperature=TEMPERATURE,
+            model=model_for_tier(tier),
+            temperature=config.TEMPERATURE,
+            # Retries are handled by ainvoke_with_retry so backoff and quotas are shared
+            max_retries=0,
+            # A stalled request fails as a retryable timeout instead of hanging the node
+            timeout=request_timeout(),
+            # One pooled client per process, so connections are reused across agents, tiers and rebuilds
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            # Report token usage for streamed responses too
+            stream_usage=True,
+            callbacks=[metrics_handler],
             metadata={
                 "agent_type": self.__class__.__name__,
-                "function": self.function_name
+                "function": self.function_name,
+                "model_tier": tier
             }
         )
 
-    def create_prompt(self, human_template: str) -> ChatPromptTemplate:
+    @cached_property
+    def llm(self) -> Runnable:
+        """
+        Initialize and configure the LLM with caching.
+
+        The large-tier model is used by default; passing ``route_config(decision)``
+        when invoking a chain switches that call to the routed tier's model.
+        """
+        return self.create_llm(LARGE).configurable_alternatives(
+            ConfigurableField(id="model_tier"),
+            default_key=LARGE,
+            **{SMALL: self.create_llm(SMALL)}
+        )
+
+    def query_complexity(self, inputs: Dict[str, Any]) -> float:
+        """
+        Score how demanding a request is for routing, from 0 (trivial) to 1 (hard).
+
+        Agents override this; the default keeps every request on the large model.
+        """
+        return 1.0
+
+    def route(self, inputs: Dict[str, Any]) -> RouteDecision:
+        """Choose the model tier for a request from its complexity and the tiers' recent health."""
+        return get_model_router().choose(self.__class__.__name__, self.query_complexity(inputs))
+
+    @staticmethod
+    def route_config(decision: RouteDecision) -> Dict[str, Any]:
+        """Runnable config selecting the routed model for one chain call."""
+        return {"configurable": {"model_tier": decision.tier}}
+
+    def escalation(self, error: Exception, decision: RouteDecision) -> Optional[RouteDecision]:
+        """
+        Return the large-tier route to retry on when a small-tier response failed validation.
+
+        Args:
+            error: Exception raised by the attempt
+            decision: Route the attempt used
+
+        Returns:
+            The escalated route, or None if the failure should go through normal retries
+        """
+        if decision.tier != SMALL or classify_error(error) != ErrorKind.VALIDATION:
+            return None
+        agent = self.__class__.__name__
+        VALIDATION_FAILURES.inc(agent=agent)
+        escalated = get_model_router().escalate(agent, decision)
+        logger.warning(
+            f"{self.function_name} response from {decision.model} failed validation; "
+            f"escalating to {escalated.model}: {error}"
+        )
+        return escalated
+
+    def create_prompt(self,
+                      human_template: str,
+                      with_history: bool = False,
+                      system_prompt: Optional[str] = None) -> ChatPromptTemplate:
         """
-        Create a standardized prompt template with improved type safety.
+        Return the shared prompt template for this agent's system prompt.
 
         Args:
             human_template: The human message template
+            with_history: Insert a ``messages`` placeholder between system and human messages
+            system_prompt: Static system prompt to use instead of the agent's own
 
         Returns:
-            Configured ChatPromptTemplate
+            Configured ChatPromptTemplate, built once per distinct layout
         """
-        return ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("human", human_template)
-        ])
+        return build_prompt(
+            inspect.cleandoc(system_prompt or self.system_prompt),
+            inspect.cleandoc(human_template),
+            with_history
+        )
 
-    def process_response(self, response) -> Dict:
+    def bind_function(self, schema: Dict[str, Any]):
         """
-        Process and validate the LLM response with enhanced error handling.
+        Bind the LLM so every call is forced to call ``schema``'s function.
+
+        Args:
+            schema: OpenAI function definition from ``config``
+
+        Returns:
+            The bound runnable
+        """
+        return self.llm.bind(functions=[schema], function_call={"name": schema["name"]})
+
+    @cached_property
+    def retry_policy(self) -> RetryPolicy:
+        """Retry policy applied to this agent's LLM calls."""
+        return RetryPolicy.from_config()
+
+    def estimate_tokens(self, inputs: Dict[str, Any]) -> int:
+        """Roughly estimate prompt plus completion tokens for rate limiting (~4 characters per token)."""
+        characters = len(self.system_prompt) + sum(len(str(value)) for value in inputs.values())
+        return characters // 4 + config.LLM_COMPLETION_TOKENS_ESTIMATE
+
+    async def backoff_or_raise(self, error: Exception, attempt: int) -> None:
+        """
+        Sleep before retrying a failed attempt, or raise if it must not be retried.
+
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of the failed attempt (1-based)
+
+        Raises:
+            LLMCallError: If the error is not retryable or retries are exhausted
+        """
+        policy = self.retry_policy
+        kind = classify_error(error)
+        agent = self.__class__.__name__
+        if kind == ErrorKind.VALIDATION:
+            VALIDATION_FAILURES.inc(agent=agent)
+        if not policy.should_retry(kind, attempt):
+            LLM_FAILURES.inc(agent=agent, kind=kind.value)
+            logger.error(f"{self.function_name} failed after {attempt} attempt(s) ({kind.value}): {error}")
+            raise LLMCallError(f"{self.function_name} failed: {error}", kind, attempt) from error
+
+        LLM_RETRIES.inc(agent=agent, kind=kind.value)
+        delay = policy.delay(attempt, retry_after_seconds(error))
+        if kind == ErrorKind.RATE_LIMIT:
+            get_rate_limiter().pause(delay)
+        logger.warning(
+            f"{self.function_name} attempt {attempt} failed ({kind.value}); "
+            f"retrying in {delay:.2f}s: {error}"
+        )
+        await asyncio.sleep(delay)
+
+    async def ainvoke_with_retry(self, chain, inputs: Dict[str, Any]) -> Any:
+        """
+        Invoke a chain under the shared rate limiter, retrying transient failures.
+
+        The call first waits for an admission slot in the current request's
+        priority lane (see ``agents/admission.py``) and is routed to a model
+        tier. A small-tier response that fails validation is retried once on
+        the large tier without counting as a retry attempt. Each attempt may be
+        hedged (see ``agents/hedging.py``) and is reported to the circuit
+        breaker (see ``agents/circuit_breaker.py``).
+
+        Args:
+            chain: Runnable to invoke
+            inputs: Chain inputs
+
+        Returns:
+            The chain's result
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            LLMCallError: If the error is not retryable or retries are exhausted
+        """
+        router = get_model_router()
+        breaker = get_circuit_breaker()
+        agent = self.__class__.__name__
+        decision = self.route(inputs)
+        tokens = self.estimate_tokens(inputs)
+        attempt = 0
+        # Fail fast, before queueing for a slot, while the provider is known to be down
+        probe = breaker.acquire() if breaker else None
+        try:
+            # The slot is held across retries so a failing call cannot lose its place to newer requests
+            async with get_admission_controller().slot():
+                while True:
+                    attempt += 1
+                    if breaker and probe is None:
+                        probe = breaker.acquire()
+                    await get_rate_limiter().acquire(tokens)
+                    started = time.perf_counter()
+                    run_config = self.route_config(decision)
+                    try:
+                        result = await get_hedger().run(
+                            agent,
+                            decision.tier,
+                            lambda: chain.ainvoke(inputs, config=run_config),
+                            before_hedge=lambda: get_rate_limiter().acquire(tokens)
+                        )
+                    except Exception as e:
+                        if breaker:
+                            breaker.record(probe, error=e)
+                            probe = None
+                        router.record(agent, decision.tier, None, ok=False)
+                        escalated = self.escalation(e, decision)
+                        if escalated is not None:
+                            decision = escalated
+                            attempt -= 1
+                            continue
+                        await self.backoff_or_raise(e, attempt)
+                    else:
+                        elapsed = time.perf_counter() - started
+                        if breaker:
+                            breaker.record(probe, seconds=elapsed)
+                            probe = None
+                        router.record(agent, decision.tier, elapsed, ok=True)
+                        return result
+        finally:
+            # Cancelled (e.g. by a node deadline) or turned away before the attempt finished
+            if breaker and probe is not None:
+                breaker.release(probe)
+
+    async def with_deadline(self, awaitable, seconds: float, node: str) -> Any:
+        """
+        Await a node's work, abandoning it once its deadline passes.
+
+        Args:
+            awaitable: The node's LLM-bound work, including retries
+            seconds: Deadline in seconds; 0 waits indefinitely
+            node: Node name for logs and metrics
+
+        Returns:
+            The awaitable's result
+
+        Raises:
+            DeadlineExceeded: If the deadline passes; the work is cancelled
+        """
+        if seconds <= 0:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, seconds)
+        except asyncio.TimeoutError as e:
+            raise _deadline_exceeded(node, seconds) from e
+
+    async def before_deadline(self, awaitable, deadline: Optional[float], seconds: float, node: str) -> Any:
+        """
+        Await one step of a node's work against a deadline shared by all its steps.
+
+        ``with_deadline`` needs the whole node as one awaitable; streaming
+        yields between steps, so each step is bounded by the time left instead.
+
+        Args:
+            awaitable: One step, e.g. the next streamed chunk or a retry backoff
+            deadline: ``time.monotonic()`` value the node must finish by; None waits indefinitely
+            seconds: The node's full deadline, for logs
+            node: Node name for logs and metrics
+
+        Returns:
+            The awaitable's result
+
+        Raises:
+            DeadlineExceeded: If the deadline passes; the step is cancelled
+        """
+        if deadline is None:
+            return await awaitable
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if hasattr(awaitable, "close"):
+                awaitable.close()
+            raise _deadline_exceeded(node, seconds)
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError as e:
+            raise _deadline_exceeded(node, seconds) from e
+
+    def process_response(self, response) -> BaseModel:
+        """
+        Validate the function-call arguments of an LLM response against ``schema``.
+
+        The arguments are parsed and validated in one pass with
+        ``model_validate_json``; the typed result is passed on as-is so no
+        later stage has to parse or validate it again.
 
         Args:
             response: Raw LLM response
 
         Returns:
-            Dictionary with validated response data
+            Validated instance of ``schema``
 
         Raises:
-            ValueError: If response format is invalid
-            ValidationError: If schema validation fails
+            ValueError: If the response carries no function call or fails
+                validation, so the retry policy can classify and retry it
         """
+        function_call = getattr(response, "additional_kwargs", {}).get("function_call")
+        if not function_call or "arguments" not in function_call:
+            raise ValueError(f"Invalid {self.function_name} response: no function call arguments")
         try:
-            logger.info(f"Validating {self.function_name} response")
-            if not hasattr(response, 'additional_kwargs'):
-                logger.warning(f"No additional_kwargs in {self.function_name} response")
-                return {}
-
-            function_call = response.additional_kwargs.get('function_call')
-            if not function_call:
-                logger.warning(f"No function call found in {self.function_name} response")
-                return {}
-
-            args = json.loads(function_call.get('arguments', '{}'))
-            self.schema(**args)  # Validate with Pydantic
-            logger.info(f"Successfully validated {self.function_name} response")
-            return args
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in {self.function_name} response: {e}")
-            raise ValueError("Invalid JSON format in response") from e
+            return self.schema.model_validate_json(function_call["arguments"])
         except ValidationError as e:
-            logger.error(f"Schema validation failed for {self.function_name}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error processing {self.function_name} response: {e}")
-            raise
+            logger.error(f"Invalid {self.function_name} response: {e}")
+            raise ValueError(f"Invalid response: {e}") from e
 
     @property
     def state_schema(self) -> BaseModel:
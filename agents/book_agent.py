@@ -1,20 +1,42 @@
-from typing import List, Dict
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Dict, Optional
+from functools import cached_property
 from langgraph.graph import StateGraph, END
-from pydantic import BaseModel
-from langchain_core.prompts import MessagesPlaceholder
+from pydantic import BaseModel, ValidationError
 from langchain_core.callbacks import CallbackManager
 from langsmith.run_helpers import traceable
 
-from models import BookRecommendations
+from models import BookRecommendation, BookRecommendations, CandidateRanking, CandidateRankings
 from utils import logger
-from config import RECOMMEND_BOOKS_SCHEMA
-from .base_agent import BaseAgent
-import json
+import config
+from config import RANK_CANDIDATES_SCHEMA, RECOMMEND_BOOKS_SCHEMA
+from .admission import AdmissionRejected, get_admission_controller
+from .base_agent import BaseAgent, DeadlineExceeded
+from .circuit_breaker import get_circuit_breaker
+from .instrumentation import FALLBACK_RESPONSES, LLM_FAILURES, VALIDATION_FAILURES
+from .retry import LLMCallError, classify_error, get_rate_limiter
+from .response_cache import ResponseCache
+from .routing import get_model_router, text_complexity
+from .streaming import IncrementalArrayParser
+
+RANK_SYSTEM_PROMPT = """You are an expert librarian and book recommender. You are given the user's request and a numbered list of candidate books from our catalog.
+Choose the 3-5 candidates that best match the request, best first, and explain specifically why each one matches.
+Only choose from the numbered candidates and refer to them by their number.
+If earlier recommendations are in the conversation, treat the request as a refinement of them and prefer candidates not already recommended.
+
+Your response will be automatically formatted into JSON using the function call mechanism."""
+
+# Most books returned by the no-LLM fast path
+FAST_PATH_MAX_RESULTS = 5
 
 class BookState(BaseModel):
     messages: List[dict]
     input: str
-    recommendations: List[dict]
+    recommendations: List[BookRecommendation]
+    # Catalog books retrieved for the LLM to rank, when a catalog index is configured
+    candidates: List[dict] = []
 
 class BookAgent(BaseAgent):
     """Agent for recommending books based on user preferences."""
@@ -35,6 +57,7 @@ class BookAgent(BaseAgent):
         4. Verify all book information is accurate
         5. Write clear, informative descriptions
         6. Explain specifically why each book matches the request
+        7. If earlier recommendations are in the conversation, treat the input as a refinement of them ("the second one" is the second book listed) and do not repeat books already recommended
 
         Your response will be automatically formatted into JSON using the function call mechanism."""
 
@@ -43,75 +66,463 @@ class BookAgent(BaseAgent):
             function_name="recommend_books",
             system_prompt=system_prompt
         )
-        # Create the chain during initialization
+        # Create the chains during initialization
+        self._llm_chain = self.create_llm_chain()
         self._chain = self.create_chain()
+        self._rank_llm_chain = self.create_rank_chain()
+
+    @cached_property
+    def cache(self) -> Optional[ResponseCache]:
+        """Response cache shared by every invocation of this agent, if enabled."""
+        if not config.BOOK_CACHE_ENABLED:
+            return None
+        embed_fn = None
+        if config.BOOK_CACHE_USE_EMBEDDINGS:
+            from langchain_openai import OpenAIEmbeddings
+            from .http_clients import get_async_http_client, get_http_client
+            embed_fn = OpenAIEmbeddings(
+                model=config.EMBEDDING_MODEL,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client()
+            ).embed_query
+        return ResponseCache(
+            name="book_recommendations",
+            ttl_seconds=config.BOOK_CACHE_TTL_SECONDS,
+            max_entries=config.BOOK_CACHE_MAX_ENTRIES,
+            embed_fn=embed_fn,
+            similarity_threshold=config.BOOK_CACHE_SIMILARITY_THRESHOLD
+        )
+
+    @cached_property
+    def catalog(self):
+        """Catalog index used to retrieve candidate books, if configured."""
+        if not config.CATALOG_INDEX_PATH:
+            return None
+        from catalog.index import open_catalog_index
+        return open_catalog_index(config.CATALOG_INDEX_PATH)
+
+    def create_llm_chain(self):
+        """Create the prompt and function-bound LLM, without response processing."""
+        prompt = self.create_prompt("{input}", with_history=True)
+        return prompt | self.bind_function(RECOMMEND_BOOKS_SCHEMA)
 
     def create_chain(self):
         """Create the processing chain for book recommendations."""
-        prompt = self.create_prompt("{input}")
-        prompt.messages.insert(1, MessagesPlaceholder(variable_name="messages"))
-        
-        chain = (
-            prompt
-            | self.llm.bind(
-                functions=[RECOMMEND_BOOKS_SCHEMA],
-                function_call={"name": "recommend_books"}
+        return self._llm_chain | self.process_response
+
+    def create_rank_chain(self):
+        """Create the prompt and LLM that choose among retrieved catalog candidates."""
+        prompt = self.create_prompt(
+            "{input}\n\nCandidates:\n{candidates}", with_history=True, system_prompt=RANK_SYSTEM_PROMPT
+        )
+        return prompt | self.bind_function(RANK_CANDIDATES_SCHEMA)
+
+    def query_complexity(self, inputs: Dict) -> float:
+        """
+        Score a book request for model routing.
+
+        Short genre or author queries are simple. Refinements must be read
+        against earlier results, so they lean towards the large model, while
+        picking among numbered catalog candidates is easier than recalling
+        books unaided.
+        """
+        score = text_complexity(inputs["input"])
+        if inputs.get("messages"):
+            score += 0.5
+        if "candidates" in inputs:
+            score *= 0.5
+        return min(1.0, score)
+
+    def retrieve_candidates(self, user_input: str) -> List[dict]:
+        """
+        Look up the catalog books most similar to the request.
+
+        Args:
+            user_input: The user's request
+
+        Returns:
+            Catalog records with an added ``score``, best first; empty without a catalog
+        """
+        if self.catalog is None:
+            return []
+        matches = self.catalog.search(user_input, k=config.CATALOG_TOP_K, min_score=config.CATALOG_MIN_SCORE)
+        logger.info(f"Retrieved {len(matches)} catalog candidates")
+        return [{**book, "score": score} for book, score in matches]
+
+    async def aretrieve_candidates(self, user_input: str, messages: Optional[List[dict]] = None) -> List[dict]:
+        """Async ``retrieve_candidates``; the search runs in a worker thread."""
+        if self.catalog is None:
+            return []
+        return await asyncio.to_thread(self.retrieve_candidates, self.retrieval_query(user_input, messages))
+
+    @staticmethod
+    def retrieval_query(user_input: str, messages: Optional[List[dict]] = None) -> str:
+        """Search text for a request; follow-ups like "but darker" are combined with the previous request."""
+        previous = [m["content"] for m in messages or [] if m.get("role") == "user"]
+        return f"{previous[-1]} {user_input}" if previous else user_input
+
+    @staticmethod
+    def fast_path_recommendations(candidates: List[dict]) -> Optional[BookRecommendations]:
+        """Return the top catalog matches directly when retrieval is confident enough to skip the LLM."""
+        confident = [c for c in candidates if c["score"] >= config.CATALOG_FAST_PATH_SCORE]
+        if not confident:
+            return None
+        return BookAgent.catalog_recommendations(confident)
+
+    @staticmethod
+    def catalog_recommendations(candidates: List[dict], fallback: bool = False) -> BookRecommendations:
+        """
+        Return the best catalog matches as recommendations without asking the LLM to rank them.
+
+        Args:
+            candidates: Retrieved catalog candidates, best first
+            fallback: Flag the results as served because the LLM was unavailable
+        """
+        logger.info(f"Serving {len(candidates[:FAST_PATH_MAX_RESULTS])} catalog matches without the LLM")
+        return BookRecommendations(recommendations=[
+            BookRecommendation(
+                title=c["title"], author=c["author"], genre=c["genre"], description=c["description"],
+                reason=f"A close match for your request in our catalog ({c['score']:.0%} similarity).",
+                is_fallback=fallback
             )
-            | self.process_response
+            for c in candidates[:FAST_PATH_MAX_RESULTS]
+        ])
+
+    @staticmethod
+    def degraded_recommendations(user_input: str, candidates: List[dict], error: Exception) -> BookRecommendations:
+        """
+        Answer without the LLM after it failed, was too slow, or had no capacity.
+
+        Retrieved catalog matches are preferred since they fit the request;
+        otherwise the precomputed fallback picks are used (see ``catalog/fallback.py``).
+        An overloaded service with no catalog matches still reports busy.
+
+        Args:
+            user_input: The user's request
+            candidates: Retrieved catalog candidates, possibly empty
+            error: The failure that prevented an LLM answer
+
+        Returns:
+            Recommendations flagged with ``is_fallback``
+
+        Raises:
+            Exception: ``error`` itself when there is nothing to fall back on
+        """
+        if candidates:
+            logger.warning(f"LLM unavailable ({error}); serving unranked catalog matches")
+            FALLBACK_RESPONSES.inc(kind="books")
+            return BookAgent.catalog_recommendations(candidates, fallback=True)
+        if isinstance(error, AdmissionRejected) or not config.FALLBACK_ENABLED:
+            raise error
+        from catalog.fallback import get_fallback_index
+        index = get_fallback_index()
+        if index is None:
+            raise error
+        logger.warning(f"LLM unavailable ({error}); serving precomputed fallback recommendations")
+        FALLBACK_RESPONSES.inc(kind="books")
+        return BookRecommendations(recommendations=index.recommend(user_input))
+
+    @staticmethod
+    def format_candidates(candidates: List[dict]) -> str:
+        """Render candidates as the numbered list the ranking prompt refers to."""
+        return "\n".join(
+            f"[{i}] {c['title']} by {c['author']} ({c['genre']}): {c['description'][:300]}"
+            for i, c in enumerate(candidates)
         )
-        
-        return chain
 
-    @traceable(name="process_book_recommendations")
-    def process_response(self, response):
-        """Process the LLM response and validate against schema."""
+    @staticmethod
+    def candidate_recommendation(ranking: CandidateRanking,
+                                 candidates: List[dict],
+                                 chosen: set) -> Optional[BookRecommendation]:
+        """
+        Turn one ranking into a recommendation built from the catalog record.
+
+        Title, author, genre and description always come from the catalog, so
+        only indices into ``candidates`` can be recommended.
+
+        Args:
+            ranking: The LLM's choice
+            candidates: Candidates offered in the prompt
+            chosen: Indices already used; updated in place
+
+        Returns:
+            The recommendation, or None for an out-of-range or repeated index
+        """
+        if not 0 <= ranking.index < len(candidates) or ranking.index in chosen:
+            logger.warning(f"Ignoring ranking for unknown or repeated candidate {ranking.index}")
+            return None
+        chosen.add(ranking.index)
+        c = candidates[ranking.index]
+        return BookRecommendation(
+            title=c["title"], author=c["author"], genre=c["genre"], description=c["description"],
+            reason=ranking.reason
+        )
+
+    def process_ranking(self, response, candidates: List[dict]) -> BookRecommendations:
+        """
+        Validate a ``rank_candidates`` response and map it onto the catalog candidates.
+
+        Raises:
+            ValueError: If the response is malformed or chooses no valid candidate
+        """
+        function_call = response.additional_kwargs.get("function_call", {})
+        if not function_call or "arguments" not in function_call:
+            raise ValueError("Invalid response format: no function call arguments")
         try:
-            function_call = response.additional_kwargs.get("function_call", {})
-            if not function_call or "arguments" not in function_call:
-                return {"error": "Invalid response format"}
-
-            try:
-                args = json.loads(function_call["arguments"])
-                recommendations = self.schema(**args)
-                return recommendations
-            except (json.JSONDecodeError, ValidationError) as e:
-                return {"error": f"Invalid response: {str(e)}"}
-        except Exception as e:
-            logger.error(f"Error processing response: {str(e)}")
-            return {"error": f"Processing error: {str(e)}"}
+            rankings = CandidateRankings.model_validate_json(function_call["arguments"])
+        except ValidationError as e:
+            logger.error(f"Invalid rank_candidates response: {e}")
+            raise ValueError(f"Invalid response: {e}") from e
+
+        chosen = set()
+        recommendations = [
+            recommendation for ranking in rankings.rankings
+            if (recommendation := self.candidate_recommendation(ranking, candidates, chosen)) is not None
+        ]
+        if not recommendations:
+            raise ValueError("Invalid response: no valid candidate was chosen")
+        return BookRecommendations(recommendations=recommendations)
+
+    async def astream_recommendations(self,
+                                      user_input: str,
+                                      messages: Optional[List[dict]] = None) -> AsyncIterator[BookRecommendation]:
+        """
+        Stream recommendations, yielding each one as soon as its JSON object closes.
+
+        Args:
+            user_input: The user's request
+            messages: Optional prior conversation turns
+
+        The stream shares the ``recommend_books`` node deadline and, like the
+        node, falls back to degraded results when the LLM fails or is too slow
+        before anything was yielded. A deadline missed after some items were
+        yielded ends the stream with those items.
+
+        Yields:
+            Validated BookRecommendation objects in generation order
+
+        Raises:
+            LLMCallError: If the LLM fails after some items were yielded
+        """
+        messages = messages or []
+        cache = self.cache if not messages else None
+        cached = await cache.aget(user_input) if cache is not None else None
+        if cached is not None:
+            logger.info("Serving streamed book recommendations from response cache")
+            for recommendation in cached.recommendations:
+                yield recommendation
+            return
+
+        candidates = await self.aretrieve_candidates(user_input, messages)
+        # Refinements need the LLM to interpret them against the earlier results
+        fast = self.fast_path_recommendations(candidates) if not messages else None
+        if fast is not None:
+            for recommendation in fast.recommendations:
+                yield recommendation
+            return
+
+        if candidates:
+            chain = self._rank_llm_chain
+            inputs = {"messages": messages, "input": user_input, "candidates": self.format_candidates(candidates)}
+            chosen = set()
+
+            def to_recommendation(item: dict) -> Optional[BookRecommendation]:
+                ranking = CandidateRanking.model_validate(item)
+                return self.candidate_recommendation(ranking, candidates, chosen)
+        else:
+            chain = self._llm_chain
+            inputs = {"messages": messages, "input": user_input}
+            to_recommendation = BookRecommendation.model_validate
+
+        router = get_model_router()
+        breaker = get_circuit_breaker()
+        agent = self.__class__.__name__
+        decision = self.route(inputs)
+        seconds = config.BOOK_NODE_TIMEOUT_SECONDS
+        deadline = time.monotonic() + seconds if seconds > 0 else None
+
+        def within_deadline(awaitable):
+            return self.before_deadline(awaitable, deadline, seconds, "recommend_books")
+
+        received = []
+        attempt = 0
+        probe = None
+        try:
+            if breaker:
+                probe = breaker.acquire()
+            async with get_admission_controller().slot():
+                while True:
+                    attempt += 1
+                    if breaker and probe is None:
+                        probe = breaker.acquire()
+                    await within_deadline(get_rate_limiter().acquire(self.estimate_tokens(inputs)))
+                    parser = IncrementalArrayParser()
+                    logger.info(f"Streaming LLM chain for recommendations from {decision.model}")
+                    started = time.perf_counter()
+                    try:
+                        async with aclosing(chain.astream(inputs, config=self.route_config(decision))) as stream:
+                            while True:
+                                try:
+                                    chunk = await within_deadline(anext(stream))
+                                except StopAsyncIteration:
+                                    break
+                                function_call = chunk.additional_kwargs.get("function_call") or {}
+                                fragment = function_call.get("arguments")
+                                if not fragment:
+                                    continue
+                                for item in parser.feed(fragment):
+                                    try:
+                                        recommendation = to_recommendation(item)
+                                    except ValidationError as e:
+                                        VALIDATION_FAILURES.inc(agent=self.__class__.__name__)
+                                        logger.warning(f"Skipping invalid streamed recommendation: {e}")
+                                        continue
+                                    if recommendation is None:
+                                        continue
+                                    received.append(recommendation)
+                                    yield recommendation
+                        # An empty stream is a failed response on any tier: escalate or retry it
+                        if not received:
+                            raise ValueError("Invalid response: no valid recommendation was streamed")
+                        elapsed = time.perf_counter() - started
+                        if breaker:
+                            breaker.record(probe, seconds=elapsed)
+                            probe = None
+                        router.record(agent, decision.tier, elapsed, ok=True)
+                        break
+                    except DeadlineExceeded:
+                        raise
+                    except Exception as e:
+                        if breaker:
+                            breaker.record(probe, error=e)
+                            probe = None
+                        router.record(agent, decision.tier, None, ok=False)
+                        # Once items have been shown a retry would duplicate them; report a typed
+                        # error so callers can keep what they already have
+                        if received:
+                            kind = classify_error(e)
+                            LLM_FAILURES.inc(agent=agent, kind=kind.value)
+                            raise LLMCallError(
+                                f"{self.function_name} failed after {len(received)} streamed recommendations: {e}",
+                                kind,
+                                attempt
+                            ) from e
+                        escalated = self.escalation(e, decision)
+                        if escalated is not None:
+                            decision = escalated
+                            attempt -= 1
+                            continue
+                        await within_deadline(self.backoff_or_raise(e, attempt))
+        except (LLMCallError, DeadlineExceeded) as e:
+            if received:
+                if isinstance(e, DeadlineExceeded):
+                    # Keep the items already shown; the partial result is not cached
+                    logger.warning(f"Ending stream after {len(received)} recommendations: {e}")
+                    return
+                # Items already shown cannot be replaced
+                raise
+            # Otherwise answer without the LLM, as the graph node does
+            for recommendation in self.degraded_recommendations(user_input, candidates, e).recommendations:
+                yield recommendation
+            return
+        finally:
+            if breaker and probe is not None:
+                breaker.release(probe)
+
+        logger.info(f"Streamed {len(received)} recommendations from LLM")
+        if cache is not None and received:
+            await cache.aput(user_input, BookRecommendations(recommendations=received))
+
+    @traceable(name="process_book_recommendations")
+    def process_response(self, response) -> BookRecommendations:
+        """Validate a ``recommend_books`` response in a single parse (see ``BaseAgent.process_response``)."""
+        return super().process_response(response)
 
     def create_workflow(self) -> StateGraph:
         """Create and configure the book recommendation workflow."""
         # Create fresh workflow instead of inheriting from base
         workflow = StateGraph(BookState)
 
-        def recommend_books(state: BookState) -> BookState:
+        async def recommend_books(state: BookState) -> BookState:
             """Generate book recommendations based on user input."""
             logger.info("Starting book recommendation process")
             messages = state.messages
             user_input = state.input
             logger.info(f"Processing request with input: {user_input}")
 
-            # Use the pre-created chain
-            logger.info("Invoking LLM chain for recommendations")
-            result = self._chain.invoke({
-                "messages": messages,
-                "input": user_input
-            })
-            logger.info(f"Raw output from LLM: {result}")
+            # Follow-up turns depend on the conversation, so only cache fresh queries
+            cache = self.cache if not messages else None
+            # With a catalog, retrieve_candidates already looked the query up before searching
+            result = await cache.aget(user_input) if cache is not None and self.catalog is None else None
+            if result is not None:
+                logger.info("Serving book recommendations from response cache")
+            else:
+                candidates = state.candidates
+                if candidates:
+                    # The LLM only picks and explains; book details come from the catalog
+                    logger.info(f"Invoking LLM chain to rank {len(candidates)} catalog candidates")
+                    chain = self._rank_llm_chain | (lambda response: self.process_ranking(response, candidates))
+                    inputs = {
+                        "messages": messages,
+                        "input": user_input,
+                        "candidates": self.format_candidates(candidates)
+                    }
+                else:
+                    # Use the pre-created chain
+                    logger.info("Invoking LLM chain for recommendations")
+                    chain = self._chain
+                    inputs = {"messages": messages, "input": user_input}
+                try:
+                    result = await self.with_deadline(
+                        self.ainvoke_with_retry(chain, inputs), config.BOOK_NODE_TIMEOUT_SECONDS, "recommend_books"
+                    )
+                except (LLMCallError, asyncio.TimeoutError) as e:
+                    # Overloaded, down or too slow: degraded results are better than an error
+                    result = self.degraded_recommendations(user_input, candidates, e)
+                else:
+                    if cache is not None and isinstance(result, BookRecommendations):
+                        await cache.aput(user_input, result)
+            # Lazy formatting: rendering the full result is only worth it when debugging
+            logger.debug("Raw output from LLM: %s", result)
             logger.info(f"Received {len(result.recommendations)} recommendations from LLM")
 
             # Update the state with recommendations
             new_state = BookState(
                 messages=messages, 
                 input=user_input, 
-                recommendations=[rec.model_dump() for rec in result.recommendations]
+                recommendations=result.recommendations
             )
             logger.info("Updated state with new recommendations")
             return new_state
 
+        async def retrieve_candidates(state: BookState) -> BookState:
+            """Retrieve catalog candidates, answering directly from the cache or when retrieval is confident."""
+            # A cache hit needs no catalog search (nor the query embedding it may cost)
+            cache = self.cache if not state.messages else None
+            cached = await cache.aget(state.input) if cache is not None else None
+            if cached is not None:
+                logger.info("Serving book recommendations from response cache")
+                return BookState(messages=state.messages, input=state.input, recommendations=cached.recommendations)
+            candidates = await self.aretrieve_candidates(state.input, state.messages)
+            # Refinements need the LLM to interpret them against the earlier results
+            fast = self.fast_path_recommendations(candidates) if not state.messages else None
+            return BookState(
+                messages=state.messages,
+                input=state.input,
+                candidates=candidates,
+                recommendations=fast.recommendations if fast else []
+            )
+
         workflow.add_node("recommend_books", recommend_books)
-        workflow.set_entry_point("recommend_books")
+        if self.catalog is not None:
+            workflow.add_node("retrieve_candidates", retrieve_candidates)
+            workflow.set_entry_point("retrieve_candidates")
+            workflow.add_conditional_edges(
+                "retrieve_candidates",
+                lambda state: END if state.recommendations else "recommend_books"
+            )
+        else:
+            workflow.set_entry_point("recommend_books")
         workflow.add_edge("recommend_books", END)
         return workflow
 
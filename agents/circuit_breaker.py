@@ -0,0 +1,223 @@
+"""Circuit breaker around upstream LLM calls.
+
+During a provider incident every call would otherwise wait out its retries
+and deadline before failing. The breaker watches the outcome of recent LLM
+attempts and trips when too many fail or are too slow. While it is open,
+calls fail immediately with ``CircuitOpenError``, and the agents answer from
+precomputed fallback recommendations (``catalog/fallback.py``) within
+milliseconds.
+
+After ``CIRCUIT_OPEN_SECONDS`` the breaker turns half-open and lets a few
+probe calls through. If ``CIRCUIT_HALF_OPEN_PROBES`` probes succeed in a row
+it closes again; any failed probe reopens it for another period.
+
+Only failures that point at the provider count: rate limits, timeouts and
+server errors. Invalid responses and request errors do not trip the breaker.
+"""
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional, Tuple
+
+import config
+from utils import logger
+from .instrumentation import CIRCUIT_REJECTED, CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+from .retry import ErrorKind, LLMCallError, classify_error
+
+# Error kinds that indicate an unhealthy provider rather than a bad request or response
+TRIPPING_KINDS = frozenset({ErrorKind.RATE_LIMIT, ErrorKind.TIMEOUT, ErrorKind.SERVER})
+
+
+class CircuitState(str, Enum):
+    """Breaker states; the gauge value is the position in this list."""
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(LLMCallError):
+    """Raised instead of calling the LLM while the circuit is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(
+            f"LLM calls are suspended after repeated failures; retrying in {retry_in:.0f}s",
+            ErrorKind.SERVER,
+            attempts=0
+        )
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Error-rate and slow-call breaker over a sliding window of recent LLM attempts."""
+
+    def __init__(self,
+                 name: str,
+                 window_size: int,
+                 min_calls: int,
+                 error_rate: float,
+                 slow_call_seconds: float,
+                 slow_call_rate: float,
+                 open_seconds: float,
+                 half_open_probes: int):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Label for logs and metrics
+            window_size: Recent attempts considered
+            min_calls: Attempts needed in the window before the breaker may trip
+            error_rate: Failure fraction that trips the breaker
+            slow_call_seconds: Attempts taking longer than this count as slow; 0 disables
+            slow_call_rate: Slow fraction that trips the breaker
+            open_seconds: Time spent open before probing
+            half_open_probes: Consecutive successful probes needed to close
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        # (failed, slow) per recent attempt
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, breaker=name)
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state; an open breaker whose wait has passed reports half-open."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is self._state:
+            return
+        logger.warning(f"Circuit {self.name} {self._state.value} -> {state.value}")
+        self._state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], breaker=self.name)
+        CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state.value)
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state is CircuitState.HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        else:
+            self._window.clear()
+
+    def _maybe_half_open(self) -> None:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(CircuitState.HALF_OPEN)
+
+    def acquire(self) -> bool:
+        """
+        Ask to make one LLM attempt.
+
+        Returns:
+            True if the attempt is a half-open probe, whose outcome decides the state
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with enough probes in flight
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state is CircuitState.CLOSED:
+                return False
+            if self._state is CircuitState.HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        CIRCUIT_REJECTED.inc(breaker=self.name)
+        raise CircuitOpenError(retry_in)
+
+    def record(self, probe: bool, error: Optional[BaseException] = None, seconds: Optional[float] = None) -> None:
+        """
+        Record the outcome of an attempt allowed by ``acquire``.
+
+        Args:
+            probe: The value ``acquire`` returned
+            error: The exception the attempt raised, if any
+            seconds: Duration of a successful attempt
+        """
+        failed = error is not None and _trips(error)
+        if error is not None and not failed and not probe:
+            # Not the provider's fault; leave the statistics alone
+            return
+        slow = bool(self.slow_call_seconds) and seconds is not None and seconds > self.slow_call_seconds
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state is not CircuitState.HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._transition(CircuitState.OPEN)
+                elif error is None:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CircuitState.CLOSED)
+                return
+            if self._state is not CircuitState.CLOSED:
+                return
+            self._window.append((failed, slow))
+            calls = len(self._window)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for failed_call, _ in self._window if failed_call)
+            slow_calls = sum(1 for _, slow_call in self._window if slow_call)
+            too_slow = bool(self.slow_call_seconds) and slow_calls / calls >= self.slow_call_rate
+            if failures / calls >= self.error_rate or too_slow:
+                logger.error(
+                    f"Circuit {self.name} tripped: {failures}/{calls} failed, {slow_calls}/{calls} slow"
+                )
+                self._transition(CircuitState.OPEN)
+
+    def release(self, probe: bool) -> None:
+        """Give back a probe whose attempt was abandoned without an outcome, e.g. cancelled."""
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def reset(self) -> None:
+        """Close the breaker and forget recent outcomes."""
+        with self._lock:
+            self._transition(CircuitState.CLOSED)
+            self._window.clear()
+
+
+def _trips(error: BaseException) -> bool:
+    kind = error.kind if isinstance(error, LLMCallError) else classify_error(error)
+    return kind in TRIPPING_KINDS
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Return the process-wide LLM circuit breaker, or None when it is disabled."""
+    global _breaker
+    if not config.CIRCUIT_BREAKER_ENABLED:
+        return None
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                name="llm",
+                window_size=config.CIRCUIT_WINDOW_SIZE,
+                min_calls=config.CIRCUIT_MIN_CALLS,
+                error_rate=config.CIRCUIT_ERROR_RATE,
+                slow_call_seconds=config.CIRCUIT_SLOW_CALL_SECONDS,
+                slow_call_rate=config.CIRCUIT_SLOW_CALL_RATE,
+                open_seconds=config.CIRCUIT_OPEN_SECONDS,
+                half_open_probes=config.CIRCUIT_HALF_OPEN_PROBES
+            )
+        return _breaker
@@ -0,0 +1,172 @@
+"""Bounded conversation history for multi-turn book recommendations.
+
+A ``Conversation`` records the user's requests and the books returned for them
+so follow-ups such as "more like the second one but darker" can refine the
+previous results instead of starting over. History is kept compact:
+- recommendations are remembered as numbered titles and authors, not full descriptions
+- the most recent turns are kept verbatim within a token budget
+- older turns are folded into a short summary of earlier requests and already
+  recommended titles, itself capped in size
+"""
+
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional
+
+import config
+from models import BookRecommendation
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the tokens in a text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def messages_key(messages: List[Dict[str, str]]) -> str:
+    """Return a short stable digest of a message list, e.g. for request coalescing keys."""
+    payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Turn:
+    """One message of the conversation."""
+    role: str
+    content: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.content)
+
+
+class Conversation:
+    """Per-session history of book requests and compact recommendation lists."""
+
+    def __init__(self, token_budget: Optional[int] = None, summary_tokens: Optional[int] = None):
+        """
+        Create an empty conversation.
+
+        Args:
+            token_budget: Tokens of recent turns kept verbatim; defaults to CONVERSATION_TOKEN_BUDGET
+            summary_tokens: Size cap of the summary of older turns; defaults to CONVERSATION_SUMMARY_TOKENS
+        """
+        self.token_budget = token_budget if token_budget is not None else config.CONVERSATION_TOKEN_BUDGET
+        self.summary_tokens = summary_tokens if summary_tokens is not None else config.CONVERSATION_SUMMARY_TOKENS
+        self.turns: List[Turn] = []
+        self._earlier_requests: Deque[str] = deque()
+        self._earlier_titles: Deque[str] = deque()
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Dict[str, str]]) -> "Conversation":
+        """
+        Rebuild a conversation from turns supplied by a client, e.g. through the HTTP API.
+
+        Older turns are folded into the summary exactly as if they had been
+        recorded one exchange at a time, so the same budgets apply.
+
+        Args:
+            messages: User and assistant turns, oldest first
+        """
+        conversation = cls()
+        conversation.turns = [Turn(message["role"], message["content"]) for message in messages]
+        conversation._fold_until(
+            conversation.turns, conversation._earlier_requests, conversation._earlier_titles, conversation.token_budget
+        )
+        return conversation
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def reset(self) -> None:
+        """Forget every turn and the summary."""
+        self.turns.clear()
+        self._earlier_requests.clear()
+        self._earlier_titles.clear()
+
+    @staticmethod
+    def format_recommendations(recommendations: Iterable[BookRecommendation]) -> str:
+        """Render recommendations as the numbered title list remembered for later turns."""
+        lines = [f"{i}. {book.title} by {book.author}" for i, book in enumerate(recommendations, 1)]
+        return "Recommended:\n" + "\n".join(lines)
+
+    def add_exchange(self, user_input: str, recommendations: Iterable[BookRecommendation]) -> None:
+        """
+        Record a request and the books returned for it, then enforce the budget.
+
+        Args:
+            user_input: The user's request
+            recommendations: Books returned for it
+        """
+        recommendations = list(recommendations)
+        self.turns.append(Turn("user", user_input))
+        self.turns.append(Turn("assistant", self.format_recommendations(recommendations)))
+        self._fold_until(self.turns, self._earlier_requests, self._earlier_titles, self.token_budget)
+
+    def _fold_until(self, turns: List[Turn], requests: Deque[str], titles: Deque[str], budget: int) -> None:
+        # Move the oldest exchanges into the summary until the verbatim turns fit;
+        # a request and its answer are folded together so no turn is left orphaned
+        while turns and sum(turn.tokens for turn in turns) > budget:
+            exchange = [turns.pop(0)]
+            if turns and turns[0].role == "assistant":
+                exchange.append(turns.pop(0))
+            for turn in exchange:
+                if turn.role == "user":
+                    requests.append(turn.content)
+                else:
+                    titles.extend(line.split(". ", 1)[-1] for line in turn.content.splitlines()[1:])
+        self._cap_summary(requests, titles)
+
+    def _cap_summary(self, requests: Deque[str], titles: Deque[str]) -> None:
+        # Oldest facts go first once the summary outgrows its cap
+        while (requests or titles) and estimate_tokens(self._render_summary(requests, titles)) > self.summary_tokens:
+            if len(requests) >= len(titles) and requests:
+                requests.popleft()
+            else:
+                titles.popleft()
+
+    @staticmethod
+    def _render_summary(requests: Iterable[str], titles: Iterable[str]) -> str:
+        parts = []
+        requests, titles = list(requests), list(titles)
+        if requests:
+            parts.append("Earlier requests: " + " | ".join(requests))
+        if titles:
+            parts.append("Already recommended: " + "; ".join(titles))
+        return "\n".join(parts)
+
+    def messages(self, token_budget: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Return the history as chat messages for the ``messages`` prompt placeholder.
+
+        Args:
+            token_budget: Cap on the tokens of the returned messages; older turns
+                are folded into the summary until they fit. Defaults to the
+                conversation's own budget plus its summary cap.
+
+        Returns:
+            A summary message (if anything was folded) followed by recent turns
+        """
+        if token_budget is None:
+            token_budget = self.token_budget + self.summary_tokens
+        turns = list(self.turns)
+        requests, titles = deque(self._earlier_requests), deque(self._earlier_titles)
+        self._fold_until(turns, requests, titles, max(0, token_budget - self.summary_tokens))
+
+        messages = []
+        summary = self._render_summary(requests, titles)
+        if summary and estimate_tokens(summary) <= token_budget:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation:\n" + summary})
+        messages.extend({"role": turn.role, "content": turn.content} for turn in turns)
+        return messages
+
+    def prompt_messages(self, user_input: str) -> List[Dict[str, str]]:
+        """History to send with ``user_input``, keeping the pair within CONVERSATION_MAX_PROMPT_TOKENS."""
+        if not self.turns and not self._earlier_requests and not self._earlier_titles:
+            return []
+        budget = min(
+            self.token_budget + self.summary_tokens,
+            config.CONVERSATION_MAX_PROMPT_TOKENS - estimate_tokens(user_input)
+        )
+        return self.messages(budget) if budget > 0 else []
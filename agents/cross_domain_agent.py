@@ -1,18 +1,27 @@
-from typing import Dict, Optional
+import asyncio
+import json
+from typing import Dict, List, Optional
+from functools import cached_property
 from langgraph.graph import StateGraph, END
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
-from models import CrossDomainRecommendation
+from models import BookRecommendation, CrossDomainRecommendation
 from utils import logger
-from config import CROSS_DOMAIN_SCHEMA
+import config
+from config import BATCH_CROSS_DOMAIN_SCHEMA, CROSS_DOMAIN_SCHEMA
+from .admission import AdmissionRejected
 from .base_agent import BaseAgent
+from .circuit_breaker import TRIPPING_KINDS
+from .instrumentation import FALLBACK_RESPONSES, VALIDATION_FAILURES
+from .retry import LLMCallError
+from .persistent_cache import PersistentCache, book_identity_key, open_persistent_cache
 
 class CrossDomainState(BaseModel):
     """State model for cross-domain recommendations."""
-    selected_book: Dict[str, str]
+    selected_book: BookRecommendation
     retry_count: int = 0
     error: Optional[str] = None
-    cross_domain_recommendations: Optional[Dict] = None
+    cross_domain_recommendations: Optional[CrossDomainRecommendation] = None
     status: Optional[str] = None
 
 class CrossDomainAgent(BaseAgent):
@@ -36,6 +45,16 @@ class CrossDomainAgent(BaseAgent):
             function_name="recommend_cross_domain",
             system_prompt=system_prompt
         )
+        # Build the chains once; retries reuse them
+        self._chain = self.create_chain()
+        self._batch_chain = self.create_batch_chain()
+
+    @cached_property
+    def cache(self) -> Optional[PersistentCache]:
+        """Persistent result cache keyed by book identity, if enabled."""
+        if not config.CROSS_DOMAIN_CACHE_PATH:
+            return None
+        return open_persistent_cache(config.CROSS_DOMAIN_CACHE_PATH)
 
     def create_chain(self):
         """Create the processing chain for cross-domain recommendations."""
@@ -48,11 +67,176 @@ class CrossDomainAgent(BaseAgent):
         Please recommend related content that shares themes with this book."""
 
         prompt = self.create_prompt(human_template)
-        return (
-            prompt
-            | self.llm.bind(functions=[CROSS_DOMAIN_SCHEMA], function_call={"name": "recommend_cross_domain"})
-            | self.process_response
-        )
+        return prompt | self.bind_function(CROSS_DOMAIN_SCHEMA) | self.process_response
+
+    def create_batch_chain(self):
+        """Create the processing chain generating recommendations for several books at once."""
+        human_template = """Here are the books to base recommendations on:
+        {books}
+
+        For EACH book, recommend one movie, one game and one song that share its themes.
+        Return one result per book and set book_index to the book's number in the list."""
+
+        prompt = self.create_prompt(human_template)
+        return prompt | self.bind_function(BATCH_CROSS_DOMAIN_SCHEMA) | self.process_batch_response
+
+    def process_batch_response(self, response) -> List[Dict]:
+        """
+        Extract the raw per-book items from a batched response.
+
+        Items are validated individually by the caller so one bad item does
+        not discard the rest of the batch.
+
+        Raises:
+            ValueError: If the response carries no parseable function call
+        """
+        function_call = response.additional_kwargs.get("function_call") or {}
+        try:
+            args = json.loads(function_call.get("arguments") or "{}")
+        except json.JSONDecodeError as e:
+            raise ValueError("Invalid JSON format in batched response") from e
+        results = args.get("results")
+        if not isinstance(results, list):
+            raise ValueError("Batched response is missing the results array")
+        return results
+
+    def query_complexity(self, inputs: Dict) -> float:
+        """
+        Score a cross-domain request for model routing.
+
+        One movie/game/song triple is a simple task for a small model. Batched
+        requests grow harder with the number of books in a single response.
+        """
+        if "books" in inputs:
+            return min(1.0, 0.1 * (inputs["books"].count("\n[") + 1))
+        return 0.2
+
+    @staticmethod
+    def _book_inputs(book: BookRecommendation) -> Dict[str, str]:
+        return {"title": book.title, "author": book.author, "genre": book.genre, "description": book.description}
+
+    @staticmethod
+    def _cache_key(book: BookRecommendation) -> str:
+        # Results depend on the models that may answer, so switching either one starts afresh
+        models = config.MODEL_NAME
+        if config.MODEL_ROUTING_ENABLED:
+            models += f"+{config.SMALL_MODEL_NAME}"
+        return book_identity_key(book, namespace=f"cross_domain:v1:{models}")
+
+    def _cached(self, book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+        cached = self.cache.get(self._cache_key(book)) if self.cache is not None else None
+        # Entries are only written after validation, so they are rebuilt without validating again
+        return CrossDomainRecommendation.model_construct(**cached) if cached is not None else None
+
+    def _store(self, book: BookRecommendation, result: CrossDomainRecommendation) -> None:
+        if self.cache is not None:
+            self.cache.put(self._cache_key(book), result.model_dump())
+
+    async def arecommend(self, book: BookRecommendation) -> CrossDomainRecommendation:
+        """
+        Generate (or fetch from cache) recommendations for one book.
+
+        Args:
+            book: Book to base the recommendations on
+
+        Returns:
+            Validated movie/game/song recommendations
+        """
+        cached = self._cached(book)
+        if cached is not None:
+            logger.info("Serving cross-domain recommendations from persistent cache")
+            return cached
+        result = await self.ainvoke_with_retry(self._chain, self._book_inputs(book))
+        self._store(book, result)
+        return result
+
+    @staticmethod
+    def fallback_recommendation(book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+        """
+        Return the precomputed movie/game/song picks for a book's genre (see ``catalog/fallback.py``).
+
+        Fallback results are flagged with ``is_fallback`` and never cached, so
+        the book gets a real answer once the LLM recovers.
+
+        Returns:
+            The fallback triple, or None if fallbacks are disabled or unavailable
+        """
+        if not config.FALLBACK_ENABLED:
+            return None
+        from catalog.fallback import get_fallback_index
+        index = get_fallback_index()
+        result = index.cross_domain_for(book) if index is not None else None
+        if result is not None:
+            FALLBACK_RESPONSES.inc(kind="cross_domain")
+        return result
+
+    async def arecommend_batch(self, books: List[BookRecommendation]) -> List[Optional[CrossDomainRecommendation]]:
+        """
+        Generate recommendations for several books with a single LLM call.
+
+        Cached books are answered without calling the LLM. Items missing from
+        the batched response or failing validation are retried one by one. If
+        the batched call itself failed with a rate-limit, timeout or server
+        error, nothing is retried and the uncached books get None.
+
+        Args:
+            books: Books to base the recommendations on
+
+        Returns:
+            Recommendations aligned with ``books``; None where generation failed
+        """
+        results: List[Optional[CrossDomainRecommendation]] = [None] * len(books)
+        pending = []
+        for index, book in enumerate(books):
+            cached = self._cached(book)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+
+        if len(pending) > 1:
+            listing = "\n".join(
+                f"[{position}] Title: {books[index].title} | Author: {books[index].author} | "
+                f"Genre: {books[index].genre} | Description: {books[index].description}"
+                for position, index in enumerate(pending)
+            )
+            try:
+                items = await self.ainvoke_with_retry(self._batch_chain, {"books": listing})
+            except Exception as e:
+                if isinstance(e, LLMCallError) and e.kind in TRIPPING_KINDS:
+                    # The provider is struggling; per-book calls would multiply the load by the batch size
+                    logger.error(f"Batched cross-domain request failed, not retrying per book: {e}")
+                    return results
+                logger.error(f"Batched cross-domain request failed, retrying per book: {e}")
+                items = []
+
+            for item in items:
+                position = item.get("book_index") if isinstance(item, dict) else None
+                if not isinstance(position, int) or not 0 <= position < len(pending):
+                    continue
+                try:
+                    recommendation = self.schema.model_validate(item)
+                except ValidationError as e:
+                    VALIDATION_FAILURES.inc(agent=self.__class__.__name__)
+                    logger.warning(f"Invalid batched item for book {position}: {e}")
+                    continue
+                index = pending[position]
+                results[index] = recommendation
+                self._store(books[index], recommendation)
+
+        retry = [index for index in pending if results[index] is None]
+        if retry:
+            logger.info(f"Generating cross-domain recommendations individually for {len(retry)} books")
+            outcomes = await asyncio.gather(
+                *(self.arecommend(books[index]) for index in retry),
+                return_exceptions=True
+            )
+            for index, outcome in zip(retry, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Cross-domain generation failed for {books[index].title}: {outcome}")
+                else:
+                    results[index] = outcome or None
+        return results
 
     @property
     def state_schema(self) -> BaseModel:
@@ -63,14 +247,14 @@ class CrossDomainAgent(BaseAgent):
         """Validate the input state has required book information."""
         selected_book = state.selected_book
         required_fields = ["title", "author", "genre", "description"]
-        return all(selected_book.get(field) for field in required_fields)
+        return all(getattr(selected_book, field) for field in required_fields)
 
     def create_workflow(self) -> StateGraph:
         """Create and configure the cross-domain recommendation workflow."""
         workflow = StateGraph(CrossDomainState)
 
         # Entry point node for initial state validation
-        def recommend_cross_domain_entry(state: CrossDomainState) -> CrossDomainState:
+        async def recommend_cross_domain_entry(state: CrossDomainState) -> CrossDomainState:
             """Validate input state before processing."""
             if not self.validate_input_state(state):
                 logger.error("Invalid input state: missing required book information")
@@ -79,35 +263,44 @@ class CrossDomainAgent(BaseAgent):
             state.retry_count = 0
             return state
 
-        # Main processing node with retry logic
-        def recommend_related_content(state: CrossDomainState) -> CrossDomainState:
-            """Generate cross-domain recommendations with retry logic."""
+        # Main processing node; retries with backoff happen inside ainvoke_with_retry
+        async def recommend_related_content(state: CrossDomainState) -> CrossDomainState:
+            """Generate cross-domain recommendations."""
             if state.error:
                 return state
 
-            if state.retry_count >= 3:
-                logger.error("Max retries reached for cross-domain recommendations")
-                state.error = "Failed to generate recommendations after 3 attempts"
-                return state
-
             try:
-                selected_book = state.selected_book
-                chain = self.create_chain()
-                result = chain.invoke({
-                    "title": selected_book["title"],
-                    "author": selected_book["author"],
-                    "genre": selected_book["genre"],
-                    "description": selected_book["description"]
-                })
-                state.cross_domain_recommendations = result
+                state.cross_domain_recommendations = await self.with_deadline(
+                    self.arecommend(state.selected_book),
+                    config.CROSS_DOMAIN_NODE_TIMEOUT_SECONDS,
+                    "recommend_related"
+                )
+                return state
+            except asyncio.TimeoutError:
+                fallback = self.fallback_recommendation(state.selected_book)
+                if fallback is not None:
+                    logger.warning("Cross-domain LLM call timed out; serving fallback recommendations")
+                    state.cross_domain_recommendations = fallback
+                    return state
+                state.error = f"Timed out after {config.CROSS_DOMAIN_NODE_TIMEOUT_SECONDS:g}s"
+                return state
+            except LLMCallError as e:
+                # A busy service stays an error so prefetches are retried later rather than filled with fallbacks
+                fallback = None if isinstance(e, AdmissionRejected) else self.fallback_recommendation(state.selected_book)
+                if fallback is not None:
+                    logger.warning(f"Cross-domain LLM call failed ({e}); serving fallback recommendations")
+                    state.cross_domain_recommendations = fallback
+                    return state
+                state.retry_count = e.attempts
+                state.error = f"Failed to generate recommendations after {e.attempts} attempt(s): {e.kind.value}"
                 return state
             except Exception as e:
                 logger.error(f"Error generating recommendations: {str(e)}")
-                state.retry_count += 1
+                state.error = f"Failed to generate recommendations: {str(e)}"
                 return state
 
         # Error handling node
-        def handle_error(state: CrossDomainState) -> CrossDomainState:
+        async def handle_error(state: CrossDomainState) -> CrossDomainState:
             """Process errors and prepare final error state."""
             if state.error:
                 logger.error(f"Final error state: {state.error}")
@@ -131,14 +324,9 @@ class CrossDomainAgent(BaseAgent):
 
         workflow.add_conditional_edges(
             "recommend_related",
-            lambda state: (
-                END if state.cross_domain_recommendations
-                else "handle_error" if state.error or state.retry_count >= 3
-                else "recommend_related"
-            ),
+            lambda state: END if state.cross_domain_recommendations else "handle_error",
             {
                 "handle_error": "handle_error",
-                "recommend_related": "recommend_related",
                 END: END
             }
         )
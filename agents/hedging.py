@@ -0,0 +1,176 @@
+"""Hedged LLM calls for tail-latency control.
+
+A call that has not finished by the recently observed latency quantile
+(``HEDGE_QUANTILE``, p90 by default) is usually stuck behind a slow upstream
+replica rather than doing more work. The ``Hedger`` then fires a second,
+identical request and keeps whichever valid result arrives first, cancelling
+the other.
+
+Hedges cost extra LLM calls, so they are paid from a budget. Every call adds
+``HEDGE_MAX_RATE`` to it and every hedge spends one, so at most that fraction
+of calls (plus a small burst) is ever duplicated.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import config
+from .instrumentation import HEDGED_REQUESTS, HEDGES_SKIPPED
+
+T = TypeVar("T")
+
+# Latency samples kept per agent and tier
+_WINDOW = 200
+# Hedges that may be spent at once before the budget has to refill
+_BUDGET_BURST = 5.0
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, window: int = _WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile of the window, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class HedgeBudget:
+    """Token budget capping the fraction of calls that are hedged."""
+
+    def __init__(self, burst: float = _BUDGET_BURST):
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self, rate: float) -> None:
+        """Credit one call's share of the hedge allowance."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + rate)
+
+    def withdraw(self) -> bool:
+        """Spend one hedge if the budget allows it."""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class Hedger:
+    """Runs calls with an optional hedge after the observed latency quantile."""
+
+    def __init__(self):
+        self._trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+        self._budget = HedgeBudget()
+        self._lock = threading.Lock()
+
+    def tracker(self, agent: str, tier: str) -> LatencyTracker:
+        """Return the latency window for an agent and model tier."""
+        with self._lock:
+            tracker = self._trackers.get((agent, tier))
+            if tracker is None:
+                tracker = self._trackers[(agent, tier)] = LatencyTracker()
+            return tracker
+
+    def hedge_delay(self, agent: str, tier: str) -> Optional[float]:
+        """Return how long to wait before hedging, or None if hedging is off or has too little data."""
+        if not config.HEDGING_ENABLED:
+            return None
+        tracker = self.tracker(agent, tier)
+        if len(tracker) < config.HEDGE_MIN_SAMPLES:
+            return None
+        return tracker.quantile(config.HEDGE_QUANTILE)
+
+    async def run(self,
+                  agent: str,
+                  tier: str,
+                  call: Callable[[], Awaitable[T]],
+                  before_hedge: Optional[Callable[[], Awaitable[object]]] = None) -> T:
+        """
+        Await ``call()``, firing a second ``call()`` if the first one is slow.
+
+        Args:
+            agent: Name of the calling agent, for latency tracking and metrics
+            tier: Model tier serving the call
+            call: Zero-argument coroutine function performing one complete attempt,
+                including response validation
+            before_hedge: Awaited before the hedge is sent, e.g. to reserve rate-limit quota
+
+        Returns:
+            The first successful result
+
+        Raises:
+            Exception: The primary call's error if every launched call failed
+        """
+        self._budget.deposit(config.HEDGE_MAX_RATE)
+        delay = self.hedge_delay(agent, tier)
+        tracker = self.tracker(agent, tier)
+        if delay is None:
+            start = time.perf_counter()
+            result = await call()
+            tracker.record(time.perf_counter() - start)
+            return result
+
+        primary = asyncio.ensure_future(call())
+        started = {primary: time.perf_counter()}
+        try:
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if not done:
+                if self._budget.withdraw():
+                    if before_hedge is not None:
+                        await before_hedge()
+                    hedge = asyncio.ensure_future(call())
+                    started[hedge] = time.perf_counter()
+                else:
+                    HEDGES_SKIPPED.inc(agent=agent)
+
+            errors = {}
+            pending = set(started)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                        continue
+                    tracker.record(time.perf_counter() - started[task])
+                    if len(started) > 1:
+                        HEDGED_REQUESTS.inc(agent=agent, winner="primary" if task is primary else "hedge")
+                    return task.result()
+            if len(started) > 1:
+                HEDGED_REQUESTS.inc(agent=agent, winner="none")
+            raise errors.get(primary) or next(iter(errors.values()))
+        finally:
+            # The loser (or both calls, if the caller was cancelled) must not keep running
+            for task in started:
+                if not task.done():
+                    task.cancel()
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """Return the process-wide hedger."""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger()
+        return _hedger
@@ -0,0 +1,251 @@
+"""Process-wide HTTP clients shared by every OpenAI model and embedding client.
+
+Left to themselves, each ``ChatOpenAI`` and ``OpenAIEmbeddings`` instance opens
+its own connection pool, so every model tier, agent and graph rebuild pays for
+new TCP and TLS handshakes. Here one sync and one async ``httpx`` client are
+shared by all of them, with pool sizes, keep-alive and timeouts taken from
+config. HTTP/2 is used when the ``h2`` package is installed, so concurrent
+calls are multiplexed over one connection.
+
+Async connections belong to the event loop that opened them, while this
+process may run several loops (the shared background loop, uvicorn's loop,
+``asyncio.run`` in batch jobs). The async client therefore keeps one
+connection pool per running loop behind a single ``httpx.AsyncClient``.
+
+Both clients record requests, new connections, TLS handshakes and pool usage
+in the metrics registry.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+import config
+from utils import logger
+from .instrumentation import HTTP_CONNECTIONS_OPENED, HTTP_POOL_CONNECTIONS, HTTP_REQUESTS, HTTP_TLS_HANDSHAKES
+
+SYNC = "sync"
+ASYNC = "async"
+
+
+def http2_available() -> bool:
+    """Return True if HTTP/2 is enabled and the ``h2`` package is installed."""
+    if not config.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool_limits() -> httpx.Limits:
+    """Return the connection pool limits from config."""
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+
+
+def request_timeout() -> httpx.Timeout:
+    """
+    Return the timeout applied to each LLM HTTP request.
+
+    ``LLM_REQUEST_TIMEOUT_SECONDS`` bounds reads, writes and pool waits (0 means
+    no limit); connecting gets its own, shorter ``HTTP_CONNECT_TIMEOUT_SECONDS``.
+    """
+    total = config.LLM_REQUEST_TIMEOUT_SECONDS or None
+    connect = config.HTTP_CONNECT_TIMEOUT_SECONDS or None
+    if total is not None and connect is not None:
+        connect = min(connect, total)
+    return httpx.Timeout(total, connect=connect)
+
+
+def _pool_states(pools: List[Any]) -> Dict[str, int]:
+    # httpcore exposes its connections only through the transport's private pool
+    active = idle = 0
+    for pool in pools:
+        for connection in list(getattr(pool, "connections", ())):
+            if connection.is_idle():
+                idle += 1
+            else:
+                active += 1
+    return {"active": active, "idle": idle}
+
+
+def _record_pool(client: str, pools: List[Any]) -> None:
+    for state, count in _pool_states(pools).items():
+        HTTP_POOL_CONNECTIONS.set(count, client=client, state=state)
+
+
+class _SyncStream(httpx.SyncByteStream):
+    # Calls back once the body is consumed, when the connection returns to the pool
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class _AsyncStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+def _trace_event(client: str, event: str) -> None:
+    if event == "connection.connect_tcp.complete":
+        HTTP_CONNECTIONS_OPENED.inc(client=client)
+    elif event == "connection.start_tls.complete":
+        HTTP_TLS_HANDSHAKES.inc(client=client)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Sync transport recording connection reuse and pool usage."""
+
+    def __init__(self, **transport_options: Any):
+        self._transport = httpx.HTTPTransport(**transport_options)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        HTTP_REQUESTS.inc(client=SYNC)
+        outer: Optional[Callable] = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            _trace_event(SYNC, event)
+            if outer is not None:
+                outer(event, info)
+
+        request.extensions["trace"] = trace
+
+        def record() -> None:
+            _record_pool(SYNC, [getattr(self._transport, "_pool", None)])
+
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            record()
+            raise
+        record()
+        response.stream = _SyncStream(response.stream, record)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class PerLoopAsyncTransport(httpx.AsyncBaseTransport):
+    """Async transport keeping one instrumented connection pool per running event loop."""
+
+    def __init__(self, **transport_options: Any):
+        self._options = transport_options
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            with self._lock:
+                transport = self._transports.get(loop)
+                if transport is None:
+                    transport = httpx.AsyncHTTPTransport(**self._options)
+                    self._transports[loop] = transport
+        return transport
+
+    def _pools(self) -> List[Any]:
+        with self._lock:
+            return [getattr(transport, "_pool", None) for transport in self._transports.values()]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        HTTP_REQUESTS.inc(client=ASYNC)
+        outer: Optional[Callable] = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            _trace_event(ASYNC, event)
+            if outer is not None:
+                await outer(event, info)
+
+        request.extensions["trace"] = trace
+
+        def record() -> None:
+            _record_pool(ASYNC, self._pools())
+
+        try:
+            response = await self._transport().handle_async_request(request)
+        except Exception:
+            record()
+            raise
+        record()
+        response.stream = _AsyncStream(response.stream, record)
+        return response
+
+    async def aclose(self) -> None:
+        # Connections of other loops can only be closed from those loops; they go with the loop
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_sync_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def _transport_options() -> Dict[str, Any]:
+    http2 = http2_available()
+    if config.HTTP2_ENABLED and not http2:
+        logger.info("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1 keep-alive")
+    return {"http2": http2, "limits": pool_limits()}
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide sync client used by OpenAI model and embedding clients."""
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(
+                    transport=InstrumentedTransport(**_transport_options()),
+                    timeout=request_timeout(),
+                    follow_redirects=True
+                )
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async client used by OpenAI model and embedding clients."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(
+                    transport=PerLoopAsyncTransport(**_transport_options()),
+                    timeout=request_timeout(),
+                    follow_redirects=True
+                )
+    return _async_client
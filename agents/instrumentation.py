@@ -0,0 +1,196 @@
+"""Latency, token and reliability metrics for the agent workflows.
+
+``MetricsCallbackHandler`` is attached to both compiled graphs and to every
+agent's LLM client. It records per-node wall time, LLM time-to-first-token and
+total latency, and prompt (including provider-cached) and completion token
+usage. Retries, cache lookups and
+validation failures are counted directly by the code that handles them.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import counter, gauge, histogram
+
+NODE_DURATION = histogram(
+    "graph_node_duration_seconds", "Wall time spent in a LangGraph node", ["node", "status"]
+)
+LLM_TIME_TO_FIRST_TOKEN = histogram(
+    "llm_time_to_first_token_seconds", "Time from LLM request to first streamed token", ["agent", "model"]
+)
+LLM_DURATION = histogram(
+    "llm_request_duration_seconds", "Total LLM request latency", ["agent", "model", "status"]
+)
+LLM_PROMPT_TOKENS = counter("llm_prompt_tokens_total", "Prompt tokens sent to the LLM", ["agent", "model"])
+LLM_CACHED_PROMPT_TOKENS = counter(
+    "llm_cached_prompt_tokens_total", "Prompt tokens served from the provider's prompt cache", ["agent", "model"]
+)
+LLM_COMPLETION_TOKENS = counter(
+    "llm_completion_tokens_total", "Completion tokens generated by the LLM", ["agent", "model"]
+)
+LLM_RETRIES = counter("llm_retries_total", "LLM call attempts that were retried", ["agent", "kind"])
+LLM_FAILURES = counter("llm_failures_total", "LLM calls that failed after all retries", ["agent", "kind"])
+VALIDATION_FAILURES = counter(
+    "llm_validation_failures_total", "LLM responses that failed schema validation", ["agent"]
+)
+CACHE_LOOKUPS = counter("cache_lookups_total", "Cache lookups by cache and outcome", ["cache", "result"])
+HEDGED_REQUESTS = counter(
+    "llm_hedged_requests_total", "LLM calls that fired a hedge, by which request won", ["agent", "winner"]
+)
+HEDGES_SKIPPED = counter(
+    "llm_hedges_skipped_total", "Slow LLM calls not hedged because the hedge budget was spent", ["agent"]
+)
+NODE_DEADLINES_EXCEEDED = counter(
+    "graph_node_deadline_exceeded_total", "Graph nodes abandoned at their deadline", ["node"]
+)
+ROUTE_DECISIONS = counter(
+    "llm_route_decisions_total", "Model tier chosen per LLM request and why", ["agent", "tier", "reason"]
+)
+ROUTE_ESCALATIONS = counter(
+    "llm_route_escalations_total", "Requests retried on the large model after the small one failed", ["agent"]
+)
+ROUTE_LATENCY = gauge(
+    "llm_route_latency_seconds", "Moving average LLM latency per model tier", ["agent", "tier"]
+)
+ROUTE_ERROR_RATE = gauge(
+    "llm_route_error_rate", "Moving average failure rate per model tier", ["agent", "tier"]
+)
+ADMISSION_QUEUE_WAIT = histogram(
+    "admission_queue_wait_seconds", "Time LLM requests waited for an admission slot", ["lane"]
+)
+ADMISSION_REJECTED = counter(
+    "admission_rejected_total", "Requests turned away by admission control", ["lane", "reason"]
+)
+ADMISSION_QUEUE_DEPTH = gauge("admission_queue_depth", "Requests waiting for an admission slot", ["lane"])
+ADMISSION_ACTIVE = gauge("admission_active_requests", "LLM requests holding an admission slot", ["lane"])
+CIRCUIT_STATE = gauge("circuit_breaker_state", "Circuit state: 0 closed, 1 half-open, 2 open", ["breaker"])
+CIRCUIT_TRANSITIONS = counter(
+    "circuit_breaker_transitions_total", "Circuit state changes by the state entered", ["breaker", "state"]
+)
+CIRCUIT_REJECTED = counter("circuit_breaker_rejected_total", "LLM calls refused while the circuit was open", ["breaker"])
+FALLBACK_RESPONSES = counter(
+    "fallback_responses_total", "Requests answered from precomputed fallback recommendations", ["kind"]
+)
+HTTP_REQUESTS = counter(
+    "http_client_requests_total", "Requests sent through the shared LLM HTTP clients", ["client"]
+)
+HTTP_CONNECTIONS_OPENED = counter(
+    "http_client_connections_opened_total", "TCP connections opened by the shared LLM HTTP clients", ["client"]
+)
+HTTP_TLS_HANDSHAKES = counter(
+    "http_client_tls_handshakes_total", "TLS handshakes performed by the shared LLM HTTP clients", ["client"]
+)
+HTTP_POOL_CONNECTIONS = gauge(
+    "http_client_pool_connections", "Pooled connections of the shared LLM HTTP clients by state", ["client", "state"]
+)
+RESULT_STORE_BYTES = gauge(
+    "result_store_bytes", "Encoded size of the results held by the in-process result store", ["backend"]
+)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that feeds the metrics registry."""
+
+    # Metric updates are cheap and thread-safe; avoid a thread hop per event in async runs
+    run_inline = True
+
+    def __init__(self):
+        self._node_starts: Dict[UUID, tuple] = {}
+        self._llm_starts: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *,
+                       run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # Child runs inherit langgraph_node; only the node's own run carries its name.
+        # LangGraph's internal __start__ pseudo-node is not worth a series.
+        if node and kwargs.get("name") == node and not node.startswith("__"):
+            with self._lock:
+                self._node_starts[run_id] = (node, time.perf_counter())
+
+    def _finish_node(self, run_id: UUID, status: str) -> None:
+        with self._lock:
+            started = self._node_starts.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            NODE_DURATION.observe(time.perf_counter() - start, node=node, status=status)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id, "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id, "error")
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *,
+                            run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            self._llm_starts[run_id] = {
+                "agent": metadata.get("agent_type", ""),
+                "model": metadata.get("ls_model_name", ""),
+                "start": time.perf_counter(),
+                "first_token": None,
+            }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            started = self._llm_starts.get(run_id)
+            if started is not None and started["first_token"] is None:
+                started["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            started = self._llm_starts.pop(run_id, None)
+        if started is None:
+            return
+        now = time.perf_counter()
+        labels = {"agent": started["agent"], "model": started["model"]}
+        LLM_DURATION.observe(now - started["start"], status="ok", **labels)
+        # Without streaming the whole response arrives at once
+        first_token = started["first_token"] or now
+        LLM_TIME_TO_FIRST_TOKEN.observe(first_token - started["start"], **labels)
+
+        usage = _token_usage(response)
+        if usage:
+            LLM_PROMPT_TOKENS.inc(usage.get("prompt_tokens", 0), **labels)
+            LLM_CACHED_PROMPT_TOKENS.inc(usage.get("cached_tokens", 0), **labels)
+            LLM_COMPLETION_TOKENS.inc(usage.get("completion_tokens", 0), **labels)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            started = self._llm_starts.pop(run_id, None)
+        if started is not None:
+            LLM_DURATION.observe(
+                time.perf_counter() - started["start"],
+                agent=started["agent"], model=started["model"], status="error"
+            )
+
+
+def _token_usage(response: Any) -> Dict[str, Any]:
+    """Extract OpenAI-style token usage, including cached prompt tokens, from an LLMResult."""
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage")
+    if usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+        }
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None)
+            if usage_metadata:
+                return {
+                    "prompt_tokens": usage_metadata.get("input_tokens", 0),
+                    "completion_tokens": usage_metadata.get("output_tokens", 0),
+                    "cached_tokens": (usage_metadata.get("input_token_details") or {}).get("cache_read") or 0,
+                }
+    return {}
+
+
+metrics_handler = MetricsCallbackHandler()
@@ -0,0 +1,157 @@
+"""Persistent, content-addressed result cache backed by SQLite.
+
+Values are JSON documents keyed by a stable hash of the inputs that produced
+them. Recently read or written keys are mirrored in a bounded in-memory LRU, so
+repeated hits on hot entries never touch the database while memory stays flat
+however many results (e.g. from a batch job over a whole catalog) are stored.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import config
+from utils import logger
+from .instrumentation import CACHE_LOOKUPS
+
+BOOK_IDENTITY_FIELDS = ("title", "author", "genre", "description")
+
+
+def content_key(namespace: str, fields: Any, names: Iterable[str]) -> str:
+    """
+    Build a stable hash of selected fields.
+
+    Whitespace is collapsed and text is case-folded so cosmetic differences do
+    not produce new keys.
+
+    Args:
+        namespace: Prefix separating unrelated kinds of results
+        fields: Mapping or object (e.g. a Pydantic model) holding the values to hash
+        names: Field names that make up the identity
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    get = fields.get if isinstance(fields, dict) else lambda name: getattr(fields, name, None)
+    canonical = {
+        name: " ".join(str(get(name) or "").split()).casefold()
+        for name in names
+    }
+    payload = json.dumps([namespace, canonical], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def book_identity_key(book: Any, namespace: str = "cross_domain:v1") -> str:
+    """Return the content key for a book's title/author/genre/description."""
+    return content_key(namespace, book, BOOK_IDENTITY_FIELDS)
+
+
+class PersistentCache:
+    """SQLite-backed key/value store with a bounded in-memory read-through index."""
+
+    def __init__(self, path: str, memory_entries: Optional[int] = None):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            path: Filesystem path of the SQLite database
+            memory_entries: Entries mirrored in memory; defaults to PERSISTENT_CACHE_MEMORY_ENTRIES
+        """
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.memory_entries = (
+            memory_entries if memory_entries is not None else config.PERSISTENT_CACHE_MEMORY_ENTRIES
+        )
+        self._index: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the stored value for a key, or None if absent.
+
+        Args:
+            key: Content key, typically from ``book_identity_key``
+        """
+        with self._lock:
+            value = self._index.get(key)
+            if value is not None:
+                self._index.move_to_end(key)
+        if value is not None:
+            CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+            return value
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None
+        try:
+            value = json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning(f"Discarding corrupt cache entry {key[:12]} in {self.path}")
+            return None
+        self._remember(key, value)
+        CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        """
+        Store a JSON-serializable value under a key, replacing any previous one.
+
+        Args:
+            key: Content key
+            value: Result document
+        """
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time())
+            )
+        self._remember(key, value)
+
+    def _remember(self, key: str, value: Dict) -> None:
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._index[key] = value
+            self._index.move_to_end(key)
+            while len(self._index) > self.memory_entries:
+                self._index.popitem(last=False)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_open_caches: Dict[str, PersistentCache] = {}
+_open_caches_lock = threading.Lock()
+
+
+def open_persistent_cache(path: str) -> PersistentCache:
+    """Return the process-wide cache for a database path, opening it on first use."""
+    path = os.path.abspath(path)
+    with _open_caches_lock:
+        cache = _open_caches.get(path)
+        if cache is None:
+            cache = _open_caches[path] = PersistentCache(path)
+        return cache
@@ -0,0 +1,146 @@
+"""Process-wide registry of compiled agent graphs.
+
+Building an agent creates its ``ChatOpenAI`` clients, a prompt chain and a
+compiled ``StateGraph``. None of that depends on the request, so the registry
+builds each graph once per process and hands the same instance to every
+Streamlit session and rerun. The HTTP connection pool behind the clients is
+shared process-wide (``agents/http_clients.py``) and survives rebuilds.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import config
+from utils import logger
+
+# Factories return the agent instance together with its compiled graph
+AgentFactory = Callable[[], Tuple[Any, Any]]
+
+
+class AgentRegistry:
+    """Thread-safe cache of compiled graphs keyed by agent name and model settings."""
+
+    def __init__(self):
+        self._factories: Dict[str, AgentFactory] = {}
+        self._entries: Dict[str, Tuple[Tuple, Any, Any]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: AgentFactory) -> None:
+        """
+        Register a factory that builds an agent and compiles its graph.
+
+        Args:
+            name: Registry key for the agent
+            factory: Zero-argument callable returning ``(agent, compiled_graph)``
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._entries.pop(name, None)
+
+    @staticmethod
+    def _settings_key() -> Tuple:
+        """Return the configuration values a compiled graph depends on."""
+        return (config.MODEL_NAME, config.SMALL_MODEL_NAME, config.TEMPERATURE)
+
+    def _entry(self, name: str) -> Tuple[Tuple, Any, Any]:
+        settings = self._settings_key()
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == settings:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == settings:
+                return entry
+            factory = self._factories[name]
+            logger.info(f"Building compiled graph for {name}")
+            agent, graph = factory()
+            entry = self._entries[name] = (settings, agent, graph)
+            return entry
+
+    def get(self, name: str) -> Any:
+        """
+        Return the compiled graph for an agent, building it on first use.
+
+        A graph built under different model settings is discarded and rebuilt,
+        so changing ``config.MODEL_NAME``, ``config.SMALL_MODEL_NAME`` or ``config.TEMPERATURE`` at runtime
+        takes effect on the next request.
+
+        Args:
+            name: Registry key for the agent
+
+        Returns:
+            The shared compiled graph
+
+        Raises:
+            KeyError: If no factory is registered under ``name``
+        """
+        return self._entry(name)[2]
+
+    def get_agent(self, name: str) -> Any:
+        """Return the agent instance backing the shared graph for ``name``."""
+        return self._entry(name)[1]
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Drop cached graphs so they are rebuilt on next use.
+
+        Args:
+            name: Agent to invalidate, or None to invalidate every agent
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+        logger.info(f"Invalidated compiled graphs: {name or 'all'}")
+
+
+registry = AgentRegistry()
+
+BOOK_AGENT = "book"
+CROSS_DOMAIN_AGENT = "cross_domain"
+
+
+def _create_book_graph():
+    from agents.book_agent import BookAgent
+    from agents.instrumentation import metrics_handler
+    agent = BookAgent()
+    graph = agent.create_workflow().compile()
+    return agent, graph.with_config(callbacks=[metrics_handler])
+
+
+def _create_cross_domain_graph():
+    from agents.cross_domain_agent import CrossDomainAgent
+    from agents.instrumentation import metrics_handler
+    agent = CrossDomainAgent()
+    return agent, agent.create_workflow().with_config(callbacks=[metrics_handler])
+
+
+registry.register(BOOK_AGENT, _create_book_graph)
+registry.register(CROSS_DOMAIN_AGENT, _create_cross_domain_graph)
+
+
+def get_book_graph():
+    """Return the shared compiled book recommendation graph."""
+    return registry.get(BOOK_AGENT)
+
+
+def get_book_agent():
+    """Return the shared BookAgent, e.g. for streaming outside the graph."""
+    return registry.get_agent(BOOK_AGENT)
+
+
+def get_cross_domain_graph():
+    """Return the shared compiled cross-domain recommendation graph."""
+    return registry.get(CROSS_DOMAIN_AGENT)
+
+
+def get_cross_domain_agent():
+    """Return the shared CrossDomainAgent, e.g. for batched generation outside the graph."""
+    return registry.get_agent(CROSS_DOMAIN_AGENT)
+
+
+def invalidate_graphs() -> None:
+    """Rebuild every agent graph on next use, e.g. after changing model settings."""
+    registry.invalidate()
@@ -0,0 +1,248 @@
+"""In-memory response cache for LLM-backed agent nodes.
+
+Entries are keyed on a normalized form of the user's request so that trivially
+different phrasings ("recommend sci-fi about time travel" / "Sci-fi books about
+time travel") share one entry. When an embedding function is supplied, a miss on the
+normalized key falls back to a cosine-similarity search over cached queries.
+"""
+
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from utils import logger
+from .instrumentation import CACHE_LOOKUPS
+
+EmbedFunction = Callable[[str], List[float]]
+
+# Filler only: relation words such as "by", "like", "about" and "for" change what is
+# asked for ("books by X" vs "books like X"), so they stay in the key
+_STOPWORDS = frozenset({
+    "a", "an", "and", "any", "book", "books", "find", "give", "i", "im",
+    "in", "is", "looking", "me", "my", "novel", "novels", "of", "on",
+    "please", "read", "reads", "recommend", "recommendation",
+    "recommendations", "some", "something", "suggest", "that", "the", "to",
+    "want", "with", "would",
+})
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Embeddings of recently missed queries, kept so storing their answer needs no second embedding call
+_MISSED_EMBEDDINGS_KEPT = 256
+
+
+def normalize_query(text: str) -> str:
+    """
+    Reduce a free-text request to an order-independent cache key.
+
+    Lowercases, strips punctuation and filler words, folds simple plurals and
+    sorts the remaining tokens.
+
+    Args:
+        text: Raw user input
+
+    Returns:
+        Normalized key; empty when the input has no meaningful tokens
+    """
+    tokens = set()
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token)
+    return " ".join(sorted(tokens))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    value: BaseModel
+    expires_at: float
+    embedding: Optional[List[float]] = None
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness."""
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with per-entry TTL and optional semantic lookup."""
+
+    def __init__(self,
+                 name: str,
+                 ttl_seconds: float,
+                 max_entries: int,
+                 embed_fn: Optional[EmbedFunction] = None,
+                 similarity_threshold: float = 0.92):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Cache name used in metrics labels
+            ttl_seconds: Lifetime of an entry after it is stored
+            max_entries: Maximum number of entries before LRU eviction
+            embed_fn: Optional function mapping a query to an embedding vector
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._missed_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _embed(self, query: str) -> Optional[List[float]]:
+        if self.embed_fn is None:
+            return None
+        try:
+            return self.embed_fn(query)
+        except Exception as e:
+            logger.warning(f"Embedding lookup failed, using exact cache keys only: {e}")
+            return None
+
+    def _best_match(self, embedding: List[float], candidates: List[Tuple[str, List[float]]]) -> Optional[str]:
+        # Runs without the lock; scored in one matrix product when NumPy is available
+        if not candidates:
+            return None
+        try:
+            import numpy as np
+        except ImportError:
+            scores = [_cosine(embedding, candidate) for _, candidate in candidates]
+        else:
+            matrix = np.asarray([candidate for _, candidate in candidates], dtype=np.float32)
+            vector = np.asarray(embedding, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+            scores = np.divide(matrix @ vector, norms, out=np.zeros(len(candidates), dtype=np.float32), where=norms > 0)
+        best = max(range(len(candidates)), key=lambda position: scores[position])
+        return candidates[best][0] if scores[best] >= self.similarity_threshold else None
+
+    def _remember_missed(self, key: str, embedding: List[float]) -> None:
+        self._missed_embeddings[key] = embedding
+        self._missed_embeddings.move_to_end(key)
+        while len(self._missed_embeddings) > _MISSED_EMBEDDINGS_KEPT:
+            self._missed_embeddings.popitem(last=False)
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.stats.expirations += len(expired)
+
+    def get(self, query: str) -> Optional[BaseModel]:
+        """
+        Look up a cached response for a query.
+
+        Args:
+            query: Raw user input
+
+        Returns:
+            The cached validated response, or None on a miss
+        """
+        key = normalize_query(query)
+        if not key:
+            return None
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+                    return entry.value
+                del self._entries[key]
+                self.stats.expirations += 1
+            if self.embed_fn is None:
+                self.stats.misses += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+                return None
+
+        embedding = self._embed(query)
+        best_key = None
+        if embedding is not None:
+            with self._lock:
+                self._purge_expired(now)
+                candidates = [(k, entry.embedding) for k, entry in self._entries.items() if entry.embedding is not None]
+            best_key = self._best_match(embedding, candidates)
+        with self._lock:
+            entry = self._entries.get(best_key) if best_key is not None else None
+            # The entry may have been evicted or expired while scoring without the lock
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(best_key)
+                self.stats.semantic_hits += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result="semantic_hit")
+                return entry.value
+            if embedding is not None:
+                self._remember_missed(key, embedding)
+            self.stats.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None
+
+    def put(self, query: str, value: BaseModel) -> None:
+        """
+        Store a validated response for a query.
+
+        Args:
+            query: Raw user input
+            value: Validated response model
+        """
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            embedding = self._missed_embeddings.pop(key, None)
+        if embedding is None:
+            embedding = self._embed(query)
+        with self._lock:
+            self._entries[key] = _CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                embedding=embedding
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    async def aget(self, query: str) -> Optional[BaseModel]:
+        """Async ``get``; embedding lookups run in a worker thread to keep the loop free."""
+        if self.embed_fn is None:
+            return self.get(query)
+        return await asyncio.to_thread(self.get, query)
+
+    async def aput(self, query: str, value: BaseModel) -> None:
+        """Async ``put``; embedding lookups run in a worker thread to keep the loop free."""
+        if self.embed_fn is None:
+            self.put(query, value)
+        else:
+            await asyncio.to_thread(self.put, query, value)
+
+    def clear(self) -> None:
+        """Remove every entry; counters are left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self._missed_embeddings.clear()
@@ -0,0 +1,223 @@
+"""Retry and rate-limit policy shared by all agents.
+
+Errors from an LLM call are classified (rate limit, server error, timeout,
+validation failure or fatal) so that only transient failures are retried.
+Retries back off exponentially with full jitter and honor ``Retry-After``.
+A process-wide token bucket keeps request and token throughput under the
+provider's per-minute quotas, and a 429 pauses every caller until the
+provider's advertised retry time has passed.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import FrozenSet, Optional
+
+import openai
+from pydantic import ValidationError
+
+import config
+
+
+class ErrorKind(str, Enum):
+    """Coarse classification of a failed LLM call."""
+    RATE_LIMIT = "rate_limit"
+    SERVER = "server"
+    TIMEOUT = "timeout"
+    VALIDATION = "validation"
+    FATAL = "fatal"
+
+
+class LLMCallError(Exception):
+    """Raised when an LLM call fails permanently or exhausts its retries."""
+
+    def __init__(self, message: str, kind: ErrorKind, attempts: int):
+        super().__init__(message)
+        self.kind = kind
+        self.attempts = attempts
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    """
+    Classify an exception raised while calling or validating an LLM response.
+
+    Args:
+        error: The exception to classify
+
+    Returns:
+        The matching ErrorKind
+    """
+    if isinstance(error, openai.RateLimitError):
+        return ErrorKind.RATE_LIMIT
+    if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError, TimeoutError)):
+        return ErrorKind.TIMEOUT
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code == 429:
+            return ErrorKind.RATE_LIMIT
+        if error.status_code >= 500:
+            return ErrorKind.SERVER
+        return ErrorKind.FATAL
+    if isinstance(error, openai.APIConnectionError):
+        return ErrorKind.SERVER
+    if isinstance(error, (ValidationError, json.JSONDecodeError, ValueError)):
+        return ErrorKind.VALIDATION
+    return ErrorKind.FATAL
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Return the delay requested by a ``Retry-After`` style header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How many times and how quickly to retry each kind of failure."""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0
+    max_validation_attempts: int = 2
+    retry_on: FrozenSet[ErrorKind] = field(default_factory=lambda: frozenset({
+        ErrorKind.RATE_LIMIT, ErrorKind.SERVER, ErrorKind.TIMEOUT, ErrorKind.VALIDATION
+    }))
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        """Build the policy from ``config`` settings."""
+        return cls(
+            max_attempts=config.LLM_MAX_ATTEMPTS,
+            base_delay=config.LLM_RETRY_BASE_DELAY,
+            max_delay=config.LLM_RETRY_MAX_DELAY
+        )
+
+    def should_retry(self, kind: ErrorKind, attempt: int) -> bool:
+        """Return True if a failure of ``kind`` on attempt ``attempt`` should be retried."""
+        if kind not in self.retry_on:
+            return False
+        limit = self.max_validation_attempts if kind == ErrorKind.VALIDATION else self.max_attempts
+        return attempt < min(limit, self.max_attempts)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Compute the wait before the next attempt.
+
+        Uses exponential backoff with full jitter, never shorter than the
+        provider's ``Retry-After`` hint.
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+            retry_after: Optional provider-requested delay in seconds
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            return max(backoff, min(retry_after, self.max_retry_after))
+        return backoff
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of blocking."""
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Sustained refill rate and burst capacity
+        """
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take ``amount`` tokens, going into debt if necessary.
+
+        Returns:
+            Seconds the caller must wait before its reservation is covered
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Process-wide limit on LLM requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Request quota; 0 disables the limit
+            tokens_per_minute: Token quota; 0 disables the limit
+        """
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds``, e.g. after the provider returns 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request of roughly ``tokens`` tokens fits within the quotas.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.reserve(tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter configured from ``config``."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                requests_per_minute=config.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=config.LLM_TOKENS_PER_MINUTE
+            )
+        return _rate_limiter
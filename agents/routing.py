@@ -0,0 +1,185 @@
+"""Per-request choice between a small, fast model and the large default model.
+
+Each agent scores how demanding a request is (0 = trivial, 1 = hard) and the
+process-wide ``ModelRouter`` picks a tier from that score and the recent health
+of both tiers:
+- requests below ``ROUTING_COMPLEXITY_THRESHOLD`` go to ``SMALL_MODEL_NAME``
+- while the large tier is slower than its latency budget the threshold is
+  raised, so borderline requests are moved to the small tier
+- while the small tier's recent failure rate exceeds its error budget every
+  request goes to the large tier
+
+A small-tier response that fails validation is retried on the large tier (see
+``BaseAgent.ainvoke_with_retry``). Decisions, escalations and the moving
+averages are exported as metrics.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import config
+from .instrumentation import ROUTE_DECISIONS, ROUTE_ERROR_RATE, ROUTE_ESCALATIONS, ROUTE_LATENCY
+
+SMALL = "small"
+LARGE = "large"
+
+# Weight of the newest sample in the moving averages
+_EWMA_ALPHA = 0.2
+# Failures are forgotten with this half-life, so a tier taken out of rotation gets traffic again
+_ERROR_HALF_LIFE_SECONDS = 60.0
+# How far the complexity threshold rises while the large tier is over its latency budget
+_LATENCY_PRESSURE_SHIFT = 0.25
+
+# Words that add constraints a small model tends to get wrong
+_CONSTRAINT_WORDS = frozenset({
+    "but", "not", "without", "except", "unlike", "instead", "more", "less", "than",
+    "similar", "between", "compared", "both", "either", "neither", "only",
+})
+_WORD = re.compile(r"[\w']+")
+
+
+def model_for_tier(tier: str) -> str:
+    """Return the configured model name for a tier."""
+    return config.SMALL_MODEL_NAME if tier == SMALL else config.MODEL_NAME
+
+
+def text_complexity(text: str) -> float:
+    """
+    Score how demanding a free-text request is, from 0 to 1.
+
+    Short genre or author queries ("cozy mysteries") score low; long requests
+    with several constraints or comparisons score high.
+
+    Args:
+        text: The user's request
+
+    Returns:
+        Complexity score between 0 and 1
+    """
+    words = _WORD.findall(text.lower())
+    constraints = sum(word in _CONSTRAINT_WORDS for word in words) + text.count(",")
+    return min(1.0, len(words) / 30 + 0.15 * constraints)
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """The tier and model chosen for one request."""
+    tier: str
+    model: str
+    reason: str
+
+
+class _TierStats:
+    """Moving averages of latency and failure rate for one agent and tier."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self._error_rate = 0.0
+        self._updated = time.monotonic()
+
+    def error_rate(self, now: float) -> float:
+        return self._error_rate * 0.5 ** ((now - self._updated) / _ERROR_HALF_LIFE_SECONDS)
+
+    def record(self, seconds: Optional[float], ok: bool, now: float) -> None:
+        error_rate = self.error_rate(now)
+        self._error_rate = error_rate + _EWMA_ALPHA * ((0.0 if ok else 1.0) - error_rate)
+        self._updated = now
+        if ok and seconds is not None:
+            self.latency = seconds if self.latency is None else self.latency + _EWMA_ALPHA * (seconds - self.latency)
+
+
+class ModelRouter:
+    """Thread-safe tier selection shared by every agent in the process."""
+
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], _TierStats] = {}
+        self._lock = threading.Lock()
+
+    def _tier_stats(self, agent: str, tier: str) -> _TierStats:
+        stats = self._stats.get((agent, tier))
+        if stats is None:
+            stats = self._stats[(agent, tier)] = _TierStats()
+        return stats
+
+    def choose(self, agent: str, complexity: float) -> RouteDecision:
+        """
+        Pick the model tier for a request.
+
+        Args:
+            agent: Name of the calling agent
+            complexity: The request's complexity score, from 0 to 1
+
+        Returns:
+            The chosen tier, its model and the reason, also counted in metrics
+        """
+        if not config.MODEL_ROUTING_ENABLED:
+            return RouteDecision(LARGE, model_for_tier(LARGE), "disabled")
+
+        now = time.monotonic()
+        with self._lock:
+            small_error_rate = self._tier_stats(agent, SMALL).error_rate(now)
+            large_latency = self._tier_stats(agent, LARGE).latency
+
+        threshold = config.ROUTING_COMPLEXITY_THRESHOLD
+        budget = config.ROUTING_LARGE_LATENCY_BUDGET_SECONDS
+        over_latency_budget = budget > 0 and large_latency is not None and large_latency > budget
+        if over_latency_budget:
+            threshold = min(1.0, threshold + _LATENCY_PRESSURE_SHIFT)
+
+        if small_error_rate > config.ROUTING_SMALL_MAX_ERROR_RATE:
+            tier, reason = LARGE, "small_error_budget"
+        elif complexity < config.ROUTING_COMPLEXITY_THRESHOLD:
+            tier, reason = SMALL, "simple"
+        elif complexity < threshold:
+            tier, reason = SMALL, "large_latency_budget"
+        else:
+            tier, reason = LARGE, "complex"
+        ROUTE_DECISIONS.inc(agent=agent, tier=tier, reason=reason)
+        return RouteDecision(tier, model_for_tier(tier), reason)
+
+    def record(self, agent: str, tier: str, seconds: Optional[float], ok: bool) -> None:
+        """
+        Feed the outcome of one LLM call into the tier's moving averages.
+
+        Args:
+            agent: Name of the calling agent
+            tier: Tier that served the call
+            seconds: Call latency; ignored for failures
+            ok: Whether the call returned a valid response
+        """
+        if not config.MODEL_ROUTING_ENABLED:
+            return
+        now = time.monotonic()
+        with self._lock:
+            stats = self._tier_stats(agent, tier)
+            stats.record(seconds, ok, now)
+            latency, error_rate = stats.latency, stats.error_rate(now)
+        if latency is not None:
+            ROUTE_LATENCY.set(latency, agent=agent, tier=tier)
+        ROUTE_ERROR_RATE.set(error_rate, agent=agent, tier=tier)
+
+    def escalate(self, agent: str, decision: RouteDecision) -> RouteDecision:
+        """Return the large-tier decision replacing a failed small-tier one."""
+        ROUTE_ESCALATIONS.inc(agent=agent)
+        return RouteDecision(LARGE, model_for_tier(LARGE), f"escalated_from_{decision.tier}")
+
+    def reset(self) -> None:
+        """Forget every recorded outcome, e.g. between benchmark runs."""
+        with self._lock:
+            self._stats.clear()
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,68 @@
+"""Incremental parsing of streamed function-call arguments.
+
+OpenAI streams function-call arguments as arbitrary JSON fragments. For
+responses shaped like ``{"recommendations": [{...}, {...}]}`` the parser below
+emits each array element as soon as its closing brace arrives, so callers can
+render items while the rest of the response is still being generated.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from utils import logger
+
+
+class IncrementalArrayParser:
+    """Extract completed objects from the first array inside a streamed JSON object."""
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._collecting = False
+        self._item_chars: List[str] = []
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next fragment of the arguments string.
+
+        Args:
+            fragment: Next chunk of JSON text
+
+        Returns:
+            Objects completed by this fragment, in order
+        """
+        completed = []
+        for char in fragment:
+            if self._collecting:
+                self._item_chars.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                # An object opening directly inside the top-level array is a new item
+                if char == "{" and self._stack == ["{", "["]:
+                    self._collecting = True
+                    self._item_chars = [char]
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if char == "}" and self._collecting and self._stack == ["{", "["]:
+                    text = "".join(self._item_chars)
+                    self._collecting = False
+                    self._item_chars = []
+                    try:
+                        completed.append(json.loads(text))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed streamed item: {e}")
+        return completed
@@ -0,0 +1,5 @@
+"""Headless HTTP API over the recommendation service.
+
+Install the ``api`` extra and run ``python -m api.server``; see ``api/app.py``
+for the endpoints.
+"""
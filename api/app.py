@@ -0,0 +1,244 @@
+"""ASGI application exposing the recommendation service over HTTP.
+
+Endpoints:
+- ``POST /v1/books``: ``{"query": ..., "messages": [...]}`` -> ``{"recommendations": [...]}``
+- ``GET|POST /v1/books/stream``: the same request answered as server-sent events,
+  one ``recommendation`` event per book followed by ``done`` (GET takes ``?query=``
+  so browsers can use ``EventSource``)
+- ``POST /v1/cross-domain``: ``{"book": {...}}`` -> ``{"movie": ..., "game": ..., "song": ...}``
+- ``POST /v1/cross-domain/batch``: ``{"books": [...]}`` -> ``{"results": [... or null]}``
+- ``GET /healthz`` and ``GET /metrics`` (Prometheus text)
+
+Handlers await the async service functions directly on the server's event
+loop. Graphs are shared per worker process through the agent registry and are
+built at startup, so the first request does not pay for compilation.
+"""
+
+import hmac
+import json
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import config
+from agents.registry import get_book_graph, get_cross_domain_graph
+from agents.admission import AdmissionRejected
+from agents.circuit_breaker import CircuitOpenError
+from agents.conversation import Conversation
+from agents.retry import ErrorKind, LLMCallError, classify_error
+from metrics import REGISTRY
+from models import BookRecommendation, BookRecommendations, CrossDomainRecommendation
+from services.recommendation_service import (
+    aget_book_recommendations,
+    aget_cross_domain_recommendations,
+    aget_cross_domain_recommendations_batch,
+    astream_book_recommendations,
+)
+from utils import configure_logging, logger
+
+# Most books accepted by one batched cross-domain request
+MAX_BATCH_BOOKS = 20
+MAX_QUERY_CHARS = 4000
+# Earlier turns accepted per request; they are folded to the conversation token budget anyway
+MAX_MESSAGES = 20
+
+# HTTP status returned for each kind of upstream LLM failure
+_ERROR_STATUS = {
+    ErrorKind.RATE_LIMIT: 503,
+    ErrorKind.TIMEOUT: 504,
+    ErrorKind.SERVER: 502,
+    ErrorKind.VALIDATION: 502,
+    ErrorKind.FATAL: 502,
+}
+
+
+class ChatMessage(BaseModel):
+    """One earlier turn of a refinement conversation."""
+    role: Literal["user", "assistant"]
+    content: str = Field(min_length=1, max_length=MAX_QUERY_CHARS)
+
+
+class BookQuery(BaseModel):
+    """Request body for book recommendations."""
+    query: str = Field(min_length=1, max_length=MAX_QUERY_CHARS, description="What the user is looking for")
+    messages: List[ChatMessage] = Field(
+        default_factory=list, max_length=MAX_MESSAGES, description="Earlier turns to refine"
+    )
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        """Earlier turns folded to the conversation prompt budget, as the Streamlit app sends them."""
+        if not self.messages:
+            return []
+        conversation = Conversation.from_messages(message.model_dump() for message in self.messages)
+        return conversation.prompt_messages(self.query)
+
+
+class CrossDomainQuery(BaseModel):
+    """Request body for cross-domain recommendations."""
+    book: BookRecommendation
+
+
+class CrossDomainBatchQuery(BaseModel):
+    """Request body for batched cross-domain recommendations."""
+    books: List[BookRecommendation] = Field(min_length=1, max_length=MAX_BATCH_BOOKS)
+
+
+class CrossDomainBatchResult(BaseModel):
+    """Cross-domain recommendations aligned with the requested books; null where generation failed."""
+    results: List[Optional[CrossDomainRecommendation]]
+
+
+def _json(model: BaseModel, status_code: int = 200) -> Response:
+    return Response(model.model_dump_json(), status_code=status_code, media_type="application/json")
+
+
+def _error(status_code: int, message: str, kind: Optional[str] = None) -> JSONResponse:
+    body = {"error": message}
+    if kind:
+        body["kind"] = kind
+    return JSONResponse(body, status_code=status_code)
+
+
+def _authorized(request: Request) -> bool:
+    if not config.API_TOKEN:
+        return True
+    header = request.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), config.API_TOKEN.encode())
+
+
+def endpoint(schema: Optional[type] = None):
+    """
+    Wrap a handler with authentication, request validation and error mapping.
+
+    The handler receives the validated request body (or the query string for
+    GET requests) as an instance of ``schema``.
+    """
+    def decorator(handler):
+        async def wrapper(request: Request) -> Response:
+            if not _authorized(request):
+                return _error(401, "Missing or invalid bearer token")
+            body = None
+            if schema is not None:
+                try:
+                    if request.method == "GET":
+                        body = schema.model_validate(dict(request.query_params))
+                    else:
+                        body = schema.model_validate_json(await request.body())
+                except ValidationError as e:
+                    return JSONResponse({"error": "Invalid request", "detail": json.loads(e.json())}, status_code=422)
+            try:
+                return await handler(body) if schema is not None else await handler(request)
+            except LLMCallError as e:
+                if isinstance(e, CircuitOpenError):
+                    # Load is shed on purpose while the provider recovers; come back once the breaker probes again
+                    response = _error(503, str(e), e.kind.value)
+                    response.headers["Retry-After"] = str(max(1, math.ceil(e.retry_in)))
+                    return response
+                response = _error(_ERROR_STATUS[e.kind], str(e), e.kind.value)
+                if isinstance(e, AdmissionRejected):
+                    # Overload is short-lived; tell clients to come back soon rather than hammer the queue
+                    response.headers["Retry-After"] = "1"
+                return response
+            except TimeoutError as e:
+                return _error(504, str(e) or "Request timed out", ErrorKind.TIMEOUT.value)
+        wrapper.__name__ = handler.__name__
+        wrapper.__doc__ = handler.__doc__
+        return wrapper
+    return decorator
+
+
+@endpoint(BookQuery)
+async def books(query: BookQuery) -> Response:
+    """Return book recommendations for a query."""
+    messages = query.prompt_messages()
+    recommendations = await aget_book_recommendations(query.query, messages)
+    return _json(BookRecommendations(recommendations=recommendations))
+
+
+async def _book_events(query: BookQuery) -> AsyncIterator[str]:
+    messages = query.prompt_messages()
+    try:
+        async for recommendation in astream_book_recommendations(query.query, messages):
+            yield f"event: recommendation\ndata: {recommendation.model_dump_json()}\n\n"
+    except LLMCallError as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e), 'kind': e.kind.value})}\n\n"
+        return
+    except TimeoutError as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e), 'kind': ErrorKind.TIMEOUT.value})}\n\n"
+        return
+    except Exception as e:
+        # The response has started, so anything unexpected must still end it with an error event
+        logger.exception(f"Book recommendation stream failed: {e}")
+        yield f"event: error\ndata: {json.dumps({'error': str(e), 'kind': classify_error(e).value})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+@endpoint(BookQuery)
+async def books_stream(query: BookQuery) -> Response:
+    """Stream book recommendations as server-sent events."""
+    # Failures after the first event can no longer change the status, so they are sent as events
+    return StreamingResponse(
+        _book_events(query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@endpoint(CrossDomainQuery)
+async def cross_domain(query: CrossDomainQuery) -> Response:
+    """Return a movie, game and song matching a book."""
+    result = await aget_cross_domain_recommendations(query.book)
+    if result is None:
+        return _error(502, "Failed to generate cross-domain recommendations")
+    return _json(result)
+
+
+@endpoint(CrossDomainBatchQuery)
+async def cross_domain_batch(query: CrossDomainBatchQuery) -> Response:
+    """Return cross-domain recommendations for several books using one batched LLM call."""
+    results = await aget_cross_domain_recommendations_batch(query.books)
+    return _json(CrossDomainBatchResult(results=results))
+
+
+async def healthz(request: Request) -> Response:
+    """Liveness probe; does not call the LLM."""
+    return JSONResponse({"status": "ok"})
+
+
+@endpoint()
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics of this worker process."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    # Compile both graphs before accepting traffic
+    get_book_graph()
+    get_cross_domain_graph()
+    logger.info("Recommendation API ready")
+    yield
+
+
+def create_app() -> Starlette:
+    """Build the ASGI application."""
+    configure_logging()
+    return Starlette(
+        routes=[
+            Route("/v1/books", books, methods=["POST"]),
+            Route("/v1/books/stream", books_stream, methods=["GET", "POST"]),
+            Route("/v1/cross-domain", cross_domain, methods=["POST"]),
+            Route("/v1/cross-domain/batch", cross_domain_batch, methods=["POST"]),
+            Route("/healthz", healthz, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
@@ -0,0 +1,45 @@
+"""Run the recommendation API under uvicorn.
+
+Each worker is a separate process with its own event loop, compiled graphs,
+caches and metrics, so workers scale out like independent replicas behind a
+load balancer. The catalog index and the SQLite cross-domain cache live on
+disk and are shared between them.
+
+Usage:
+    python -m api.server --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import argparse
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--workers", type=int, default=config.API_WORKERS, help="Worker processes")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(
+        "api.app:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        # Long LLM calls stream slowly; keep connections from the load balancer open between requests
+        timeout_keep_alive=30,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
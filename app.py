@@ -1,13 +1,20 @@
 import streamlit as st
 from auth import requires_auth
-from controllers.recommendation_controller import RecommendationController
-from views.book_recommendations_view import display_book_recommendations
-from views.cross_domain_view import display_cross_domain_recommendations
-from utils import logger
+from utils import configure_logging, logger
+from metrics import configure_metrics_export
+from config import STREAM_RECOMMENDATIONS
+from services.warmup import start_warmup
 
 @requires_auth
 def main():
+    # Imported after login: these pull in the agents, LangChain, LangGraph and OpenAI,
+    # which the login page does not need
+    from controllers.recommendation_controller import RecommendationController
+    from views.book_recommendations_view import display_book_recommendations
+    from views.cross_domain_view import display_cross_domain_recommendations
+
     logger.info("Starting Book Recommendation System")
+    configure_metrics_export()
     controller = RecommendationController()
 
     st.title("📚 Book Recommendation System")
@@ -25,11 +32,34 @@ def main():
     user_input = st.text_area("What kind of books are you looking for?",
                             placeholder="E.g., 'I love magical realism like Gabriel García Márquez' or 'Looking for sci-fi books about time travel'")
 
+    # Follow-ups such as "more like the second one but darker" build on the previous results
+    refine = False
+    if st.session_state.book_recommendations:
+        refine = st.checkbox("Refine previous results", help="Treat this request as a follow-up to the books above")
+
     if st.button("Get Recommendations"):
-        recommendations = controller.handle_book_recommendations(user_input)
+        if STREAM_RECOMMENDATIONS:
+            # Render cards as they stream in, then hand over to the regular display below
+            placeholder = st.empty()
+            streamed = []
+
+            def track(books):
+                for book in books:
+                    streamed.append(book)
+                    yield book
+
+            with placeholder.container():
+                display_book_recommendations(track(controller.stream_book_recommendations(user_input, refine)))
+            # Clear only cards the display below re-renders; warnings shown during the stream stay visible
+            if streamed and st.session_state.book_recommendations == streamed:
+                placeholder.empty()
+        else:
+            recommendations = controller.handle_book_recommendations(user_input, refine)
 
     # Display book recommendations if available
     if st.session_state.book_recommendations:
+        if st.session_state.book_notice:
+            st.warning(st.session_state.book_notice)
         display_book_recommendations(st.session_state.book_recommendations)
 
         # Add a section for cross-domain recommendations
@@ -37,7 +67,7 @@ def main():
         st.write("Select a book to get related movie, game, and song recommendations that share similar themes.")
 
         # Create dropdown with book titles
-        book_titles = [book["title"] for book in st.session_state.book_recommendations]
+        book_titles = [book.title for book in st.session_state.book_recommendations]
         selected_index = st.selectbox(
             "Select a book",
             range(len(book_titles)),
@@ -48,6 +78,14 @@ def main():
             recommendations = controller.handle_cross_domain_recommendations(selected_index)
             if recommendations:
                 display_cross_domain_recommendations(recommendations)
+        else:
+            # Reruns (e.g. changing the selection) show results generated earlier without a new LLM call
+            recommendations = controller.stored_cross_domain_recommendations(selected_index)
+            if recommendations:
+                display_cross_domain_recommendations(recommendations)
 
 if __name__ == "__main__":
+    configure_logging()
     main()
+    # The page is on screen now; compile the graphs while the user logs in or types
+    start_warmup()
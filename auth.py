@@ -7,10 +7,6 @@ for password-based authentication.
 
 import streamlit as st
 from typing import Callable
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 def check_authentication() -> bool:
     """
@@ -0,0 +1 @@
+"""Offline benchmarks driving the agents with a local stand-in chat model."""
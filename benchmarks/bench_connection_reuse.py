@@ -0,0 +1,183 @@
+"""Verify and measure HTTP connection reuse of the OpenAI clients against a local mock server.
+
+A small OpenAI-compatible server is started on localhost. It answers chat
+completions with schema-valid function calls and counts the TCP connections
+it accepts. The same requests are then sent in three ways:
+- ``fresh``: a new ``ChatOpenAI`` with its own default HTTP client per request,
+  as when agents were rebuilt per request
+- ``shared``: a new ``ChatOpenAI`` per request from ``BaseAgent.create_llm``,
+  which uses the process-wide pooled client
+- ``service``: full book recommendations through the compiled graph and service layer
+
+With a shared pool, connections opened stay at about the concurrency level
+however many requests are sent. Against the real API every connection saved
+is also a TLS handshake saved.
+
+Usage:
+    python -m benchmarks.bench_connection_reuse --requests 200 --concurrency 8
+    python -m benchmarks.bench_connection_reuse --modes shared,service --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import canned_arguments
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """OpenAI-compatible chat completions endpoint that counts accepted connections."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _MockHandler)
+        self.latency = latency
+        self.connections = 0
+        self._count_lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+        with self._count_lock:
+            self.connections += 1
+        return request
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between requests, like the real API
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        prompt = "\n".join(str(message.get("content") or "") for message in body.get("messages", []))
+        message: Dict[str, Any] = {"role": "assistant", "content": "ok"}
+        functions = body.get("functions") or [tool["function"] for tool in body.get("tools", [])]
+        if functions:
+            name = functions[0]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "function_call": {"name": name, "arguments": json.dumps(canned_arguments(name, prompt))},
+            }
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 50,
+                      "total_tokens": len(prompt) // 4 + 50},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+async def _drive(call, requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call(index)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return latencies
+
+
+def run_mode(mode: str, server: MockOpenAIServer, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send ``requests`` calls in one mode and return latency and connection counts."""
+    from langchain_openai import ChatOpenAI
+
+    from agents.instrumentation import HTTP_CONNECTIONS_OPENED
+    from agents.registry import get_book_agent
+    from agents.routing import LARGE
+    from services.recommendation_service import aget_book_recommendations
+
+    agent = get_book_agent()
+    messages = [("system", agent.system_prompt), ("human", "{query}")]
+
+    async def fresh(index: int) -> None:
+        model = ChatOpenAI(model="mock", max_retries=0)
+        try:
+            await model.ainvoke([(role, text.format(query=f"query {index}")) for role, text in messages])
+        finally:
+            await model.root_async_client.close()
+
+    async def shared(index: int) -> None:
+        await agent.create_llm(LARGE).ainvoke(
+            [(role, text.format(query=f"query {index}")) for role, text in messages]
+        )
+
+    async def service(index: int) -> None:
+        await aget_book_recommendations(f"novels about lighthouse keepers, variant {index}")
+
+    call = {"fresh": fresh, "shared": shared, "service": service}[mode]
+    connections_before = server.connections
+    opened_before = HTTP_CONNECTIONS_OPENED.value(client="async")
+    latencies = sorted(asyncio.run(_drive(call, requests, concurrency)))
+    return {
+        "mode": mode,
+        "requests": requests,
+        "server_connections": server.connections - connections_before,
+        "pool_connections_opened": HTTP_CONNECTIONS_OPENED.value(client="async") - opened_before,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the mock server waits per request")
+    parser.add_argument("--modes", default="fresh,shared,service")
+    args = parser.parse_args(argv)
+
+    server = MockOpenAIServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "mock-key"
+
+    import config
+    # Measure the network path only: no caches, no client-side throttling, no routing
+    config.BOOK_CACHE_ENABLED = False
+    config.CATALOG_INDEX_PATH = ""
+    config.MODEL_ROUTING_ENABLED = False
+    config.HEDGING_ENABLED = False
+    config.LLM_REQUESTS_PER_MINUTE = 1e9
+    config.LLM_TOKENS_PER_MINUTE = 1e12
+
+    print(f"{'mode':<8} {'requests':>8} {'server conns':>13} {'pool opened':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in [name.strip() for name in args.modes.split(",") if name.strip()]:
+        result = run_mode(mode, server, args.requests, max(1, args.concurrency))
+        print(f"{result['mode']:<8} {result['requests']:>8} {result['server_connections']:>13} "
+              f"{result['pool_connections_opened']:>12g} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
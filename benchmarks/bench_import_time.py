@@ -0,0 +1,109 @@
+"""Measure cold-start import cost of the app's entry points.
+
+Each module is imported in a fresh interpreter several times, and the median
+wall time is reported. This covers what a new container pays before the first
+page can render:
+- ``app``: the Streamlit script up to the login page
+- ``controllers.recommendation_controller``: the stack deferred until after login
+- ``services.recommendation_service`` and ``api.app``: the service layer and HTTP API
+
+The slowest modules of the first target are listed from ``-X importtime``. A
+final line reports how long compiling both graphs takes once everything is
+imported.
+
+Usage:
+    python -m benchmarks.bench_import_time --runs 5
+    python -m benchmarks.bench_import_time --modules app,auth --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = "app,controllers.recommendation_controller,services.recommendation_service,api.app"
+
+# Heavy third-party packages worth reporting when a target pulls them in
+HEAVY_PACKAGES = ("langchain_core", "langchain_openai", "langgraph", "langsmith", "openai", "numpy")
+
+_BUILD_GRAPHS = """
+import os, time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+from agents.registry import get_book_graph, get_cross_domain_graph
+start = time.perf_counter()
+get_book_graph()
+get_cross_domain_graph()
+print(time.perf_counter() - start)
+"""
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": ROOT, "WARMUP_ENABLED": "false"}
+    )
+
+
+def import_seconds(module: str) -> Tuple[float, List[str]]:
+    """Import ``module`` in a fresh interpreter; return the wall time and heavy packages it loaded."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, *(name for name in {HEAVY_PACKAGES!r} if name in sys.modules))\n"
+    )
+    result = _run(code)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()}")
+    seconds, *heavy = result.stdout.strip().splitlines()[-1].split()
+    return float(seconds), heavy
+
+
+def slowest_imports(module: str, top: int) -> List[Tuple[int, str]]:
+    """Return the ``top`` modules with the largest self import time, in microseconds."""
+    result = _run(f"import {module}", "-X", "importtime")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="Comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports listed for the first module")
+    args = parser.parse_args(argv)
+    modules = [name.strip() for name in args.modules.split(",") if name.strip()]
+
+    print(f"{'module':<42} {'median ms':>10} {'min ms':>8}  heavy packages loaded")
+    for module in modules:
+        try:
+            samples = [import_seconds(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<42} {'skipped':>10}  {str(e).splitlines()[-1]}")
+            continue
+        times = [seconds * 1000 for seconds, _ in samples]
+        heavy = ", ".join(samples[-1][1]) or "-"
+        print(f"{module:<42} {statistics.median(times):10.1f} {min(times):8.1f}  {heavy}")
+
+    if modules:
+        print(f"\nSlowest imports (self time) for {modules[0]}:")
+        for self_us, name in slowest_imports(modules[0], args.top):
+            print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    result = _run(_BUILD_GRAPHS)
+    if result.returncode == 0:
+        print(f"\nCompiling both graphs after import: {float(result.stdout.strip().splitlines()[-1]) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Deterministic stand-in chat model for offline benchmarks.
+
+``FakeFunctionCallingChatModel`` answers the agents' function calls
+(``recommend_books``, ``rank_candidates``, ``recommend_cross_domain`` and the
+batched variant) with canned payloads. Latency, transient failures and
+malformed responses can be configured to exercise the real retry, validation
+and caching paths without network access or API spend.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+import openai
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+_BOOK_INDEX_PATTERN = re.compile(r"^\s*\[(\d+)\]", re.MULTILINE)
+
+
+def _movie_game_song(seed: str) -> Dict[str, Dict[str, str]]:
+    return {
+        "movie": {"title": f"Movie {seed}", "year": "1999", "description": "A film.", "reason": "Shared themes."},
+        "game": {"title": f"Game {seed}", "platform": "PC", "description": "A game.", "reason": "Shared themes."},
+        "song": {"title": f"Song {seed}", "artist": "Artist", "description": "A song.", "reason": "Shared mood."},
+    }
+
+
+def canned_arguments(function_name: str, prompt: str) -> Dict[str, Any]:
+    """
+    Build a schema-valid function-call payload for a prompt.
+
+    The payload is derived from a hash of the prompt so identical prompts
+    always receive identical answers.
+
+    Args:
+        function_name: Function the agent forced the model to call
+        prompt: Text of the last human message
+
+    Returns:
+        Arguments dictionary for the function call
+    """
+    seed = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    if function_name == "recommend_books":
+        return {"recommendations": [
+            {
+                "title": f"Book {seed}-{index}",
+                "author": f"Author {index}",
+                "genre": "Fiction",
+                "description": "A canned description used for benchmarking the pipeline.",
+                "reason": "It matches the request in a deterministic way.",
+            }
+            for index in range(4)
+        ]}
+    if function_name == "rank_candidates":
+        count = len(_BOOK_INDEX_PATTERN.findall(prompt))
+        return {"rankings": [
+            {"index": index, "reason": "It matches the request in a deterministic way."}
+            for index in range(min(4, count))
+        ]}
+    if function_name == "recommend_cross_domain_batch":
+        count = len(_BOOK_INDEX_PATTERN.findall(prompt)) or 1
+        return {"results": [
+            {"book_index": index, **_movie_game_song(f"{seed}-{index}")} for index in range(count)
+        ]}
+    return _movie_game_song(seed)
+
+
+class FakeFunctionCallingChatModel(BaseChatModel):
+    """Chat model returning canned function calls after a simulated latency."""
+
+    latency_median: float = 0.0
+    """Median response latency in seconds."""
+    latency_sigma: float = 0.0
+    """Log-normal spread of the latency; 0 makes every call take the median."""
+    failure_rate: float = 0.0
+    """Fraction of calls raising a retryable 500 error."""
+    invalid_rate: float = 0.0
+    """Fraction of calls returning arguments that fail schema validation."""
+    stream_chunk_size: int = 16
+    """Characters of function-call arguments per streamed chunk."""
+    seed: Optional[int] = None
+    """Seed for the latency and failure draws."""
+
+    _rng: random.Random = PrivateAttr()
+    _seen_prefixes: set = PrivateAttr(default_factory=set)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-function-calling"
+
+    def _latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self.latency_median * math.exp(self.latency_sigma * self._rng.gauss(0, 1))
+
+    def _respond(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        if self._rng.random() < self.failure_rate:
+            response = httpx.Response(500, request=httpx.Request("POST", "http://fake-llm.local/v1/chat/completions"))
+            raise openai.InternalServerError("Simulated upstream failure", response=response, body=None)
+
+        function_name = (kwargs.get("function_call") or {}).get("name", "")
+        prompt = str(messages[-1].content) if messages else ""
+        if self._rng.random() < self.invalid_rate:
+            arguments = '{"unexpected": true}'
+        else:
+            arguments = json.dumps(canned_arguments(function_name, prompt))
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(arguments) // 4
+        # Mimic provider prompt caching: a repeated leading system message is served from cache
+        prefix = str(messages[0].content) if messages and messages[0].type == "system" else ""
+        cached_tokens = len(prefix) // 4 if prefix in self._seen_prefixes else 0
+        self._seen_prefixes.add(prefix)
+        return AIMessage(
+            content="",
+            additional_kwargs={"function_call": {"name": function_name, "arguments": arguments}},
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "input_token_details": {"cache_read": cached_tokens},
+            },
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._latency())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, **kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, **kwargs))])
+
+    def _chunks(self, message: AIMessage) -> List[ChatGenerationChunk]:
+        function_call = message.additional_kwargs["function_call"]
+        arguments = function_call["arguments"]
+        size = max(1, self.stream_chunk_size)
+        chunks = []
+        for start in range(0, len(arguments), size):
+            chunks.append(ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                additional_kwargs={"function_call": {
+                    "name": function_call["name"] if start == 0 else "",
+                    "arguments": arguments[start:start + size],
+                }},
+            )))
+        chunks.append(ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata)))
+        return chunks
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        latency = self._latency()
+        chunks = self._chunks(self._respond(messages, **kwargs))
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            if run_manager:
+                run_manager.on_llm_new_token("", chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        latency = self._latency()
+        chunks = self._chunks(self._respond(messages, **kwargs))
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            if run_manager:
+                await run_manager.on_llm_new_token("", chunk=chunk)
+            yield chunk
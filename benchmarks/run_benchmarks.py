@@ -0,0 +1,256 @@
+"""Offline benchmark harness for the recommendation pipeline.
+
+Swaps every agent's chat model for ``FakeFunctionCallingChatModel`` and drives
+the service functions and the controller from a thread pool, the way
+Streamlit script threads call them. For each concurrency level it reports
+throughput, p50/p95/p99 latency, CPU time per request and memory.
+
+With the default zero latency the numbers isolate framework overhead: graph
+execution, Pydantic validation, caching and logging.
+
+Usage:
+    python -m benchmarks.run_benchmarks --targets book,cross_domain --concurrency 1,8,32
+    python -m benchmarks.run_benchmarks --latency 0.8 --latency-sigma 0.4 --failure-rate 0.05
+    python -m benchmarks.run_benchmarks --latency 0.2 --latency-sigma 1.0 --hedging
+    python -m benchmarks.run_benchmarks --latency 0.8 --routing --small-latency 0.3 --small-invalid-rate 0.1
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from agents.base_agent import set_llm_factory
+from agents.registry import get_book_graph, get_cross_domain_graph, invalidate_graphs
+from agents.routing import SMALL, get_model_router
+from benchmarks.fake_llm import FakeFunctionCallingChatModel
+from models import BookRecommendation
+from services.result_store import reset_result_store
+from utils import configure_logging
+
+TOPICS = [
+    "sci-fi about time travel", "magical realism like Garcia Marquez", "cozy mysteries",
+    "epic fantasy with dragons", "literary fiction about grief", "space opera",
+    "historical fiction set in Rome", "nonfiction about habits", "gothic horror", "climate fiction",
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def query_for(index: int, distinct: int) -> str:
+    """Return the benchmark query for request ``index``; ``distinct`` bounds cache diversity."""
+    slot = index % distinct
+    return f"{TOPICS[slot % len(TOPICS)]} {slot}"
+
+
+def book_for(index: int, distinct: int) -> BookRecommendation:
+    """Return the benchmark book for request ``index``."""
+    slot = index % distinct
+    return BookRecommendation(
+        title=f"Benchmark Book {slot}",
+        author=f"Author {slot % 17}",
+        genre=TOPICS[slot % len(TOPICS)],
+        description="A book used to drive the cross-domain benchmark.",
+        reason="Selected by the benchmark.",
+    )
+
+
+def build_targets(distinct: int) -> Dict[str, Callable[[int], object]]:
+    """Map target names to callables performing one request."""
+    from services.recommendation_service import (
+        get_book_recommendations,
+        get_cross_domain_recommendations,
+        stream_book_recommendations,
+    )
+
+    from controllers.recommendation_controller import RecommendationController
+    # Streamlit configures its loggers on import; session state works without a script run context
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    def controller(index: int):
+        controller = RecommendationController()
+        controller.handle_book_recommendations(query_for(index, distinct))
+        return controller.handle_cross_domain_recommendations(0)
+
+    return {
+        "book": lambda index: get_book_recommendations(query_for(index, distinct)),
+        "stream": lambda index: list(stream_book_recommendations(query_for(index, distinct))),
+        "cross_domain": lambda index: get_cross_domain_recommendations(book_for(index, distinct)),
+        "controller": controller,
+    }
+
+
+def run_level(request: Callable[[int], object], requests: int, concurrency: int) -> Dict[str, float]:
+    """Issue ``requests`` calls with ``concurrency`` worker threads and summarize them."""
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(index: int) -> float:
+        start = time.perf_counter()
+        request(index)
+        return time.perf_counter() - start
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in concurrent.futures.as_completed([pool.submit(timed, i) for i in range(requests)]):
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    completed = max(1, len(latencies))
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_ms_per_request": cpu / completed * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def bench_graph_build(iterations: int) -> Dict[str, float]:
+    """Measure the cost of constructing agents and compiling both graphs."""
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        invalidate_graphs()
+        get_book_graph()
+        get_cross_domain_graph()
+    return {
+        "iterations": iterations,
+        "wall_ms_per_build": (time.perf_counter() - start) / iterations * 1000,
+        "cpu_ms_per_build": (time.process_time() - start_cpu) / iterations * 1000,
+    }
+
+
+def configure(args: argparse.Namespace, workdir: str) -> None:
+    """Point the application at the fake model and isolate its caches."""
+    configure_logging(args.log_level)
+    logging.getLogger().setLevel(args.log_level)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+
+    config.BOOK_CACHE_ENABLED = args.cache
+    config.CROSS_DOMAIN_CACHE_PATH = os.path.join(workdir, "cross_domain.sqlite3") if args.cache else ""
+    config.RESULT_STORE_BACKEND = "memory" if args.cache else "none"
+    reset_result_store()
+    # The admission controller is created on first use, after this point
+    if args.admission_concurrency is not None:
+        config.ADMISSION_MAX_CONCURRENCY = args.admission_concurrency
+    config.PREFETCH_CROSS_DOMAIN = False
+    config.LLM_REQUESTS_PER_MINUTE = 0
+    config.LLM_TOKENS_PER_MINUTE = 0
+    config.LLM_RETRY_BASE_DELAY = args.retry_base_delay
+    config.MODEL_ROUTING_ENABLED = args.routing
+    config.HEDGING_ENABLED = args.hedging
+    get_model_router().reset()
+
+    def fake_llm(agent, tier: str) -> FakeFunctionCallingChatModel:
+        small = tier == SMALL
+        return FakeFunctionCallingChatModel(
+            latency_median=args.small_latency if small and args.small_latency is not None else args.latency,
+            latency_sigma=args.latency_sigma,
+            failure_rate=args.failure_rate,
+            invalid_rate=args.small_invalid_rate if small and args.small_invalid_rate is not None
+            else args.invalid_rate,
+            seed=args.seed,
+            metadata={"agent_type": agent.__class__.__name__, "ls_model_name": f"fake-{tier}"},
+        )
+
+    set_llm_factory(fake_llm)
+    invalidate_graphs()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", default="book,cross_domain,controller",
+                        help="Comma-separated subset of book, stream, cross_domain, controller")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Distinct queries/books to cycle through (0 = every request distinct)")
+    parser.add_argument("--cache", action="store_true", help="Keep the response caches enabled")
+    parser.add_argument("--latency", type=float, default=0.0, help="Median fake LLM latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="Log-normal latency spread")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of retryable 500 errors")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of invalid payloads")
+    parser.add_argument("--routing", action="store_true",
+                        help="Enable model routing between the small and large fake models")
+    parser.add_argument("--hedging", action="store_true",
+                        help="Hedge calls slower than the observed p90 (use with --latency-sigma)")
+    parser.add_argument("--small-latency", type=float, default=None,
+                        help="Median latency of the small fake model (defaults to --latency)")
+    parser.add_argument("--small-invalid-rate", type=float, default=None,
+                        help="Invalid payload rate of the small fake model (defaults to --invalid-rate)")
+    parser.add_argument("--admission-concurrency", type=int, default=None,
+                        help="Override ADMISSION_MAX_CONCURRENCY (0 disables admission control)")
+    parser.add_argument("--retry-base-delay", type=float, default=0.01, help="Retry backoff base in seconds")
+    parser.add_argument("--build-iterations", type=int, default=20, help="Graph builds to time (0 skips)")
+    parser.add_argument("--trace-memory", action="store_true", help="Report tracemalloc peak (slower)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--log-level", default="WARNING", help="Application log level during the run")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bookrec-bench-") as workdir:
+        configure(args, workdir)
+        results: Dict[str, object] = {"settings": vars(args)}
+
+        if args.build_iterations:
+            results["graph_build"] = build = bench_graph_build(args.build_iterations)
+            print(f"graph build: {build['wall_ms_per_build']:.2f} ms wall, "
+                  f"{build['cpu_ms_per_build']:.2f} ms CPU per build")
+
+        if args.trace_memory:
+            tracemalloc.start()
+
+        targets = build_targets(args.distinct or args.requests)
+        header = f"{'target':<13}{'conc':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'cpu ms/req':>12}{'errors':>8}{'rss MB':>9}"
+        print(header)
+        print("-" * len(header))
+        for name in [target.strip() for target in args.targets.split(",") if target.strip()]:
+            request = targets[name]
+            request(0)  # Warm up graphs, caches and the shared event loop
+            for concurrency in [int(level) for level in args.concurrency.split(",")]:
+                level = run_level(request, args.requests, concurrency)
+                if args.trace_memory:
+                    level["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+                    tracemalloc.reset_peak()
+                results.setdefault("runs", []).append({"target": name, **level})
+                print(f"{name:<13}{concurrency:>5}{level['throughput_rps']:>10.1f}{level['p50_ms']:>10.2f}"
+                      f"{level['p95_ms']:>10.2f}{level['p99_ms']:>10.2f}{level['cpu_ms_per_request']:>12.3f}"
+                      f"{level['errors']:>8}{level['max_rss_mb']:>9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Local book catalog used to ground recommendations in real titles."""
@@ -0,0 +1,55 @@
+"""Build a catalog index from a book dump or an existing catalog store.
+
+A CSV/TSV/JSONL dump is first ingested into a columnar store in the output
+directory (see ``catalog.ingest``); a store directory is indexed in place.
+
+Usage:
+    python -m catalog.build_index books.csv.gz --output .cache/catalog_index
+    python -m catalog.build_index .cache/catalog_index --embedder openai
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from catalog.index import HashingEmbedder, OpenAIEmbedder, build_index
+from catalog.ingest import ingest, parse_column_map
+from catalog.store import CatalogStore
+from utils import configure_logging
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Book dump (CSV, TSV or JSONL, optionally .gz) or a catalog store directory")
+    parser.add_argument("--output", default=None,
+                        help="Index directory to write; defaults to the input store or CATALOG_INDEX_PATH")
+    parser.add_argument("--map", dest="column_map", default="",
+                        help="Source fields for store columns, e.g. title=Book-Title,author=Book-Author")
+    parser.add_argument("--embedder", choices=["hashing", "openai"], default="hashing",
+                        help="Local hashing embedder, or the configured OpenAI embedding model")
+    parser.add_argument("--dimensions", type=int, default=512, help="Vector size for the hashing embedder")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if os.path.isdir(args.input) and CatalogStore.exists(args.input):
+        output = args.output or args.input
+        if os.path.abspath(output) != os.path.abspath(args.input):
+            parser.error("a store directory is indexed in place; omit --output")
+    else:
+        output = args.output or config.CATALOG_INDEX_PATH or ".cache/catalog_index"
+        ingest(args.input, output, "books", parse_column_map(args.column_map))
+
+    if args.embedder == "openai":
+        embedder = OpenAIEmbedder(config.EMBEDDING_MODEL)
+    else:
+        embedder = HashingEmbedder(args.dimensions)
+    count = build_index(output, embedder)
+    print(f"Indexed {count} books into {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
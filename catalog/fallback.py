@@ -0,0 +1,137 @@
+"""Precomputed recommendations served when the LLM is unavailable.
+
+The fallback index is a small curated list of well-known books, each tagged
+with a genre and a few themes, plus one movie/game/song triple per genre. It
+is loaded from JSON (``catalog/data/fallback_books.json`` unless
+``FALLBACK_INDEX_PATH`` points elsewhere) and indexed by genre, author, theme
+and title words. Lookups need no model and no network access and take well
+under a millisecond.
+
+Results are real ``BookRecommendation`` / ``CrossDomainRecommendation``
+objects with ``is_fallback`` set, so callers can show them the same way as
+live results and flag them to the user.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import config
+from models import BookRecommendation, CrossDomainRecommendation
+from utils import logger
+from .text import tokenize
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fallback_books.json")
+
+# Score added per query word matching a book's field
+_WEIGHTS = {"author": 4.0, "genre": 3.0, "theme": 2.0, "title": 1.0}
+
+
+class FallbackIndex:
+    """Keyword index over the curated fallback books and cross-domain triples."""
+
+    def __init__(self, books: List[Dict[str, object]], cross_domain: Dict[str, Dict[str, dict]]):
+        """
+        Build the index.
+
+        Args:
+            books: Records with title, author, genre, description and themes
+            cross_domain: Movie/game/song triples keyed by lowercase genre, with a ``default`` entry
+        """
+        self.books = books
+        self.cross_domain = cross_domain
+        # Normalized word -> {book position: score}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for position, book in enumerate(books):
+            fields = {
+                "author": str(book["author"]),
+                "genre": str(book["genre"]),
+                "theme": " ".join(book.get("themes", [])),
+                "title": str(book["title"]),
+            }
+            for field, text in fields.items():
+                for word in tokenize(text):
+                    postings = self._postings[word]
+                    postings[position] = max(postings.get(position, 0.0), _WEIGHTS[field])
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "FallbackIndex":
+        """Load an index from a JSON file with ``books`` and ``cross_domain`` keys."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("books", []), data.get("cross_domain", {}))
+
+    def _book(self, position: int, reason: str) -> BookRecommendation:
+        book = self.books[position]
+        return BookRecommendation(
+            title=book["title"],
+            author=book["author"],
+            genre=book["genre"],
+            description=book["description"],
+            reason=reason,
+            is_fallback=True
+        )
+
+    def recommend(self, query: str, limit: int = 5) -> List[BookRecommendation]:
+        """
+        Return the curated books best matching a free-text request.
+
+        Books are ranked by how many of the request's words match their
+        author, genre, themes and title. A request matching nothing gets the
+        first books of the list, which are broadly popular picks.
+
+        Args:
+            query: Raw user input
+            limit: Most books returned
+
+        Returns:
+            Fallback recommendations, best match first
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, List[str]] = defaultdict(list)
+        # Relation and filler words ("like", "for") carry no topic, so they never match a book
+        for word in dict.fromkeys(tokenize(query)):
+            for position, weight in self._postings.get(word, {}).items():
+                scores[position] += weight
+                matched[position].append(word)
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))[:limit]
+        if not ranked:
+            return [
+                self._book(position, "A widely loved pick from our offline favourites.")
+                for position in range(min(limit, len(self.books)))
+            ]
+        return [
+            self._book(position, f"An offline pick matching {', '.join(matched[position])}.")
+            for position in ranked
+        ]
+
+    def cross_domain_for(self, book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+        """Return the curated movie/game/song triple for a book's genre, or the default triple."""
+        genre = " ".join(book.genre.lower().split())
+        triple = self.cross_domain.get(genre)
+        if triple is None:
+            triple = next((value for key, value in self.cross_domain.items() if key != "default" and key in genre),
+                          self.cross_domain.get("default"))
+        if triple is None:
+            return None
+        return CrossDomainRecommendation(**triple, is_fallback=True)
+
+
+_index: Optional[FallbackIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_fallback_index() -> Optional[FallbackIndex]:
+    """Return the process-wide fallback index, or None if it cannot be loaded."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = config.FALLBACK_INDEX_PATH or DEFAULT_PATH
+            try:
+                _index = FallbackIndex.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not load fallback recommendations from {path}: {e}")
+                return None
+        return _index
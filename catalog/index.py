@@ -0,0 +1,261 @@
+"""Embedding index over a book catalog.
+
+An index is a catalog store directory (see ``catalog/store.py``) that also holds:
+- ``vectors.npy``: one L2-normalized float32 row per book, memory-mapped at load time
+- ``idf.npy``: inverse document frequency per dimension, for the hashing embedder
+- ``index.json``: format version, size and the embedder used to build the vectors
+
+Search is exact: the query vector is scored against the memory-mapped rows in
+blocks and the top-k kept with ``argpartition``, so memory stays flat however
+large the catalog is.
+"""
+
+import json
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import logger
+from .store import CatalogStore
+from .text import TOKENIZER_VERSION, tokenize
+
+INDEX_VERSION = 2
+VECTORS_FILE = "vectors.npy"
+IDF_FILE = "idf.npy"
+MANIFEST_FILE = "index.json"
+BOOK_FIELDS = ("title", "author", "genre", "description")
+
+# Rows scored per matrix-vector product during search
+_SEARCH_BLOCK_ROWS = 65536
+
+
+def book_text(book: Dict[str, str]) -> str:
+    """Return the text embedded for a catalog record."""
+    return " ".join(str(book.get(field) or "") for field in BOOK_FIELDS)
+
+
+class HashingEmbedder:
+    """Deterministic TF-IDF bag-of-words embedder using the hashing trick; runs locally with no model."""
+
+    name = "hashing"
+
+    def __init__(self, dimensions: int = 512, idf: Optional[np.ndarray] = None):
+        self.dimensions = dimensions
+        self.idf = idf
+
+    def _features(self, text: str) -> List[Tuple[int, float]]:
+        # Queries and catalog text go through the same retrieval tokenizer; each distinct token counts once
+        features = []
+        for token in dict.fromkeys(tokenize(text)):
+            digest = zlib.crc32(token.encode("utf-8"))
+            # The top bit picks a sign so colliding tokens tend to cancel rather than add up
+            features.append((digest % self.dimensions, -1.0 if digest & 0x80000000 else 1.0))
+        return features
+
+    def fit(self, texts: Iterable[str]) -> None:
+        """Weight each dimension by its inverse document frequency over ``texts``."""
+        document_frequency = np.zeros(self.dimensions, dtype=np.float64)
+        count = 0
+        for text in texts:
+            document_frequency[list({column for column, _ in self._features(text)})] += 1
+            count += 1
+        self.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts as L2-normalized rows.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Float32 array of shape (len(texts), dimensions)
+        """
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for column, sign in self._features(text):
+                vectors[row, column] += sign
+        if self.idf is not None:
+            vectors *= self.idf
+        return _normalize(vectors)
+
+    def manifest(self) -> Dict[str, object]:
+        return {"name": self.name, "dimensions": self.dimensions, "tokenizer": TOKENIZER_VERSION}
+
+
+class OpenAIEmbedder:
+    """Embeds text with an OpenAI embedding model."""
+
+    name = "openai"
+
+    def __init__(self, model: str):
+        from langchain_openai import OpenAIEmbeddings
+        from agents.http_clients import get_async_http_client, get_http_client
+        self.model = model
+        self._embeddings = OpenAIEmbeddings(
+            model=model, http_client=get_http_client(), http_async_client=get_async_http_client()
+        )
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as L2-normalized float32 rows."""
+        return _normalize(np.asarray(self._embeddings.embed_documents(list(texts)), dtype=np.float32))
+
+    def manifest(self) -> Dict[str, object]:
+        return {"name": self.name, "model": self.model}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def embedder_from_manifest(manifest: Dict[str, object], path: str):
+    """Recreate the embedder the index at ``path`` was built with."""
+    if manifest.get("name") == OpenAIEmbedder.name:
+        return OpenAIEmbedder(str(manifest["model"]))
+    if manifest.get("name") == HashingEmbedder.name:
+        if manifest.get("tokenizer") != TOKENIZER_VERSION:
+            # Features are hashed tokens; different tokens would silently mismatch the stored vectors
+            raise ValueError(
+                f"Catalog index at {path} was built with tokenizer version {manifest.get('tokenizer')}; "
+                f"rebuild it with catalog.build_index"
+            )
+        idf_path = os.path.join(path, IDF_FILE)
+        idf = np.load(idf_path) if os.path.exists(idf_path) else None
+        return HashingEmbedder(int(manifest["dimensions"]), idf)
+    raise ValueError(f"Unknown catalog embedder: {manifest.get('name')}")
+
+
+def build_index(path: str, embedder=None, batch_size: int = 1024) -> int:
+    """
+    Embed the catalog store at ``path`` and write the index files next to it.
+
+    Rows are read from the memory-mapped store in batches, so memory stays
+    flat for any catalog size. The manifest is written last, so a partially
+    written index is never loaded.
+
+    Args:
+        path: Catalog store directory, e.g. written by ``catalog.ingest``
+        embedder: Embedder to use; defaults to a 512-dimension HashingEmbedder
+        batch_size: Records embedded per call
+
+    Returns:
+        Number of indexed books
+    """
+    embedder = embedder or HashingEmbedder()
+    store = CatalogStore(path)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    if isinstance(embedder, HashingEmbedder):
+        embedder.fit(book_text(book) for book in store)
+        np.save(os.path.join(path, IDF_FILE), embedder.idf)
+
+    vectors = None
+    for start in range(0, len(store), batch_size):
+        rows = range(start, min(start + batch_size, len(store)))
+        batch = embedder.embed([book_text(store[row]) for row in rows])
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(
+                os.path.join(path, VECTORS_FILE), mode="w+", dtype=np.float32,
+                shape=(len(store), batch.shape[1])
+            )
+        vectors[start:start + len(batch)] = batch
+    if vectors is not None:
+        vectors.flush()
+        del vectors
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "size": len(store), "embedder": embedder.manifest()}, f)
+    logger.info(f"Built catalog index of {len(store)} books at {path}")
+    return len(store)
+
+
+class CatalogIndex:
+    """Read-only, memory-mapped catalog index with exact top-k search."""
+
+    def __init__(self, path: str):
+        """
+        Open an index directory built by ``build_index``.
+
+        Args:
+            path: Index directory
+
+        Raises:
+            FileNotFoundError: If the directory holds no complete index
+            ValueError: If the index was written by an incompatible version
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported catalog index version {manifest.get('version')} at {path}")
+        self.embedder = embedder_from_manifest(manifest["embedder"], path)
+        self.size = int(manifest["size"])
+        if self.size:
+            # Pages are loaded on demand and shared with other processes mapping the same file
+            self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        else:
+            self.vectors = np.zeros((0, 1), dtype=np.float32)
+        self.store = CatalogStore(path)
+        logger.info(f"Loaded catalog index of {self.size} books from {path}")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def search(self, query: str, k: int = 20, min_score: float = 0.0) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Return the catalog books most similar to a query.
+
+        Args:
+            query: Free-text request
+            k: Maximum number of results
+            min_score: Minimum cosine similarity to include a result
+
+        Returns:
+            (book, score) pairs ordered by descending score
+        """
+        if not self.size or k <= 0:
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, self.size, _SEARCH_BLOCK_ROWS):
+            scores = self.vectors[start:start + _SEARCH_BLOCK_ROWS] @ query_vector
+            rows = np.arange(start, start + len(scores))
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                scores, rows = scores[top], rows[top]
+            best_scores = np.concatenate([best_scores, scores])
+            best_rows = np.concatenate([best_rows, rows])
+            if len(best_scores) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_scores, best_rows = best_scores[top], best_rows[top]
+
+        order = np.argsort(-best_scores)
+        return [
+            (self.store[int(best_rows[i])], float(best_scores[i]))
+            for i in order if best_scores[i] >= min_score
+        ]
+
+
+_open_indexes: Dict[str, CatalogIndex] = {}
+_open_indexes_lock = threading.Lock()
+
+
+def open_catalog_index(path: str) -> Optional[CatalogIndex]:
+    """Return the process-wide index for a directory, or None if it holds no index."""
+    path = os.path.abspath(path)
+    with _open_indexes_lock:
+        index = _open_indexes.get(path)
+        if index is None:
+            if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+                logger.warning(f"No catalog index found at {path}; retrieval is disabled")
+                return None
+            index = _open_indexes[path] = CatalogIndex(path)
+        return index
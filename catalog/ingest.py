@@ -0,0 +1,208 @@
+"""Stream large book/movie/game/song dumps into a columnar catalog store.
+
+Rows are read one at a time from CSV or JSON-lines files, optionally
+gzip-compressed. Each row is normalized and deduplicated, then appended
+straight to buffered column files. Records are never held in memory; the
+only per-row state is a 64-bit identity hash and an 8-byte offset per text
+column.
+
+Usage:
+    python -m catalog.ingest books.csv.gz --kind books --output .cache/catalog_index
+    python -m catalog.ingest goodreads.jsonl --map title=original_title,author=authors
+"""
+
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, TextIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog.store import KIND_COLUMNS, CatalogStoreWriter
+from utils import configure_logging, logger
+
+# Column that, together with the title, identifies a record of each kind
+IDENTITY_COLUMNS = {"books": "author", "movies": "year", "games": "platform", "songs": "artist"}
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# Trailing format/edition markers that split one work into several rows, e.g. "Dune (Paperback)"
+_EDITION_SUFFIX = re.compile(
+    r"\s*[\(\[](?:paperback|hardcover|mass market paperback|kindle edition|ebook|audiobook|"
+    r"unabridged|abridged|reprint|[^\)\]]*edition)[\)\]]\s*$",
+    re.IGNORECASE,
+)
+# Authors beyond the first are dropped, e.g. "Terry Pratchett, Neil Gaiman" or "A & B"
+_AUTHOR_SEPARATORS = re.compile(r"\s*(?:;|&|\band\b|/)\s*", re.IGNORECASE)
+# Words that begin a multi-word surname ("Le Guin", "van Gogh") rather than a given name
+_SURNAME_PARTICLES = frozenset({
+    "al", "bin", "da", "de", "del", "della", "der", "di", "du", "el", "la", "le", "st", "st.", "van", "von",
+})
+_INITIAL = re.compile(r"^(?:\w\.)+$|^\w$")
+
+
+@dataclass
+class IngestStats:
+    """Row counts for one ingestion run."""
+    read: int = 0
+    written: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+
+
+def clean_text(value: Optional[str]) -> str:
+    """Unicode-normalize and collapse whitespace."""
+    if value is None:
+        return ""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(value))).strip()
+
+
+def normalize_title(value: Optional[str]) -> str:
+    """Clean a title and drop trailing edition markers."""
+    title = clean_text(value)
+    while True:
+        stripped = _EDITION_SUFFIX.sub("", title)
+        if stripped == title:
+            return title.strip(" \"'")
+        title = stripped
+
+
+def _looks_like_full_name(part: str) -> bool:
+    # "Stephen King" does; a surname ("Le Guin") or given names ending in an initial ("Ursula K.") do not
+    words = part.split()
+    return len(words) >= 2 and words[0].lower() not in _SURNAME_PARTICLES and not _INITIAL.match(words[-1])
+
+
+def normalize_author(value: Optional[str]) -> str:
+    """Clean an author name, keep the first of several, and turn "Last, First" into "First Last"."""
+    author = _AUTHOR_SEPARATORS.split(clean_text(value))[0]
+    parts = [part.strip() for part in author.split(",")]
+    if len(parts) > 2 or (len(parts) == 2 and all(_looks_like_full_name(part) for part in parts)):
+        # "A B, C D" lists several people; keep the first
+        author = parts[0]
+    elif len(parts) == 2 and all(parts):
+        author = f"{parts[1]} {parts[0]}"
+    return author
+
+
+def identity_hash(*values: str) -> int:
+    """64-bit hash of case-, accent- and punctuation-insensitive values."""
+    folded = []
+    for value in values:
+        decomposed = unicodedata.normalize("NFKD", value.casefold())
+        stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+        folded.append(_WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", stripped)).strip())
+    digest = hashlib.blake2b("\x1f".join(folded).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """Yield raw rows from a CSV or JSON-lines file, optionally gzip-compressed."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open_text(path) as f:
+        if name.lower().endswith((".csv", ".tsv")):
+            # Descriptions in public dumps can exceed the csv module's default field limit
+            csv.field_size_limit(2**31 - 1)
+            yield from csv.DictReader(f, delimiter="\t" if name.lower().endswith(".tsv") else ",")
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed JSON line in {path}")
+
+
+def ingest(path: str, output: str, kind: str = "books",
+           column_map: Optional[Dict[str, str]] = None,
+           log_every: int = 100_000) -> IngestStats:
+    """
+    Stream a dump into a catalog store.
+
+    Args:
+        path: CSV/TSV/JSONL file, optionally ``.gz``
+        output: Store directory to write
+        kind: Catalog kind selecting the stored columns
+        column_map: Store column name -> source field name, for dumps with other headers
+        log_every: Log progress after this many rows
+
+    Returns:
+        Row counts for the run
+    """
+    columns = KIND_COLUMNS[kind]
+    identity = IDENTITY_COLUMNS[kind]
+    column_map = column_map or {}
+    stats = IngestStats()
+    seen = set()
+    started = time.perf_counter()
+
+    with CatalogStoreWriter(output, kind) as writer:
+        for raw in read_rows(path):
+            stats.read += 1
+            row = {name: clean_text(raw.get(column_map.get(name, name))) for name in columns}
+            row["title"] = normalize_title(row["title"])
+            if "author" in row:
+                row["author"] = normalize_author(row["author"])
+            if not row["title"]:
+                stats.skipped += 1
+                continue
+
+            key = identity_hash(row["title"], row.get(identity, ""))
+            if key in seen:
+                stats.duplicates += 1
+                continue
+            seen.add(key)
+            writer.append(row)
+            stats.written += 1
+
+            if stats.read % log_every == 0:
+                logger.info(f"Ingested {stats.read} rows ({stats.written} kept) from {path}")
+
+    logger.info(
+        f"Ingested {path} into {output} in {time.perf_counter() - started:.1f}s: "
+        f"{stats.written} written, {stats.duplicates} duplicates, {stats.skipped} skipped"
+    )
+    return stats
+
+
+def parse_column_map(value: str) -> Dict[str, str]:
+    """Parse ``name=source,name=source`` into a dict."""
+    pairs = [item.split("=", 1) for item in value.split(",") if item.strip()]
+    return {name.strip(): source.strip() for name, source in pairs}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV, TSV or JSONL dump, optionally gzip-compressed")
+    parser.add_argument("--output", required=True, help="Store directory to write")
+    parser.add_argument("--kind", choices=sorted(KIND_COLUMNS), default="books")
+    parser.add_argument("--map", dest="column_map", default="",
+                        help="Source fields for store columns, e.g. title=Book-Title,author=Book-Author")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    stats = ingest(args.input, args.output, args.kind, parse_column_map(args.column_map))
+    print(f"Read {stats.read} rows: {stats.written} written, "
+          f"{stats.duplicates} duplicates, {stats.skipped} without a title")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
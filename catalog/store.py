@@ -0,0 +1,211 @@
+"""Compact, memory-mappable columnar storage for catalog records.
+
+A store is a directory with a ``store.json`` manifest and one set of files per
+column:
+- text columns: ``<name>.offsets.npy`` (int64, one more entry than rows) and
+  ``<name>.data.bin`` (the UTF-8 bytes of every value back to back)
+- interned columns: ``<name>.codes.npy`` (uint32 per row) plus a text column
+  ``<name>.dict`` holding each distinct value once
+
+Opening a store maps these files instead of reading them. Startup therefore
+costs a few system calls whatever the catalog size, and worker processes
+share the same page cache rather than each holding a copy of the records.
+"""
+
+import json
+import os
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+STORE_VERSION = 1
+MANIFEST_FILE = "store.json"
+
+# Columns stored per catalog kind, and which of them repeat enough to be interned
+KIND_COLUMNS: Dict[str, Sequence[str]] = {
+    "books": ("title", "author", "genre", "description"),
+    "movies": ("title", "year", "genre", "description"),
+    "games": ("title", "platform", "genre", "description"),
+    "songs": ("title", "artist", "genre", "description"),
+}
+INTERNED_COLUMNS = frozenset({"author", "genre", "year", "platform", "artist"})
+
+
+class _TextColumnWriter:
+    def __init__(self, path: str, name: str):
+        self._data = open(os.path.join(path, f"{name}.data.bin"), "wb")
+        self._offsets = array("q", [0])
+        self._offsets_path = os.path.join(path, f"{name}.offsets.npy")
+
+    def append(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self._data.write(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded))
+
+    def close(self) -> None:
+        self._data.close()
+        np.save(self._offsets_path, np.frombuffer(self._offsets, dtype=np.int64))
+
+
+class _InternedColumnWriter:
+    def __init__(self, path: str, name: str):
+        self._codes = array("I")
+        self._codes_path = os.path.join(path, f"{name}.codes.npy")
+        self._dictionary = _TextColumnWriter(path, f"{name}.dict")
+        self._lookup: Dict[str, int] = {}
+
+    def append(self, value: str) -> None:
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self._lookup)
+            self._dictionary.append(value)
+        self._codes.append(code)
+
+    def close(self) -> None:
+        self._dictionary.close()
+        np.save(self._codes_path, np.frombuffer(self._codes, dtype=np.uint32))
+
+
+class CatalogStoreWriter:
+    """Appends rows to a new store; the manifest is written on ``close``."""
+
+    def __init__(self, path: str, kind: str, columns: Optional[Sequence[str]] = None):
+        """
+        Start writing a store, replacing any store already at ``path``.
+
+        Args:
+            path: Output directory
+            kind: Catalog kind, e.g. ``books``
+            columns: Column names; defaults to the kind's standard columns
+        """
+        self.path = path
+        self.kind = kind
+        self.columns = tuple(columns or KIND_COLUMNS[kind])
+        self.size = 0
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        self._writers = {
+            name: _InternedColumnWriter(path, name) if name in INTERNED_COLUMNS else _TextColumnWriter(path, name)
+            for name in self.columns
+        }
+
+    def append(self, row: Dict[str, str]) -> None:
+        """Add one row; missing columns are stored as empty strings."""
+        for name, writer in self._writers.items():
+            writer.append(row.get(name) or "")
+        self.size += 1
+
+    def close(self) -> None:
+        """Finish the column files and publish the manifest."""
+        for writer in self._writers.values():
+            writer.close()
+        manifest = {
+            "version": STORE_VERSION,
+            "kind": self.kind,
+            "size": self.size,
+            "columns": [
+                {"name": name, "interned": name in INTERNED_COLUMNS} for name in self.columns
+            ],
+        }
+        with open(os.path.join(self.path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    def __enter__(self) -> "CatalogStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def _map(path: str) -> np.ndarray:
+    # np.memmap rejects empty files, and an empty column needs no mapping
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+class TextColumn:
+    """Read-only view over a memory-mapped text column."""
+
+    def __init__(self, path: str, name: str):
+        self._offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+        self._data = _map(os.path.join(path, f"{name}.data.bin"))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+
+class InternedColumn:
+    """Read-only view over a dictionary-encoded column."""
+
+    def __init__(self, path: str, name: str):
+        self._codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode="r")
+        self._dictionary = TextColumn(path, f"{name}.dict")
+        self._decoded: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, row: int) -> str:
+        code = int(self._codes[row])
+        value = self._decoded.get(code)
+        if value is None:
+            value = self._decoded[code] = self._dictionary[code]
+        return value
+
+    def values(self) -> List[str]:
+        """Return every distinct value, in code order."""
+        return [self._dictionary[code] for code in range(len(self._dictionary))]
+
+
+class CatalogStore:
+    """Memory-mapped columnar catalog; rows are decoded only when accessed."""
+
+    def __init__(self, path: str):
+        """
+        Open a store written by ``CatalogStoreWriter``.
+
+        Args:
+            path: Store directory
+
+        Raises:
+            FileNotFoundError: If the directory holds no complete store
+            ValueError: If the store was written by an incompatible version
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported catalog store version {manifest.get('version')} at {path}")
+        self.kind = manifest["kind"]
+        self.size = int(manifest["size"])
+        self.columns = {
+            column["name"]: InternedColumn(path, column["name"]) if column["interned"]
+            else TextColumn(path, column["name"])
+            for column in manifest["columns"]
+        }
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Return whether ``path`` holds a complete store."""
+        return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, row: int) -> Dict[str, str]:
+        if not 0 <= row < self.size:
+            raise IndexError(row)
+        return {name: column[row] for name, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for row in range(self.size):
+            yield self[row]
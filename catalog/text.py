@@ -0,0 +1,53 @@
+"""Tokenizer for catalog retrieval.
+
+Retrieval wants the words that describe a book: topics, genres, names. Filler
+("recommend", "books") and relation words ("by", "like", "about", "for") say
+how the user phrased the request, not what it is about, so they are dropped.
+This differs on purpose from ``agents.response_cache.normalize_query``, where
+relation words must stay in the cache key.
+
+The hashing embedder stores ``TOKENIZER_VERSION`` in its index manifest; bump
+it whenever the output of ``tokenize`` changes so indexes built with the old
+tokens are rebuilt instead of silently searched with different features.
+"""
+
+import re
+from typing import List
+
+TOKENIZER_VERSION = 1
+
+STOPWORDS = frozenset({
+    "a", "about", "all", "an", "and", "any", "are", "as", "at", "be", "book",
+    "books", "but", "by", "can", "could", "find", "for", "from", "get", "give",
+    "good", "have", "i", "im", "in", "into", "is", "it", "its", "just",
+    "like", "looking", "love", "me", "more", "my", "novel", "novels", "of",
+    "on", "one", "or", "please", "read", "reading", "reads", "recommend",
+    "recommendation", "recommendations", "similar", "so", "some",
+    "something", "suggest", "than", "that", "the", "their", "them", "this",
+    "to", "want", "was", "what", "where", "which", "who", "with", "would",
+    "you",
+})
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into retrieval tokens.
+
+    Lowercases, drops stopwords and relation words and folds simple plurals.
+    Order and repeats are kept.
+
+    Args:
+        text: Query or catalog text
+
+    Returns:
+        Tokens in order of appearance
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
@@ -1,11 +1,141 @@
+import os
+
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables; this module is the only place .env is read
 load_dotenv()
 
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Compile the agent graphs on a background thread as soon as the app's first page has rendered
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
 # OpenAI model configuration
 MODEL_NAME = "gpt-4-turbo-preview"
 TEMPERATURE = 0.7
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Model routing: send simple requests to a small, fast model and escalate to MODEL_NAME when its
+# response fails validation
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "false").lower() == "true"
+SMALL_MODEL_NAME = os.getenv("SMALL_MODEL_NAME", "gpt-4o-mini")
+# Requests scoring below this complexity (0-1) are routed to the small model
+ROUTING_COMPLEXITY_THRESHOLD = float(os.getenv("ROUTING_COMPLEXITY_THRESHOLD", "0.5"))
+# While the large model averages more than this many seconds, borderline requests go small too (0 disables)
+ROUTING_LARGE_LATENCY_BUDGET_SECONDS = float(os.getenv("ROUTING_LARGE_LATENCY_BUDGET_SECONDS", "8"))
+# Stop routing to the small model while its recent error and invalid-response rate exceeds this
+ROUTING_SMALL_MAX_ERROR_RATE = float(os.getenv("ROUTING_SMALL_MAX_ERROR_RATE", "0.2"))
+
+# Render book recommendations incrementally as the LLM streams them
+STREAM_RECOMMENDATIONS = os.getenv("STREAM_RECOMMENDATIONS", "true").lower() == "true"
+
+# Retry and rate limiting for LLM calls (0 disables a per-minute limit)
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "150000"))
+# Expected completion size used when reserving token quota before a call
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "600"))
+
+# Timeouts: per HTTP request to the LLM, and overall deadlines for the LLM-bound graph nodes
+# including retries (0 disables a deadline)
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+BOOK_NODE_TIMEOUT_SECONDS = float(os.getenv("BOOK_NODE_TIMEOUT_SECONDS", "60"))
+CROSS_DOMAIN_NODE_TIMEOUT_SECONDS = float(os.getenv("CROSS_DOMAIN_NODE_TIMEOUT_SECONDS", "45"))
+
+# Shared HTTP connection pool of the OpenAI clients; HTTP/2 is used when h2 is installed
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Circuit breaker around LLM calls: trips when CIRCUIT_ERROR_RATE of the last CIRCUIT_WINDOW_SIZE
+# attempts failed, or CIRCUIT_SLOW_CALL_RATE took longer than CIRCUIT_SLOW_CALL_SECONDS; probes
+# again after CIRCUIT_OPEN_SECONDS
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "20"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "2"))
+
+# Answer from precomputed recommendations when the LLM fails or the circuit is open;
+# FALLBACK_INDEX_PATH overrides the bundled catalog/data/fallback_books.json
+FALLBACK_ENABLED = os.getenv("FALLBACK_ENABLED", "true").lower() == "true"
+FALLBACK_INDEX_PATH = os.getenv("FALLBACK_INDEX_PATH", "")
+
+# Admission control: upstream LLM calls running at once (0 disables), per-lane queue limits
+# (0 = unbounded) and maximum queue waits, and the share of slots prefetch and batch work may hold
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+ADMISSION_INTERACTIVE_QUEUE_LIMIT = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE_LIMIT", "64"))
+ADMISSION_PREFETCH_QUEUE_LIMIT = int(os.getenv("ADMISSION_PREFETCH_QUEUE_LIMIT", "16"))
+ADMISSION_BATCH_QUEUE_LIMIT = int(os.getenv("ADMISSION_BATCH_QUEUE_LIMIT", "0"))
+ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS", "15"))
+ADMISSION_PREFETCH_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_PREFETCH_MAX_WAIT_SECONDS", "5"))
+ADMISSION_BACKGROUND_SHARE = float(os.getenv("ADMISSION_BACKGROUND_SHARE", "0.5"))
+
+# Hedged requests: fire a duplicate LLM call when the first is slower than the observed
+# HEDGE_QUANTILE latency (after HEDGE_MIN_SAMPLES calls), hedging at most HEDGE_MAX_RATE of calls
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.9"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.1"))
+
+# Metrics: serve Prometheus text on this local port (0 disables) and/or dump to a file at exit
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", "")
+
+# Book recommendation response cache
+BOOK_CACHE_ENABLED = os.getenv("BOOK_CACHE_ENABLED", "true").lower() == "true"
+BOOK_CACHE_TTL_SECONDS = float(os.getenv("BOOK_CACHE_TTL_SECONDS", "3600"))
+BOOK_CACHE_MAX_ENTRIES = int(os.getenv("BOOK_CACHE_MAX_ENTRIES", "1024"))
+BOOK_CACHE_USE_EMBEDDINGS = os.getenv("BOOK_CACHE_USE_EMBEDDINGS", "false").lower() == "true"
+BOOK_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("BOOK_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+
+# Cross-domain result cache (SQLite); set to an empty string to disable
+CROSS_DOMAIN_CACHE_PATH = os.getenv("CROSS_DOMAIN_CACHE_PATH", ".cache/cross_domain.sqlite3")
+# Recently used entries mirrored in memory; the rest are read from SQLite
+PERSISTENT_CACHE_MEMORY_ENTRIES = int(os.getenv("PERSISTENT_CACHE_MEMORY_ENTRIES", "1024"))
+
+# Shared store of finished results read by the UI before calling the service:
+# "memory" (per process), "redis" (shared through REDIS_URL) or "none"
+RESULT_STORE_BACKEND = os.getenv("RESULT_STORE_BACKEND", "memory")
+RESULT_STORE_TTL_SECONDS = float(os.getenv("RESULT_STORE_TTL_SECONDS", "3600"))
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "2048"))
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(32 * 1024 * 1024)))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Speculatively generate cross-domain recommendations for every returned book
+PREFETCH_CROSS_DOMAIN = os.getenv("PREFETCH_CROSS_DOMAIN", "false").lower() == "true"
+PREFETCH_MAX_CONCURRENCY = int(os.getenv("PREFETCH_MAX_CONCURRENCY", "4"))
+# Generate all prefetched books in one batched LLM call instead of one call per book
+PREFETCH_BATCH_CROSS_DOMAIN = os.getenv("PREFETCH_BATCH_CROSS_DOMAIN", "true").lower() == "true"
+# Longest a click waits for a still-running prefetch before making its own interactive request
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "2"))
+
+# Multi-turn refinement: tokens of recent turns kept verbatim, cap on the summary of older
+# turns, and cap on history plus the new request sent to the LLM
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1200"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+CONVERSATION_MAX_PROMPT_TOKENS = int(os.getenv("CONVERSATION_MAX_PROMPT_TOKENS", "2000"))
+
+# Retrieval-first recommendations from a local catalog index (see catalog/); empty disables
+CATALOG_INDEX_PATH = os.getenv("CATALOG_INDEX_PATH", "")
+CATALOG_TOP_K = int(os.getenv("CATALOG_TOP_K", "20"))
+# Candidates scoring below this cosine similarity are not offered to the LLM
+CATALOG_MIN_SCORE = float(os.getenv("CATALOG_MIN_SCORE", "0.1"))
+# Return catalog matches without calling the LLM when the best one scores at least this (above 1 disables)
+CATALOG_FAST_PATH_SCORE = float(os.getenv("CATALOG_FAST_PATH_SCORE", "0.9"))
+
+# Headless HTTP API (python -m api.server); requests must send "Authorization: Bearer <API_TOKEN>" when set
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_TOKEN = os.getenv("API_TOKEN", "")
 
 # Function schemas
 RECOMMEND_BOOKS_SCHEMA = {
@@ -73,3 +203,48 @@ CROSS_DOMAIN_SCHEMA = {
         "required": ["movie", "game", "song"]
     }
 }
+
+
+BATCH_CROSS_DOMAIN_SCHEMA = {
+    "name": "recommend_cross_domain_batch",
+    "description": "Generate a movie, game, and song recommendation for each of several books",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "book_index": {"type": "integer", "description": "Index of the book in the provided list"},
+                        **CROSS_DOMAIN_SCHEMA["parameters"]["properties"]
+                    },
+                    "required": ["book_index", "movie", "game", "song"]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+}
+
+RANK_CANDIDATES_SCHEMA = {
+    "name": "rank_candidates",
+    "description": "Choose the catalog candidates that best match the user's request and explain each choice",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "rankings": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer", "description": "Index of the chosen candidate in the provided list"},
+                        "reason": {"type": "string", "description": "Why this book matches the user's request"}
+                    },
+                    "required": ["index", "reason"]
+                }
+            }
+        },
+        "required": ["rankings"]
+    }
+}
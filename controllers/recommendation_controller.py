@@ -1,28 +1,139 @@
-from typing import Dict, List, Optional
+from typing import Iterator, List, Optional
 import streamlit as st
-from services.recommendation_service import get_book_recommendations, get_cross_domain_recommendations
+import config
+from agents.admission import AdmissionRejected
+from agents.conversation import Conversation
+from agents.retry import LLMCallError
+from models import BookRecommendation, CrossDomainRecommendation
+from services.prefetch import CrossDomainPrefetcher
+from services.recommendation_service import (
+    get_book_recommendations,
+    get_cross_domain_recommendations,
+    stream_book_recommendations
+)
+from services.result_store import ResultStore, get_result_store
+from utils import logger
+
+BUSY_MESSAGE = "The recommendation service is busy right now. Please try again in a moment."
+FAILED_MESSAGE = "Failed to generate book recommendations. Please try again."
+PARTIAL_MESSAGE = "The recommendation service stopped responding; showing the books received so far."
 
 class RecommendationController:
     def __init__(self):
         if "book_recommendations" not in st.session_state:
             st.session_state.book_recommendations = None
+        if "book_notice" not in st.session_state:
+            st.session_state.book_notice = None
+        if "conversation" not in st.session_state:
+            st.session_state.conversation = Conversation()
+        if config.PREFETCH_CROSS_DOMAIN and "cross_domain_prefetcher" not in st.session_state:
+            st.session_state.cross_domain_prefetcher = CrossDomainPrefetcher()
+
+    @property
+    def prefetcher(self) -> Optional[CrossDomainPrefetcher]:
+        """This session's cross-domain prefetcher, when prefetching is enabled"""
+        return st.session_state.get("cross_domain_prefetcher") if config.PREFETCH_CROSS_DOMAIN else None
+
+    @property
+    def store(self) -> ResultStore:
+        """Results shared across reruns, sessions and (with Redis) processes"""
+        return get_result_store()
+
+    @property
+    def conversation(self) -> Conversation:
+        """This session's request history, used to refine earlier results"""
+        return st.session_state.conversation
 
-    def handle_book_recommendations(self, user_input: str) -> Optional[List[Dict]]:
-        """Handle book recommendation request"""
+    def _history(self, user_input: str, refine: bool) -> List[dict]:
+        # A fresh query starts a new conversation; a refinement sends the bounded history
+        if not refine:
+            self.conversation.reset()
+        return self.conversation.prompt_messages(user_input)
+
+    def handle_book_recommendations(self, user_input: str, refine: bool = False) -> Optional[List[BookRecommendation]]:
+        """Handle book recommendation request, refining the previous results when ``refine`` is set"""
         if not user_input:
             st.warning("Please enter your book preferences first!")
             return None
 
-        # Get book recommendations
-        recommendations = get_book_recommendations(user_input)
+        # A new query makes any speculative work for the previous one useless
+        if self.prefetcher:
+            self.prefetcher.cancel()
+
+        # Get book recommendations; follow-ups depend on the history, so only fresh queries are shared
+        history = self._history(user_input, refine)
+        recommendations = None if refine else self.store.get_books(user_input)
+        if recommendations is None:
+            try:
+                recommendations = get_book_recommendations(user_input, history)
+            except AdmissionRejected:
+                st.warning(BUSY_MESSAGE)
+                return None
+            if not refine:
+                self.store.put_books(user_input, recommendations)
+        self.conversation.add_exchange(user_input, recommendations)
+        st.session_state.book_notice = None
         st.session_state.book_recommendations = recommendations
+        if self.prefetcher:
+            self.prefetcher.start(recommendations)
         return recommendations
 
-    def handle_cross_domain_recommendations(self, selected_index: int) -> Optional[Dict]:
+    def stream_book_recommendations(self, user_input: str, refine: bool = False) -> Iterator[BookRecommendation]:
+        """Handle book recommendation request, yielding each book as it arrives"""
+        if not user_input:
+            st.warning("Please enter your book preferences first!")
+            return
+
+        prefetcher = self.prefetcher
+        if prefetcher:
+            prefetcher.cancel()
+
+        history = self._history(user_input, refine)
+        stored = None if refine else self.store.get_books(user_input)
+        recommendations = []
+        st.session_state.book_notice = None
+        try:
+            for recommendation in stored or stream_book_recommendations(user_input, history):
+                recommendations.append(recommendation)
+                if prefetcher:
+                    prefetcher.add(recommendation)
+                yield recommendation
+        except AdmissionRejected:
+            st.warning(BUSY_MESSAGE)
+            return
+        except LLMCallError as e:
+            logger.error(f"Streaming book recommendations failed: {e}")
+            if not recommendations:
+                st.error(FAILED_MESSAGE)
+                return
+            # Keep the books already on screen; shown with the results, since the stream area is cleared
+            st.session_state.book_notice = PARTIAL_MESSAGE
+        if stored is None and not refine and st.session_state.book_notice is None:
+            self.store.put_books(user_input, recommendations)
+        self.conversation.add_exchange(user_input, recommendations)
+        st.session_state.book_recommendations = recommendations
+        if prefetcher:
+            prefetcher.flush()
+
+    def stored_cross_domain_recommendations(self, selected_index: int) -> Optional[CrossDomainRecommendation]:
+        """Return cross-domain recommendations already generated for the selected book, without calling the LLM"""
+        if not st.session_state.book_recommendations:
+            return None
+        return self.store.get_cross_domain(st.session_state.book_recommendations[selected_index])
+
+    def handle_cross_domain_recommendations(self, selected_index: int) -> Optional[CrossDomainRecommendation]:
         """Handle cross-domain recommendation request"""
         if not st.session_state.book_recommendations:
             st.error("No book recommendations available")
             return None
 
         selected_book = st.session_state.book_recommendations[selected_index]
-        return get_cross_domain_recommendations(selected_book)
\ No newline at end of file
+        stored = self.store.get_cross_domain(selected_book)
+        if stored:
+            return stored
+        # Prefetches run in a background lane; don't let a click wait behind them for long
+        result = self.prefetcher.get(selected_book, config.PREFETCH_WAIT_SECONDS) if self.prefetcher else None
+        if not result:
+            result = get_cross_domain_recommendations(selected_book)
+        self.store.put_cross_domain(selected_book, result)
+        return result
\ No newline at end of file
@@ -8,6 +8,7 @@ class BookRecommendation(BaseModel):
     genre: str = Field(description="The genre of the book")
     description: str = Field(description="A brief description of the book")
     reason: str = Field(description="Why this book matches the user's request")
+    is_fallback: bool = Field(default=False, description="Served from precomputed picks because the LLM was unavailable")
 
 class BookRecommendations(BaseModel):
     """Schema for multiple book recommendations."""
@@ -33,3 +34,13 @@ class CrossDomainRecommendation(BaseModel):
         "description": "Brief description",
         "reason": "Why it matches the book's themes"
     })
+    is_fallback: bool = Field(default=False, description="Served from precomputed picks because the LLM was unavailable")
+
+class CandidateRanking(BaseModel):
+    """Schema for one catalog candidate chosen by the LLM."""
+    index: int = Field(description="Index of the chosen candidate in the provided list")
+    reason: str = Field(description="Why this book matches the user's request")
+
+class CandidateRankings(BaseModel):
+    """Schema for the catalog candidates chosen by the LLM, best first."""
+    rankings: List[CandidateRanking] = Field(description="Chosen candidates, best first")
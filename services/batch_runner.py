@@ -0,0 +1,327 @@
+"""Offline batch jobs that precompute recommendations in bulk.
+
+Seed queries or books are read as a stream and processed by a bounded pool of
+async workers on one event loop. LLM calls still go through the shared rate
+limiter, retries, caches and request coalescing, and they wait in the
+lowest-priority admission lane so interactive users are served first. Each result is validated by
+the agents and appended to a JSONL file as soon as it is ready.
+
+The output file doubles as the checkpoint. Every line carries the job id, so
+a rerun with the same output skips the ids already written and resumes where
+a crashed or interrupted run stopped. Failed jobs go to ``<output>.errors.jsonl``
+and are tried again on the next run.
+
+Usage:
+    python -m services.batch_runner books seeds.jsonl --output books.jsonl --concurrency 16
+    python -m services.batch_runner cross_domain books.jsonl --output triples.jsonl --batch-size 5
+    python -m services.batch_runner cross_domain --catalog .cache/catalog_index --output triples.jsonl
+
+Input lines for ``books`` look like ``{"id": "n1", "query": "cozy mysteries"}``
+(``messages`` is optional). For ``cross_domain`` each line is a book with
+title, author, genre and description. Lines without an ``id`` are identified
+by their line number.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError
+
+import config
+from agents.retry import LLMCallError
+from models import BookRecommendation
+from utils import configure_logging, logger
+
+Job = Tuple[str, Dict[str, Any]]
+# Processes a group of job payloads; returns one result record or exception per payload
+Processor = Callable[[List[Dict[str, Any]]], Awaitable[List[Union[Dict[str, Any], Exception]]]]
+
+# Seconds between progress log lines
+_PROGRESS_INTERVAL = 10.0
+
+
+@dataclass
+class BatchStats:
+    """Job counts for one batch run."""
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class JsonlWriter:
+    """Appends one JSON object per line, flushing each so finished work survives a crash."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def errors_path(output: str) -> str:
+    """Return the error file written next to an output file."""
+    root, _ = os.path.splitext(output)
+    return f"{root}.errors.jsonl"
+
+
+def _drop_partial_line(path: str) -> None:
+    # A crash can leave half a line at the end; cut the file back to the last newline
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != end:
+            logger.warning(f"Dropping an incomplete last line from {path}")
+            f.truncate(position)
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Return the ids already written to an output file, repairing a torn last line.
+
+    Args:
+        path: Output JSONL file; a missing file means nothing is completed
+
+    Returns:
+        Ids of the jobs to skip
+    """
+    if not os.path.exists(path):
+        return set()
+    _drop_partial_line(path)
+    done = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return done
+
+
+def read_jobs(path: str) -> Iterator[Job]:
+    """Yield ``(id, record)`` pairs from a JSONL file, one line at a time."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed JSON on line {number} of {path}")
+                continue
+            yield str(record.get("id", number)), record
+
+
+def catalog_jobs(path: str) -> Iterator[Job]:
+    """Yield every book of a catalog store as a cross-domain job, keyed by row number."""
+    from catalog.store import CatalogStore
+    store = CatalogStore(path)
+    for row, book in enumerate(store):
+        yield str(row), book
+
+
+async def run_jobs(jobs: Iterable[Job],
+                   process: Processor,
+                   output: str,
+                   concurrency: int = 8,
+                   group_size: int = 1,
+                   resume: bool = True) -> BatchStats:
+    """
+    Run jobs through a bounded worker pool and stream the results to JSONL.
+
+    Jobs are read lazily through a bounded queue, so memory stays flat for
+    any input size.
+
+    Args:
+        jobs: ``(id, payload)`` pairs
+        process: Coroutine function handling one group of payloads
+        output: Result file; ids already in it are skipped when resuming
+        concurrency: Groups processed at once
+        group_size: Payloads handed to ``process`` per call, e.g. books per batched LLM call
+        resume: Skip jobs already in ``output``; otherwise both files are started afresh
+
+    Returns:
+        Job counts for the run
+    """
+    if not resume:
+        for path in (output, errors_path(output)):
+            if os.path.exists(path):
+                os.remove(path)
+    done = completed_ids(output)
+    if done:
+        logger.info(f"Resuming: {len(done)} jobs already in {output}")
+
+    stats = BatchStats()
+    results = JsonlWriter(output)
+    errors = JsonlWriter(errors_path(output))
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.monotonic()
+
+    def record_error(job_id: str, error: Exception) -> None:
+        stats.failed += 1
+        kind = error.kind.value if isinstance(error, LLMCallError) else type(error).__name__
+        errors.write({"id": job_id, "error": str(error), "kind": kind})
+
+    async def produce() -> None:
+        group: List[Job] = []
+        for job_id, payload in jobs:
+            if job_id in done:
+                stats.skipped += 1
+                continue
+            group.append((job_id, payload))
+            if len(group) == group_size:
+                await queue.put(group)
+                group = []
+        if group:
+            await queue.put(group)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (group := await queue.get()) is not None:
+            try:
+                outcomes = await process([payload for _, payload in group])
+            except Exception as e:
+                outcomes = [e] * len(group)
+            for (job_id, _), outcome in zip(group, outcomes):
+                if isinstance(outcome, Exception):
+                    record_error(job_id, outcome)
+                else:
+                    results.write({"id": job_id, **outcome})
+                    stats.succeeded += 1
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(_PROGRESS_INTERVAL)
+            elapsed = time.monotonic() - started
+            finished = stats.succeeded + stats.failed
+            logger.info(
+                f"Batch progress: {stats.succeeded} succeeded, {stats.failed} failed, "
+                f"{stats.skipped} skipped ({finished / elapsed:.1f} jobs/s)"
+            )
+
+    reporter = asyncio.create_task(report())
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    finally:
+        reporter.cancel()
+        results.close()
+        errors.close()
+    logger.info(
+        f"Batch finished in {time.monotonic() - started:.1f}s: {stats.succeeded} succeeded, "
+        f"{stats.failed} failed, {stats.skipped} skipped"
+    )
+    return stats
+
+
+async def process_book_queries(payloads: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+    """Generate book recommendations for each seed query."""
+    from agents.admission import Priority, priority
+    from services.recommendation_service import aget_book_recommendations
+
+    async def one(payload: Dict[str, Any]) -> Dict[str, Any]:
+        query = payload.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Job has no query")
+        with priority(Priority.BATCH):
+            recommendations = await aget_book_recommendations(query, payload.get("messages") or [])
+        if any(book.is_fallback for book in recommendations):
+            # Degraded answers are not worth keeping; the job is recorded as failed so a rerun retries it
+            raise ValueError("LLM unavailable; only fallback recommendations were produced")
+        return {"query": query, "recommendations": [book.model_dump() for book in recommendations]}
+
+    return list(await asyncio.gather(*(one(payload) for payload in payloads), return_exceptions=True))
+
+
+async def process_cross_domain(payloads: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+    """Generate cross-domain recommendations for a group of books with one batched LLM call."""
+    from agents.admission import Priority, priority
+    from services.recommendation_service import aget_cross_domain_recommendations_batch
+
+    outcomes: List[Union[Dict[str, Any], Exception]] = [None] * len(payloads)
+    books, positions = [], []
+    for position, payload in enumerate(payloads):
+        try:
+            books.append(BookRecommendation.model_validate({"reason": "", **payload}))
+            positions.append(position)
+        except ValidationError as e:
+            outcomes[position] = ValueError(f"Invalid book: {e}")
+
+    with priority(Priority.BATCH):
+        results = await aget_cross_domain_recommendations_batch(books) if books else []
+    for position, book, result in zip(positions, books, results):
+        if result is None:
+            outcomes[position] = ValueError("Cross-domain generation failed")
+        else:
+            outcomes[position] = {"book": book.model_dump(exclude={"reason"}), "cross_domain": result.model_dump()}
+    return outcomes
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=["books", "cross_domain"])
+    parser.add_argument("input", nargs="?", help="JSONL file of queries or books")
+    parser.add_argument("--catalog", help="Catalog store directory to use as the cross_domain input")
+    parser.add_argument("--output", required=True, help="Result JSONL file; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent LLM-bound jobs")
+    parser.add_argument("--batch-size", type=int, default=5, help="Books per batched cross-domain LLM call")
+    parser.add_argument("--requests-per-minute", type=float, default=None,
+                        help="Override LLM_REQUESTS_PER_MINUTE for this run")
+    parser.add_argument("--tokens-per-minute", type=float, default=None,
+                        help="Override LLM_TOKENS_PER_MINUTE for this run")
+    parser.add_argument("--restart", action="store_true", help="Discard earlier results instead of resuming")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.catalog and args.kind != "cross_domain":
+        parser.error("--catalog is only supported for cross_domain jobs")
+    if bool(args.catalog) == bool(args.input):
+        parser.error("give either an input file or --catalog")
+    # The shared rate limiter is created on first use, so overrides must be set before any job runs
+    if args.requests_per_minute is not None:
+        config.LLM_REQUESTS_PER_MINUTE = args.requests_per_minute
+    if args.tokens_per_minute is not None:
+        config.LLM_TOKENS_PER_MINUTE = args.tokens_per_minute
+
+    jobs = catalog_jobs(args.catalog) if args.catalog else read_jobs(args.input)
+    if args.kind == "books":
+        process, group_size = process_book_queries, 1
+    else:
+        process, group_size = process_cross_domain, max(1, args.batch_size)
+
+    stats = asyncio.run(run_jobs(
+        jobs, process, args.output,
+        concurrency=max(1, args.concurrency),
+        group_size=group_size,
+        resume=not args.restart
+    ))
+    print(f"{stats.succeeded} succeeded, {stats.failed} failed, {stats.skipped} skipped "
+          f"(results in {args.output}, failures in {errors_path(args.output)})")
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Shared background event loop for driving async services from sync code.
+
+Streamlit runs each script on its own thread without an event loop. Rather
+than spinning up a loop per call with ``asyncio.run``, every session submits
+coroutines to one long-lived loop running on a daemon thread, so in-flight LLM
+calls from all users overlap on a single loop and share its HTTP clients.
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting its thread on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _thread is None or not _thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_run_loop,
+                args=(_loop,),
+                name="recommendation-event-loop",
+                daemon=True
+            )
+            _thread.start()
+        return _loop
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+    """
+    Schedule a coroutine on the shared loop without waiting for it.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        Thread-safe future resolving to the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """
+    Run a coroutine on the shared loop and block the calling thread for its result.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Optional number of seconds to wait before cancelling
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        RuntimeError: If called from the shared loop's own thread
+        concurrent.futures.TimeoutError: If the timeout elapses
+    """
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the shared event loop thread")
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+_ITEM, _ERROR, _DONE = range(3)
+
+
+def iter_sync(iterator: AsyncIterator[T], timeout: Optional[float] = None) -> Iterator[T]:
+    """
+    Consume an async iterator on the shared loop, yielding items to the calling thread.
+
+    Items are handed over as soon as they are produced. If the caller stops
+    iterating early, the underlying async iterator is cancelled.
+
+    Args:
+        iterator: Async iterator to drain
+        timeout: Optional number of seconds to wait for each item
+
+    Yields:
+        Items produced by the async iterator
+
+    Raises:
+        queue.Empty: If no item arrives within the timeout
+    """
+    items: "queue.Queue" = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            async for item in iterator:
+                items.put((_ITEM, item))
+        except Exception as e:
+            items.put((_ERROR, e))
+        finally:
+            items.put((_DONE, None))
+
+    future = submit(pump())
+    try:
+        while True:
+            kind, value = items.get(timeout=timeout)
+            if kind == _ERROR:
+                raise value
+            if kind == _DONE:
+                return
+            yield value
+    finally:
+        future.cancel()
@@ -0,0 +1,131 @@
+"""Speculative prefetch of cross-domain recommendations.
+
+Once a user has a list of book recommendations they usually ask for related
+content for one of them. The prefetcher starts cross-domain generation for
+every listed book in the background on the shared event loop, so the later
+request only has to collect a result that is already running or finished.
+"""
+
+import asyncio
+import concurrent.futures
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from agents.admission import Priority, priority
+from agents.persistent_cache import book_identity_key
+from models import BookRecommendation, CrossDomainRecommendation
+from services.event_loop import submit
+from utils import logger
+
+# Process-wide cap on concurrent prefetch calls; created on the shared loop
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _prefetch_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(config.PREFETCH_MAX_CONCURRENCY)
+    return _semaphore
+
+
+class CrossDomainPrefetcher:
+    """Tracks one session's in-flight speculative cross-domain requests."""
+
+    def __init__(self):
+        # Book key -> (future, position in a batched result or None for single requests)
+        self._futures: Dict[str, Tuple[concurrent.futures.Future, Optional[int]]] = {}
+        self._pending_batch: List[BookRecommendation] = []
+
+    async def _run(self, book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+        from services.recommendation_service import aget_cross_domain_recommendations
+        async with _prefetch_semaphore():
+            with priority(Priority.PREFETCH):
+                return await aget_cross_domain_recommendations(book)
+
+    async def _run_batch(self, books: List[BookRecommendation]) -> List[Optional[CrossDomainRecommendation]]:
+        from services.recommendation_service import aget_cross_domain_recommendations_batch
+        async with _prefetch_semaphore():
+            with priority(Priority.PREFETCH):
+                return await aget_cross_domain_recommendations_batch(books)
+
+    def start(self, books: Iterable[BookRecommendation]) -> None:
+        """
+        Begin generating cross-domain recommendations for each book.
+
+        Any work still pending from a previous call is cancelled first.
+
+        Args:
+            books: Recommendations as returned by the book agent
+        """
+        self.cancel()
+        for book in books:
+            self.add(book)
+        self.flush()
+        logger.info(f"Prefetching cross-domain recommendations for {len(self._futures)} books")
+
+    def add(self, book: BookRecommendation) -> None:
+        """
+        Begin generating cross-domain recommendations for one more book.
+
+        When batching is enabled the book is queued until ``flush`` so that
+        all books of a query share one LLM call.
+        """
+        key = book_identity_key(book)
+        if key in self._futures or any(book_identity_key(b) == key for b in self._pending_batch):
+            return
+        if config.PREFETCH_BATCH_CROSS_DOMAIN:
+            self._pending_batch.append(book)
+        else:
+            self._futures[key] = (submit(self._run(book)), None)
+
+    def flush(self) -> None:
+        """Submit books queued by ``add`` as a single batched request."""
+        books, self._pending_batch = self._pending_batch, []
+        if not books:
+            return
+        if len(books) == 1:
+            self._futures[book_identity_key(books[0])] = (submit(self._run(books[0])), None)
+            return
+        future = submit(self._run_batch(books))
+        for position, book in enumerate(books):
+            self._futures[book_identity_key(book)] = (future, position)
+
+    def cancel(self) -> None:
+        """Cancel every pending prefetch and forget completed ones."""
+        futures = {id(future): future for future, _ in self._futures.values()}
+        cancelled = sum(1 for future in futures.values() if future.cancel())
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} pending cross-domain prefetches")
+        self._futures.clear()
+        self._pending_batch = []
+
+    def get(self, book: BookRecommendation, timeout: Optional[float] = None) -> Optional[CrossDomainRecommendation]:
+        """
+        Wait for and return the prefetched result for a book.
+
+        Args:
+            book: Book previously passed to ``start`` or ``add``
+            timeout: Optional number of seconds to wait for a running prefetch
+
+        Returns:
+            The prefetched recommendations, or None if the book was not
+            prefetched or the prefetch failed
+        """
+        entry = self._futures.get(book_identity_key(book))
+        if entry is None:
+            return None
+        future, position = entry
+        try:
+            result = future.result(timeout)
+        except concurrent.futures.CancelledError:
+            return None
+        except concurrent.futures.TimeoutError:
+            # Still queued or running in a background lane; the caller asks directly instead
+            logger.info(f"Cross-domain prefetch not ready after {timeout}s, falling back to a direct request")
+            return None
+        except Exception as e:
+            logger.warning(f"Cross-domain prefetch failed, falling back to a direct request: {e}")
+            return None
+        if position is not None:
+            result = result[position]
+        return result or None
@@ -1,16 +1,39 @@
-from typing import Dict, List
-from agents.book_agent import create_book_agent
-from agents.cross_domain_agent import create_cross_domain_agent
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from models import BookRecommendation, CrossDomainRecommendation
+from agents.admission import current_priority
+from agents.conversation import messages_key
+from agents.persistent_cache import book_identity_key
+from agents.registry import get_book_agent, get_book_graph, get_cross_domain_agent, get_cross_domain_graph
+from agents.response_cache import normalize_query
+from services.event_loop import iter_sync, run_sync
+from services.single_flight import SingleFlight
 from utils import logger
 
-def get_book_recommendations(user_input: str) -> List[Dict]:
-    """Get book recommendations using the book agent"""
-    logger.info("Creating recommendation agent")
-    graph = create_book_agent()
+# Concurrent identical requests share one upstream call
+_in_flight = SingleFlight()
+
+def _coalesce(key: str, factory):
+    """Share one in-flight call per request key and admission lane"""
+    # The shared task runs in its leader's lane, so an interactive caller must never
+    # join a prefetch or batch call and inherit its queue limits and waits
+    return _in_flight.do(f"{current_priority().label}:{key}", factory)
+
+async def aget_book_recommendations(user_input: str,
+                                    messages: Optional[List[Dict[str, str]]] = None) -> List[BookRecommendation]:
+    """Get book recommendations using the book agent, optionally refining earlier turns in ``messages``"""
+    messages = messages or []
+    key = "books:" + (normalize_query(user_input) or user_input.strip().lower())
+    if messages:
+        # Follow-ups only coalesce with the same request made in the same conversation
+        key += ":" + messages_key(messages)
+    return await _coalesce(key, lambda: _run_book_graph(user_input, messages))
+
+async def _run_book_graph(user_input: str, messages: List[Dict[str, str]]) -> List[BookRecommendation]:
+    graph = get_book_graph()
 
     # Initialize the state
     state = {
-        "messages": [],
+        "messages": messages,
         "input": user_input,
         "recommendations": []
     }
@@ -18,18 +41,57 @@ def get_book_recommendations(user_input: str) -> List[Dict]:
 
     # Run the graph
     logger.info("Running recommendation graph")
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state)
     logger.info("Received recommendations from graph")
 
     return result["recommendations"]
 
-def get_cross_domain_recommendations(selected_book: Dict) -> Dict:
+async def astream_book_recommendations(user_input: str,
+                                       messages: Optional[List[Dict[str, str]]] = None
+                                       ) -> AsyncIterator[BookRecommendation]:
+    """Stream book recommendations one at a time as the LLM generates them"""
+    agent = get_book_agent()
+    logger.info(f"Streaming recommendations for input: {user_input}")
+    async for recommendation in agent.astream_recommendations(user_input, messages):
+        yield recommendation
+
+async def aget_cross_domain_recommendations(selected_book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
     """Get cross-domain recommendations using the cross-domain agent"""
-    cross_domain_graph = create_cross_domain_agent()
+    key = "cross_domain:" + book_identity_key(selected_book)
+    return await _coalesce(key, lambda: _run_cross_domain_graph(selected_book))
+
+async def _run_cross_domain_graph(selected_book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+    cross_domain_graph = get_cross_domain_graph()
 
     # Initialize state with selected book
     state = {"selected_book": selected_book}
 
     # Get cross-domain recommendations
-    result = cross_domain_graph.invoke(state)
-    return result.get("cross_domain_recommendations", {})
\ No newline at end of file
+    result = await cross_domain_graph.ainvoke(state)
+    return result.get("cross_domain_recommendations")
+
+async def aget_cross_domain_recommendations_batch(
+        selected_books: List[BookRecommendation]) -> List[Optional[CrossDomainRecommendation]]:
+    """Get cross-domain recommendations for several books with one batched LLM call"""
+    agent = get_cross_domain_agent()
+    logger.info(f"Requesting batched cross-domain recommendations for {len(selected_books)} books")
+    return await agent.arecommend_batch(selected_books)
+
+def get_book_recommendations(user_input: str,
+                             messages: Optional[List[Dict[str, str]]] = None) -> List[BookRecommendation]:
+    """Blocking wrapper running aget_book_recommendations on the shared event loop"""
+    return run_sync(aget_book_recommendations(user_input, messages))
+
+def stream_book_recommendations(user_input: str,
+                                messages: Optional[List[Dict[str, str]]] = None) -> Iterator[BookRecommendation]:
+    """Blocking iterator over astream_book_recommendations driven by the shared event loop"""
+    return iter_sync(astream_book_recommendations(user_input, messages))
+
+def get_cross_domain_recommendations(selected_book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+    """Blocking wrapper running aget_cross_domain_recommendations on the shared event loop"""
+    return run_sync(aget_cross_domain_recommendations(selected_book))
+
+def get_cross_domain_recommendations_batch(
+        selected_books: List[BookRecommendation]) -> List[Optional[CrossDomainRecommendation]]:
+    """Blocking wrapper running aget_cross_domain_recommendations_batch on the shared event loop"""
+    return run_sync(aget_cross_domain_recommendations_batch(selected_books))
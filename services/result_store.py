@@ -0,0 +1,299 @@
+"""Shared store of finished recommendation results.
+
+Streamlit reruns the whole script on every widget change, and a page refresh
+starts a new session with empty ``st.session_state``. The controller keeps
+final results here so reruns, refreshes and other users asking the same thing
+are answered without calling the service again.
+
+Two backends are available:
+- ``memory``: one LRU store per process, bounded by entries and bytes, with a TTL
+- ``redis``: any Redis-compatible server (``REDIS_URL``), shared by every process
+  and replica; install the ``redis`` extra and set ``maxmemory`` with an LRU
+  policy on the server to bound it
+
+Values are JSON documents. Keys are namespaced per kind of result: book lists
+by normalized query, cross-domain results by book identity.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import config
+from agents.instrumentation import CACHE_LOOKUPS, RESULT_STORE_BYTES
+from agents.persistent_cache import book_identity_key, content_key
+from agents.response_cache import normalize_query
+from models import BookRecommendation, CrossDomainRecommendation
+from utils import logger
+
+_BOOKS_NAMESPACE = "books:v1"
+_CROSS_DOMAIN_NAMESPACE = "cross_domain:v1"
+
+
+def books_key(query: str) -> Optional[str]:
+    """Return the store key for a book query, or None when the query has no meaningful words."""
+    normalized = normalize_query(query)
+    if not normalized:
+        return None
+    return f"{_BOOKS_NAMESPACE}:{content_key(_BOOKS_NAMESPACE, {'query': normalized}, ['query'])}"
+
+
+def cross_domain_key(book: BookRecommendation) -> str:
+    """Return the store key for a book's cross-domain recommendations."""
+    return f"{_CROSS_DOMAIN_NAMESPACE}:{book_identity_key(book)}"
+
+
+@dataclass
+class StoreStats:
+    """Counters describing store effectiveness."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class ResultStore:
+    """Key/value store of JSON result documents; subclasses provide the backend."""
+
+    name = "result_store"
+
+    def __init__(self):
+        self.stats = StoreStats()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the document stored under a key.
+
+        Args:
+            key: Key from ``books_key`` or ``cross_domain_key``
+
+        Returns:
+            The stored document, or None on a miss
+        """
+        raw = self._get(key)
+        if raw is None:
+            self.stats.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"Discarding corrupt result store entry {key}")
+            self.stats.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return None
+        self.stats.hits += 1
+        CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        """
+        Store a JSON-serializable document, replacing any previous one.
+
+        Args:
+            key: Key from ``books_key`` or ``cross_domain_key``
+            value: Result document
+        """
+        self._put(key, json.dumps(value, ensure_ascii=False))
+
+    def get_books(self, query: str) -> Optional[List[BookRecommendation]]:
+        """Return the stored book recommendations for a query, or None."""
+        key = books_key(query)
+        value = self.get(key) if key else None
+        if value is None:
+            return None
+        return [BookRecommendation.model_validate(book) for book in value["recommendations"]]
+
+    def put_books(self, query: str, recommendations: List[BookRecommendation]) -> None:
+        """Store the book recommendations returned for a query; empty and fallback results are not kept."""
+        key = books_key(query)
+        if key and recommendations and not any(book.is_fallback for book in recommendations):
+            self.put(key, {"recommendations": [book.model_dump() for book in recommendations]})
+
+    def get_cross_domain(self, book: BookRecommendation) -> Optional[CrossDomainRecommendation]:
+        """Return the stored cross-domain recommendations for a book, or None."""
+        value = self.get(cross_domain_key(book))
+        return CrossDomainRecommendation.model_validate(value) if value is not None else None
+
+    def put_cross_domain(self, book: BookRecommendation, result: Optional[CrossDomainRecommendation]) -> None:
+        """Store the cross-domain recommendations generated for a book; failures and fallbacks are not kept."""
+        if result is not None and not result.is_fallback:
+            self.put(cross_domain_key(book), result.model_dump())
+
+    def clear(self) -> None:
+        """Remove every entry written by this store."""
+        raise NotImplementedError
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _put(self, key: str, encoded: str) -> None:
+        raise NotImplementedError
+
+
+class NullResultStore(ResultStore):
+    """Store that keeps nothing; used when the result store is disabled."""
+
+    def clear(self) -> None:
+        pass
+
+    def _get(self, key: str) -> Optional[str]:
+        return None
+
+    def _put(self, key: str, encoded: str) -> None:
+        pass
+
+
+class InMemoryResultStore(ResultStore):
+    """Process-local LRU store bounded by entry count and encoded size, with a TTL."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        """
+        Initialize the store.
+
+        Args:
+            ttl_seconds: Lifetime of an entry after it is stored
+            max_entries: Maximum number of entries before LRU eviction
+            max_bytes: Maximum total size of the encoded documents before LRU eviction
+        """
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the stored documents."""
+        return self._bytes
+
+    def _remove(self, key: str) -> None:
+        encoded, _ = self._entries.pop(key)
+        self._bytes -= len(encoded)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            encoded, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats.expirations += 1
+                RESULT_STORE_BYTES.set(self._bytes, backend="memory")
+                return None
+            self._entries.move_to_end(key)
+            return encoded
+
+    def _put(self, key: str, encoded: str) -> None:
+        if len(encoded) > self.max_bytes:
+            logger.warning(f"Not storing result {key}: {len(encoded)} bytes exceeds the store size")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (encoded, time.monotonic() + self.ttl_seconds)
+            self._bytes += len(encoded)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+            RESULT_STORE_BYTES.set(self._bytes, backend="memory")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            RESULT_STORE_BYTES.set(0, backend="memory")
+
+
+class RedisResultStore(ResultStore):
+    """
+    Store on a Redis-compatible server shared by all processes.
+
+    Entries expire after the TTL; memory is bounded by the server's ``maxmemory``
+    and eviction policy. A server that cannot be reached is treated as a miss so
+    the page keeps working without it.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "bookrec:"):
+        """
+        Connect to the server.
+
+        Args:
+            url: Server URL, e.g. ``redis://localhost:6379/0``
+            ttl_seconds: Lifetime of an entry after it is stored
+            prefix: Prepended to every key so several apps can share one server
+        """
+        import redis
+
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self._client.ping()
+
+    def _get(self, key: str) -> Optional[str]:
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Result store read failed: {e}")
+            return None
+        return raw.decode("utf-8") if raw is not None else None
+
+    def _put(self, key: str, encoded: str) -> None:
+        try:
+            self._client.set(self.prefix + key, encoded, ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            logger.warning(f"Result store write failed: {e}")
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=f"{self.prefix}*", count=500):
+            self._client.delete(key)
+
+
+def create_result_store() -> ResultStore:
+    """Build the store selected by ``RESULT_STORE_BACKEND``, falling back to memory if Redis is unavailable."""
+    backend = config.RESULT_STORE_BACKEND.lower()
+    if backend in ("", "none"):
+        return NullResultStore()
+    if backend == "redis":
+        try:
+            return RedisResultStore(config.REDIS_URL, config.RESULT_STORE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Redis result store unavailable, using an in-process store: {e}")
+    elif backend != "memory":
+        logger.warning(f"Unknown RESULT_STORE_BACKEND {backend!r}, using an in-process store")
+    return InMemoryResultStore(
+        ttl_seconds=config.RESULT_STORE_TTL_SECONDS,
+        max_entries=config.RESULT_STORE_MAX_ENTRIES,
+        max_bytes=config.RESULT_STORE_MAX_BYTES
+    )
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Return the process-wide result store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_result_store()
+    return _store
+
+
+def reset_result_store() -> None:
+    """Drop the process-wide store so the next use picks up changed settings."""
+    global _store
+    with _store_lock:
+        _store = None
@@ -0,0 +1,82 @@
+"""Request coalescing for concurrent identical calls.
+
+When several callers ask for the same key while a call for it is already in
+flight, they all await that one call instead of issuing their own. The result
+or exception of the leading call is delivered to every waiter. A waiter that
+is cancelled does not cancel the shared call unless it was the last one
+waiting for it.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+from metrics import counter
+from utils import logger
+
+COALESCED_REQUESTS = counter(
+    "single_flight_coalesced_total", "Requests served by awaiting an identical in-flight call"
+)
+
+T = TypeVar('T')
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent async calls that share a key."""
+
+    def __init__(self):
+        # Keyed by event loop as well, since a task can only be awaited on its own loop
+        self._calls: Dict[Tuple[int, str], _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently running."""
+        return len(self._calls)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``factory()`` unless a call for ``key`` is already in flight, and return its result.
+
+        Args:
+            key: Normalized identity of the request
+            factory: Zero-argument callable producing the awaitable to run
+
+        Returns:
+            The shared result
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        call = self._calls.get(call_key)
+        if call is None:
+            call = _Call(task=loop.create_task(factory()))
+            self._calls[call_key] = call
+            call.task.add_done_callback(lambda _: self._forget(call_key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            COALESCED_REQUESTS.inc()
+            logger.info(f"Coalescing request onto in-flight call for {key[:60]}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is waiting any more; stop the work and let the next caller start afresh
+                self._forget(call_key, call)
+                call.task.cancel()
+
+    def _forget(self, call_key: Tuple[int, str], call: _Call) -> None:
+        if self._calls.get(call_key) is call:
+            del self._calls[call_key]
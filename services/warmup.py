@@ -0,0 +1,48 @@
+"""Background warm-up of the recommendation stack.
+
+The Streamlit entry point only imports what the login page needs. Once that
+page has rendered, ``start_warmup`` imports the controller, agents, LangChain
+and LangGraph on a daemon thread and compiles both graphs, so they are
+usually ready by the time the user has logged in and typed a request.
+"""
+
+import threading
+import time
+
+import config
+from utils import logger
+
+_started = False
+_lock = threading.Lock()
+
+
+def _warm_up() -> None:
+    started = time.perf_counter()
+    try:
+        # Importing the controller pulls in the services, agents and views it uses
+        import controllers.recommendation_controller  # noqa: F401
+        from agents.registry import get_book_graph, get_cross_domain_graph
+        get_book_graph()
+        get_cross_domain_graph()
+    except Exception as e:
+        logger.warning(f"Warm-up failed; graphs will be built on first use: {e}")
+        return
+    logger.info(f"Warmed up recommendation graphs in {time.perf_counter() - started:.2f}s")
+
+
+def start_warmup() -> bool:
+    """
+    Start warming up on a background thread, once per process.
+
+    Returns:
+        True if this call started the warm-up; False if it is disabled or already started
+    """
+    global _started
+    if not config.WARMUP_ENABLED:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_warm_up, name="recommendation-warmup", daemon=True).start()
+    return True
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from agents.admission import AdmissionController, AdmissionRejected, Priority
+
+
+def _controller(max_concurrency=1, queue_limits=None, max_waits=None, background_share=0.5):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        queue_limits=queue_limits or {},
+        max_waits=max_waits or {},
+        background_share=background_share
+    )
+
+
+def test_interactive_waiter_is_admitted_before_earlier_prefetch():
+    controller = _controller()
+    order = []
+
+    async def request(lane):
+        await controller.acquire(lane)
+        order.append(lane)
+        controller.release(lane)
+
+    async def main():
+        await controller.acquire(Priority.INTERACTIVE)
+        prefetch = asyncio.create_task(request(Priority.PREFETCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        assert controller.queued() == 2
+        controller.release(Priority.INTERACTIVE)
+        await asyncio.gather(prefetch, interactive)
+
+    asyncio.run(main())
+    assert order == [Priority.INTERACTIVE, Priority.PREFETCH]
+
+
+def test_background_lanes_leave_slots_for_interactive():
+    controller = _controller(max_concurrency=4, background_share=0.5)
+
+    async def main():
+        await controller.acquire(Priority.PREFETCH)
+        await controller.acquire(Priority.BATCH)
+        waiting = asyncio.create_task(controller.acquire(Priority.PREFETCH))
+        await asyncio.sleep(0)
+        assert controller.queued(Priority.PREFETCH) == 1
+        assert await controller.acquire(Priority.INTERACTIVE) == 0.0
+        controller.release(Priority.BATCH)
+        await waiting
+        assert controller.active(Priority.PREFETCH) == 2
+
+    asyncio.run(main())
+
+
+def test_full_queue_is_rejected():
+    controller = _controller(queue_limits={Priority.PREFETCH: 1})
+
+    async def main():
+        await controller.acquire(Priority.INTERACTIVE)
+        waiting = asyncio.create_task(controller.acquire(Priority.PREFETCH))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(Priority.PREFETCH)
+        waiting.cancel()
+        return rejected.value
+
+    rejected = asyncio.run(main())
+    assert rejected.reason == "queue_full"
+    assert rejected.lane is Priority.PREFETCH
+
+
+def test_long_wait_is_rejected_and_leaves_the_queue():
+    controller = _controller(max_waits={Priority.INTERACTIVE: 0.05})
+
+    async def main():
+        await controller.acquire(Priority.INTERACTIVE)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(Priority.INTERACTIVE)
+        return rejected.value
+
+    assert asyncio.run(main()).reason == "wait_timeout"
+    assert controller.queued() == 0
+    assert controller.active() == 1
+
+
+def test_disabled_controller_does_not_hold_slots():
+    controller = _controller(max_concurrency=0)
+
+    async def main():
+        async with controller.slot(Priority.BATCH):
+            assert controller.active() == 0
+
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from agents.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+def _breaker(**overrides):
+    settings = dict(
+        name="test",
+        window_size=4,
+        min_calls=4,
+        error_rate=0.5,
+        slow_call_seconds=0,
+        slow_call_rate=1.0,
+        open_seconds=0.05,
+        half_open_probes=2
+    )
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def _trip(breaker):
+    for _ in range(4):
+        breaker.record(breaker.acquire(), error=TimeoutError())
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_error_rate_trips_and_open_circuit_rejects():
+    breaker = _breaker()
+    _trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+def test_validation_errors_do_not_trip():
+    breaker = _breaker()
+    for _ in range(8):
+        breaker.record(breaker.acquire(), error=ValueError("bad JSON"))
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_slow_calls_trip():
+    breaker = _breaker(slow_call_seconds=1.0, slow_call_rate=0.5)
+    for _ in range(4):
+        breaker.record(breaker.acquire(), seconds=2.0)
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_half_open_limits_probes_and_closes_after_successes():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+    assert breaker.state is CircuitState.HALF_OPEN
+
+    probes = [breaker.acquire(), breaker.acquire()]
+    assert probes == [True, True]
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    breaker.record(probes[0], seconds=0.1)
+    assert breaker.state is CircuitState.HALF_OPEN
+    breaker.record(probes[1], seconds=0.1)
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.acquire() is False
+
+
+def test_failed_probe_reopens():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+    breaker.record(breaker.acquire(), error=TimeoutError())
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+def test_released_probe_frees_its_slot():
+    breaker = _breaker(half_open_probes=1)
+    _trip(breaker)
+    time.sleep(0.06)
+    breaker.release(breaker.acquire())
+    assert breaker.acquire() is True
@@ -0,0 +1,14 @@
+from catalog.fallback import DEFAULT_PATH, FallbackIndex
+
+
+def test_relation_words_do_not_match_titles():
+    index = FallbackIndex.load(DEFAULT_PATH)
+    picks = index.recommend("books like Stephen King", limit=3)
+    assert picks and all(book.author == "Stephen King" for book in picks)
+    assert all(book.is_fallback for book in picks)
+
+
+def test_unmatched_request_gets_default_picks():
+    index = FallbackIndex.load(DEFAULT_PATH)
+    picks = index.recommend("books for a long flight", limit=3)
+    assert [book.title for book in picks] == [book["title"] for book in index.books[:3]]
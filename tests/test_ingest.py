@@ -0,0 +1,15 @@
+from catalog.ingest import normalize_author
+
+
+def test_last_first_is_swapped():
+    assert normalize_author("King, Stephen") == "Stephen King"
+
+
+def test_multi_word_surname_is_swapped():
+    assert normalize_author("Le Guin, Ursula K.") == "Ursula K. Le Guin"
+    assert normalize_author("García Márquez, Gabriel") == "Gabriel García Márquez"
+
+
+def test_comma_separated_authors_keep_the_first():
+    assert normalize_author("Stephen King, Peter Straub") == "Stephen King"
+    assert normalize_author("Terry Pratchett; Neil Gaiman") == "Terry Pratchett"
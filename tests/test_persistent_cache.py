@@ -0,0 +1,11 @@
+from agents.persistent_cache import PersistentCache
+
+
+def test_memory_mirror_is_bounded_and_misses_read_sqlite(tmp_path):
+    cache = PersistentCache(str(tmp_path / "results.sqlite3"), memory_entries=2)
+    for i in range(5):
+        cache.put(f"key{i}", {"value": i})
+    assert list(cache._index) == ["key3", "key4"]
+    assert cache.get("key0") == {"value": 0}
+    assert len(cache._index) == 2
+    cache.close()
@@ -0,0 +1,36 @@
+from agents.response_cache import ResponseCache, normalize_query
+from models import BookRecommendations
+
+
+def test_filler_words_and_order_are_ignored():
+    assert normalize_query("Recommend sci-fi about time travel") == normalize_query("Sci-fi books about time travel!")
+
+
+def test_relation_words_stay_in_the_key():
+    assert normalize_query("books by Stephen King") != normalize_query("books like Stephen King")
+
+
+def _cache_with_counting_embedder():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [1.0, 0.0] if "dragon" in text else [0.0, 1.0]
+
+    return ResponseCache("test", ttl_seconds=60, max_entries=8, embed_fn=embed, similarity_threshold=0.9), calls
+
+
+def test_miss_then_put_embeds_the_query_once():
+    cache, calls = _cache_with_counting_embedder()
+    assert cache.get("dragon stories") is None
+    cache.put("dragon stories", BookRecommendations(recommendations=[]))
+    assert len(calls) == 1
+
+
+def test_similar_query_is_a_semantic_hit():
+    cache, _ = _cache_with_counting_embedder()
+    value = BookRecommendations(recommendations=[])
+    cache.put("dragon stories", value)
+    assert cache.get("tales of a dragon") is value
+    assert cache.get("space opera") is None
+    assert cache.stats.semantic_hits == 1
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+import openai
+
+from agents.retry import ErrorKind, LLMCallError, RateLimiter, RetryPolicy, classify_error, retry_after_seconds
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _status_error(status, headers=None):
+    response = httpx.Response(status, headers=headers, request=REQUEST)
+    return openai.APIStatusError("upstream error", response=response, body=None)
+
+
+def test_errors_are_classified_by_cause():
+    assert classify_error(_status_error(429)) is ErrorKind.RATE_LIMIT
+    assert classify_error(_status_error(503)) is ErrorKind.SERVER
+    assert classify_error(_status_error(400)) is ErrorKind.FATAL
+    assert classify_error(openai.APIConnectionError(request=REQUEST)) is ErrorKind.SERVER
+    assert classify_error(openai.APITimeoutError(request=REQUEST)) is ErrorKind.TIMEOUT
+    assert classify_error(asyncio.TimeoutError()) is ErrorKind.TIMEOUT
+    assert classify_error(json.JSONDecodeError("bad", "{", 0)) is ErrorKind.VALIDATION
+    assert classify_error(KeyError("title")) is ErrorKind.FATAL
+
+
+def test_retry_after_headers_are_read():
+    assert retry_after_seconds(_status_error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(_status_error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(_status_error(429)) is None
+    assert retry_after_seconds(LLMCallError("failed", ErrorKind.SERVER, 1)) is None
+
+
+def test_policy_limits_attempts_per_kind():
+    policy = RetryPolicy(max_attempts=3, max_validation_attempts=2)
+    assert policy.should_retry(ErrorKind.SERVER, 2)
+    assert not policy.should_retry(ErrorKind.SERVER, 3)
+    assert policy.should_retry(ErrorKind.VALIDATION, 1)
+    assert not policy.should_retry(ErrorKind.VALIDATION, 2)
+    assert not policy.should_retry(ErrorKind.FATAL, 1)
+
+
+def test_delay_honours_retry_after_up_to_the_cap():
+    policy = RetryPolicy(base_delay=0.5, max_delay=1.0, max_retry_after=10.0)
+    assert 0 <= policy.delay(5) <= 1.0
+    assert policy.delay(1, retry_after=4.0) == 4.0
+    assert policy.delay(1, retry_after=120.0) == 10.0
+
+
+def test_rate_limiter_without_quotas_never_waits():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    async def main():
+        return [await limiter.acquire(10_000) for _ in range(5)]
+
+    assert asyncio.run(main()) == [0.0] * 5
+
+
+def test_rate_limiter_delays_requests_over_quota():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=0)
+
+    async def main():
+        # A burst drains the bucket; the next request waits for one refill (0.1s)
+        for _ in range(600):
+            await limiter.acquire(1)
+        return await limiter.acquire(1)
+
+    assert 0.05 < asyncio.run(main()) <= 0.11
+
+
+def test_pause_holds_back_callers():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    limiter.pause(0.05)
+    assert asyncio.run(limiter.acquire(1)) > 0
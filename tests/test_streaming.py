@@ -0,0 +1,33 @@
+import json
+
+from agents.streaming import IncrementalArrayParser
+
+BOOKS = [
+    {"title": "It", "author": "Stephen King", "reason": "Clowns {and} [brackets]"},
+    {"title": "Dune", "author": "Frank Herbert", "reason": "A \"desert\" epic\\"},
+]
+ARGUMENTS = json.dumps({"recommendations": BOOKS})
+
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalArrayParser()
+    return [parser.feed(text[i:i + size]) for i in range(0, len(text), size)]
+
+
+def test_items_are_parsed_whatever_the_chunk_size():
+    for size in (1, 3, 7, len(ARGUMENTS)):
+        batches = _feed_in_chunks(ARGUMENTS, size)
+        assert [item for batch in batches for item in batch] == BOOKS
+
+
+def test_item_is_emitted_as_soon_as_it_closes():
+    first_end = ARGUMENTS.index("}, {") + 1
+    parser = IncrementalArrayParser()
+    assert parser.feed(ARGUMENTS[:first_end - 1]) == []
+    assert parser.feed(ARGUMENTS[first_end - 1:first_end]) == [BOOKS[0]]
+
+
+def test_nested_objects_stay_inside_their_item():
+    books = [{"title": "It", "tags": {"genre": "horror"}, "series": [{"n": 1}]}]
+    batches = _feed_in_chunks(json.dumps({"recommendations": books}), 2)
+    assert [item for batch in batches for item in batch] == books
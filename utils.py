@@ -1,14 +1,34 @@
 import logging
-from typing import Dict
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+import threading
+from typing import Dict, Optional
+
 logger = logging.getLogger(__name__)
 
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """
+    Configure process-wide logging once; later calls are no-ops.
+
+    Entry points (the Streamlit app, the API server and the CLIs) call this
+    instead of configuring logging as a side effect of importing this module.
+
+    Args:
+        level: Log level name; defaults to ``config.LOG_LEVEL``
+    """
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        import config
+        logging.basicConfig(
+            level=level or config.LOG_LEVEL,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        _logging_configured = True
+
 def state_merge(state1: Dict, state2: Dict) -> Dict:
     """Merge two states together."""
     state1.update(state2)
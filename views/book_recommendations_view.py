@@ -1,10 +1,16 @@
+from typing import Iterable
 from models import BookRecommendation
 import streamlit as st
 
-def display_book_recommendations(recommendations):
+FALLBACK_NOTICE = "Our recommendation engine is temporarily unavailable, so these are picks from our offline favourites."
+
+def display_book_recommendations(recommendations: Iterable[BookRecommendation]):
     """Display book recommendations in a formatted way"""
-    for i, book_dict in enumerate(recommendations, 1):
-        book = BookRecommendation(**book_dict)
+    noted_fallback = False
+    for i, book in enumerate(recommendations, 1):
+        if book.is_fallback and not noted_fallback:
+            st.info(FALLBACK_NOTICE)
+            noted_fallback = True
         with st.container():
             st.subheader(f"{i}. {book.title} by {book.author}")
             st.write(f"**Genre:** {book.genre}")
@@ -1,25 +1,29 @@
+from typing import Optional
+from models import CrossDomainRecommendation
 import streamlit as st
 
-def display_cross_domain_recommendations(recommendations):
+def display_cross_domain_recommendations(recommendations: Optional[CrossDomainRecommendation]):
     """Display cross-domain recommendations (movies, games, songs)"""
     if recommendations:
+        if recommendations.is_fallback:
+            st.info("Personalised picks are temporarily unavailable; here are popular picks for this genre.")
         # Display movie recommendation
         st.subheader("🎬 Movie Recommendation")
-        movie = recommendations.get("movie", {})
+        movie = recommendations.movie
         st.write(f"**{movie.get('title')} ({movie.get('year')})**")
         st.write(movie.get('description'))
         st.write(f"**Why this movie:** {movie.get('reason')}")
 
         # Display game recommendation
         st.subheader("🎮 Game Recommendation")
-        game = recommendations.get("game", {})
+        game = recommendations.game
         st.write(f"**{game.get('title')} ({game.get('platform')})**")
         st.write(game.get('description'))
         st.write(f"**Why this game:** {game.get('reason')}")
 
         # Display song recommendation
         st.subheader("🎵 Song Recommendation")
-        song = recommendations.get("song", {})
+        song = recommendations.song
         st.write(f"**{song.get('title')} by {song.get('artist')}**")
         st.write(song.get('description'))
         st.write(f"**Why this song:** {song.get('reason')}")